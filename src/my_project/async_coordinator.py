@@ -0,0 +1,280 @@
+"""异步数据协调器 - 基于asyncio的流水线协调
+子进程输出逐行流式处理，支持阶段超时、取消以及并发等待多个数据键。
+事件循环中记录的执行日志由后台任务在线程中保存，不阻塞事件循环。
+"""
+
+import asyncio
+import codecs
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from data_coordinator import DataCoordinator, stage_argv
+
+# 单行输出的最大长度，超过后按块读取
+STREAM_LIMIT = 1024 * 1024
+
+
+class AsyncDataCoordinator(DataCoordinator):
+    """DataCoordinator的异步版本，阶段脚本总是以子进程方式运行。"""
+
+    def __init__(self, output_tail_lines: int = 50, terminate_grace: float = 5.0,
+                 on_output: Optional[Callable[[str, str, str], None]] = None):
+        """初始化异步数据协调器。
+
+        Args:
+            output_tail_lines: 执行日志中为每个流保留的最后输出行数
+            terminate_grace: 超时或取消后，发送terminate到kill之间的等待秒数
+            on_output: 每行输出的回调，参数为 (文件名, 流名称, 行内容)
+        """
+        # 父类初始化时就会记录事件，需要先准备好日志保存的状态
+        self._log_dirty = False
+        self._log_flush_task = None
+        super().__init__(execution_mode="subprocess")
+        self.output_tail_lines = output_tail_lines
+        self.terminate_grace = terminate_grace
+        self.on_output = on_output
+
+    def _save_execution_log(self):
+        """在事件循环中调用时只标记待保存，由后台任务在线程中写入；连续的多条事件合并为一次写入。"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            super()._save_execution_log()
+            return
+        self._log_dirty = True
+        if self._log_flush_task is None or self._log_flush_task.done():
+            self._log_flush_task = asyncio.ensure_future(self._flush_execution_log())
+
+    async def _flush_execution_log(self):
+        # 同一时间只有这一个任务写日志文件
+        while self._log_dirty:
+            self._log_dirty = False
+            await asyncio.to_thread(self.dm.save_shared_data, "execution_log", list(self.execution_log))
+
+    async def flush_execution_log(self):
+        """等待后台的执行日志保存完成（事件循环结束前调用，否则未完成的保存会被取消）。"""
+        if self._log_flush_task is not None:
+            await self._log_flush_task
+
+    async def _pump_stream(self, stream, file_name: str, stream_name: str, tail: deque):
+        """逐行读取子进程输出，只在内存中保留尾部若干行。
+
+        超过 STREAM_LIMIT 字节的行按 STREAM_LIMIT 切分为多段依次输出，不会丢失内容。
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        buffer = b""
+        while True:
+            data = await stream.read(STREAM_LIMIT)
+            if data:
+                buffer += data
+            pieces = buffer.split(b"\n")
+            # 最后一段没有换行符：读到结尾时输出，超长时先输出完整的块，其余留待下次读取
+            buffer = pieces.pop()
+            if not data:
+                if buffer:
+                    pieces.append(buffer)
+                buffer = b""
+            while len(buffer) >= STREAM_LIMIT:
+                pieces.append(buffer[:STREAM_LIMIT])
+                buffer = buffer[STREAM_LIMIT:]
+
+            for piece in pieces:
+                # 增量解码，切分处的多字节字符留到下一段
+                text = decoder.decode(piece, final=not data)
+                tail.append(text)
+                if self.on_output:
+                    self.on_output(file_name, stream_name, text)
+                else:
+                    print(f"  [{file_name}:{stream_name}] {text}")
+            if not data:
+                break
+
+    async def _stop_process(self, process):
+        """先terminate，宽限期后仍未退出则kill。"""
+        if process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=self.terminate_grace)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def _drain_pumps(self, pumps):
+        """子进程结束后等待输出读完；子进程的子进程仍持有管道时，宽限期后放弃读取。"""
+        try:
+            await asyncio.wait_for(pumps, timeout=self.terminate_grace)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run_python_file_async(self, file_path: str, timeout: Optional[float] = None,
+                                    argv: Optional[List[str]] = None) -> bool:
+        """异步运行Python文件，流式处理输出。
+
+        Args:
+            file_path: Python文件路径
+            timeout: 阶段超时时间（秒），None表示不限制；从启动到进程退出、输出读完的总时间
+            argv: 传给脚本的命令行参数
+
+        Returns:
+            bool: 执行成功返回True；失败或超时返回False。超时或任务被取消时子进程会被终止。
+        """
+        try:
+            return await self._run_python_file_async(file_path, timeout, argv)
+        finally:
+            await self.flush_execution_log()
+
+    async def _run_python_file_async(self, file_path: str, timeout: Optional[float],
+                                     argv: Optional[List[str]] = None) -> bool:
+        file_name = Path(file_path).name
+        self.log_event("file_execution_start", f"开始执行 {file_name}", {
+            "execution_mode": "asyncio",
+            "timeout": timeout
+        })
+
+        stdout_tail = deque(maxlen=self.output_tail_lines)
+        stderr_tail = deque(maxlen=self.output_tail_lines)
+        wall_start = time.perf_counter()
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, file_path, *(argv or []),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=str(Path(file_path).parent),
+                limit=STREAM_LIMIT
+            )
+        except Exception as e:
+            self.log_event("file_execution_exception", f"{file_name} 执行异常: {str(e)}")
+            return False
+
+        pumps = asyncio.gather(
+            self._pump_stream(process.stdout, file_name, "stdout", stdout_tail),
+            self._pump_stream(process.stderr, file_name, "stderr", stderr_tail)
+        )
+
+        # 超时覆盖读取输出和等待退出：关闭了输出但仍在运行的进程同样会被终止
+        completion = asyncio.gather(pumps, process.wait())
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(completion), timeout=timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            await self._stop_process(process)
+            await self._drain_pumps(pumps)
+        except asyncio.CancelledError:
+            await self._stop_process(process)
+            pumps.cancel()
+            self.log_event("file_execution_cancelled", f"{file_name} 已取消", {"pid": process.pid})
+            raise
+
+        wall_time = round(time.perf_counter() - wall_start, 6)
+        self.record_stage_profile(file_name, {
+            "returncode": process.returncode,
+            "metrics": {"wall_time_seconds": wall_time}
+        })
+
+        if timed_out:
+            self.log_event("file_execution_timeout", f"{file_name} 执行超时 ({timeout}秒)，已终止", {
+                "stdout_tail": list(stdout_tail),
+                "stderr_tail": list(stderr_tail),
+                "execution_time": wall_time
+            })
+            return False
+
+        if process.returncode == 0:
+            self.log_event("file_execution_success", f"{file_name} 执行成功", {
+                "stdout_tail": list(stdout_tail),
+                "execution_time": wall_time
+            })
+            return True
+
+        self.log_event("file_execution_error", f"{file_name} 执行失败", {
+            "stderr_tail": list(stderr_tail),
+            "returncode": process.returncode,
+            "execution_time": wall_time
+        })
+        return False
+
+    async def wait_for_data_async(self, key: str, timeout: float = 60, check_interval: float = 0.5):
+        """异步等待特定数据出现（共享数据或记录集），不阻塞事件循环。"""
+        self.log_event("wait_for_data_start", f"等待数据 '{key}'")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while loop.time() < deadline:
+            data = await loop.run_in_executor(None, self.dm.load_shared_data_or_records, key)
+            if data is not None:
+                self.log_event("wait_for_data_success", f"数据 '{key}' 已可用")
+                return data
+            await asyncio.sleep(check_interval)
+
+        self.log_event("wait_for_data_timeout", f"等待数据 '{key}' 超时")
+        return None
+
+    async def wait_for_keys(self, keys: List[str], timeout: float = 60,
+                            check_interval: float = 0.5) -> Dict[str, object]:
+        """并发等待多个数据键，返回 {键名: 数据}，超时的键对应None。"""
+        results = await asyncio.gather(*(
+            self.wait_for_data_async(key, timeout, check_interval) for key in keys
+        ))
+        return dict(zip(keys, results))
+
+    async def orchestrate_data_pipeline_async(self, stage_timeout: Optional[float] = None,
+                                              data_timeout: float = 30):
+        """异步协调整个数据处理流水线。
+
+        Args:
+            stage_timeout: 每个阶段的超时时间（秒）
+            data_timeout: 等待关键数据的超时时间（秒）
+        """
+        try:
+            return await self._orchestrate_data_pipeline_async(stage_timeout, data_timeout)
+        finally:
+            await self.flush_execution_log()
+
+    async def _orchestrate_data_pipeline_async(self, stage_timeout: Optional[float], data_timeout: float) -> bool:
+        print("\n🚀 开始协调数据处理流水线 (asyncio)")
+        producer_stage, consumer_stage = self.pipeline_stages
+        stage_dir = Path(__file__).parent
+
+        self.clear_shared_data()
+
+        print("\n📊 步骤1: 运行数据生产者")
+        if not await self.run_python_file_async(str(stage_dir / producer_stage["file"]), stage_timeout,
+                                                stage_argv(producer_stage)):
+            self.log_event("pipeline_error", "数据生产者执行失败，停止流水线")
+            return False
+
+        print("\n⏳ 步骤2: 等待关键数据生成")
+        available = await self.wait_for_keys(["excel_processing_result", "users", "projects"], data_timeout)
+        missing = [key for key, data in available.items() if data is None]
+        if missing:
+            self.log_event("pipeline_error", f"关键数据 {missing} 未能及时生成")
+            return False
+
+        print("\n📈 步骤3: 运行数据消费者")
+        if not await self.run_python_file_async(str(stage_dir / consumer_stage["file"]), stage_timeout,
+                                                stage_argv(consumer_stage)):
+            self.log_event("pipeline_error", "数据消费者执行失败")
+            return False
+
+        print("\n📋 步骤4: 生成最终报告")
+        self.generate_final_report()
+
+        self.log_event("pipeline_success", "数据处理流水线执行完成")
+        return True
+
+
+def run_pipeline_async(stage_timeout: Optional[float] = None) -> bool:
+    """同步入口：在新的事件循环中运行异步流水线。"""
+    coordinator = AsyncDataCoordinator()
+    return asyncio.run(coordinator.orchestrate_data_pipeline_async(stage_timeout=stage_timeout))
+
+
+if __name__ == "__main__":
+    timeout = input("阶段超时（秒，留空表示不限制）: ").strip()
+    success = run_pipeline_async(float(timeout) if timeout else None)
+    print("\n🎉 流水线执行成功！" if success else "\n❌ 流水线执行失败！")
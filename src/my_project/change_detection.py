@@ -0,0 +1,158 @@
+"""变更检测 - 比较工作簿的两个版本，只输出新增、修改和删除的行
+每行按主键计算一个64位哈希（向量化），哈希快照保存在数据目录下的子目录中；
+下一次检测时与快照比较，下游阶段可以只处理变化的行而不是整表重新加载。
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+from utils import df_to_records
+
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def _split_numeric(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """把数值列拆成 (整数部分, 非整数部分) 两列，每个值只出现在其中一列，另一列为空。
+
+    整数按64位整数哈希，不能转为float64：超过 2**53 的整数（例如雪花ID）会被舍入，不同的值得到相同的哈希。
+    整数值不论所在的列是整数、带空值的浮点还是含小数的浮点，都落在整数部分，哈希一致。
+    """
+    if ptypes.is_integer_dtype(series):
+        values = series.dropna()
+        integral = series.astype("UInt64" if len(values) and values.max() > _INT64_MAX else "Int64")
+        return integral, pd.Series(np.nan, index=series.index)
+
+    floats = series.astype("float64")
+    array = floats.to_numpy()
+    with np.errstate(invalid="ignore"):
+        mask = np.isfinite(array) & (np.mod(array, 1) == 0) & (np.abs(array) < 2.0 ** 63)
+    return floats.where(mask).astype("Int64"), floats.where(~mask)
+
+
+def _normalize_for_hash(df: pd.DataFrame) -> pd.DataFrame:
+    """统一列的表示，避免只是dtype变化（例如新增空值使整数列变为浮点）就被当成修改。"""
+    normalized = {}
+    for index, column in enumerate(df.columns):
+        series = df[column]
+        if ptypes.is_numeric_dtype(series) and not ptypes.is_bool_dtype(series):
+            normalized[(index, "int")], normalized[(index, "float")] = _split_numeric(series)
+        elif ptypes.is_datetime64_any_dtype(series):
+            # pandas 2之前datetime64只有纳秒精度，没有 as_unit
+            normalized[(index, "")] = series.dt.as_unit("ns") if hasattr(series.dt, "as_unit") else series
+        else:
+            # 字符串、分类和混合类型列直接按值哈希
+            normalized[(index, "")] = series.astype(object)
+    return pd.DataFrame(normalized, index=df.index)
+
+
+def row_hashes(df: pd.DataFrame, key_column: str) -> pd.Series:
+    """计算每行的哈希，返回以主键为索引的Series。
+
+    Raises:
+        ValueError: 主键列不存在、有空值或有重复值
+    """
+    if key_column not in df.columns:
+        raise ValueError(f"主键列不存在: {key_column}")
+    keys = df[key_column]
+    if keys.isna().any():
+        raise ValueError(f"主键列 {key_column} 中有空值")
+    if keys.duplicated().any():
+        raise ValueError(f"主键列 {key_column} 中有重复值: {keys[keys.duplicated()].head(5).tolist()}")
+
+    hashes = pd.util.hash_pandas_object(_normalize_for_hash(df), index=False)
+    return pd.Series(hashes.to_numpy(), index=pd.Index(keys.to_numpy(), name=key_column))
+
+
+class ChangeDetector:
+    """按数据源保存行哈希快照，并与新版本比较。"""
+
+    def __init__(self, dm, snapshots_dir_name: str = "change_snapshots"):
+        """初始化变更检测器。
+
+        Args:
+            dm: 数据管理器实例
+            snapshots_dir_name: 快照子目录名称
+        """
+        self.dm = dm
+        self.snapshots_dir = dm.data_dir / snapshots_dir_name
+        self.snapshots_dir.mkdir(exist_ok=True)
+
+    def _snapshot_path(self, source_key: str):
+        return self.snapshots_dir / f"{hashlib.sha1(source_key.encode('utf-8')).hexdigest()}.pkl"
+
+    def load_snapshot(self, source_key: str) -> Optional[pd.Series]:
+        """读取上一次的哈希快照，不存在时返回None。"""
+        path = self._snapshot_path(source_key)
+        return pd.read_pickle(path) if path.exists() else None
+
+    def detect(self, df: pd.DataFrame, source_key: str, key_column: str, commit: bool = True) -> Dict:
+        """比较新版本与上一次快照。
+
+        Args:
+            df: 新版本的数据
+            source_key: 数据源标识，例如 "文件路径::工作表"
+            key_column: 主键列
+            commit: 是否把新版本的哈希保存为快照
+
+        Returns:
+            包含 inserted、updated（新版本的整行记录）、deleted（主键列表）及各自数量的字典；
+            第一次检测时所有行都算新增，baseline 为True
+        """
+        current = row_hashes(df, key_column)
+        previous = self.load_snapshot(source_key)
+
+        if previous is None:
+            inserted_keys, updated_keys, deleted_keys = current.index, current.index[:0], current.index[:0]
+        else:
+            inserted_keys = current.index.difference(previous.index, sort=False)
+            deleted_keys = previous.index.difference(current.index, sort=False)
+            common = current.index.intersection(previous.index, sort=False)
+            updated_keys = common[current[common].to_numpy() != previous[common].to_numpy()]
+
+        keyed = df.set_index(key_column, drop=False)
+        changes = {
+            "source": source_key,
+            "key_column": key_column,
+            "baseline": previous is None,
+            "inserted": df_to_records(keyed.loc[inserted_keys]),
+            "updated": df_to_records(keyed.loc[updated_keys]),
+            "deleted": json.loads(pd.Series(deleted_keys).to_json(orient="values", date_format="iso")),
+            "detected_time": datetime.now().isoformat()
+        }
+        changes["counts"] = {
+            "inserted": len(inserted_keys),
+            "updated": len(updated_keys),
+            "deleted": len(deleted_keys),
+            "unchanged": len(current) - len(inserted_keys) - len(updated_keys)
+        }
+
+        if commit:
+            current.to_pickle(self._snapshot_path(source_key))
+        return changes
+
+
+def detect_workbook_changes(excel_path: str, sheet_name: str, key_column: Optional[str] = None,
+                            output_key: str = "excel_changes") -> Dict:
+    """读取工作表，与上一版本比较，并把变更保存到共享数据供下游阶段使用。
+
+    Args:
+        excel_path: Excel文件路径
+        sheet_name: 工作表名称
+        key_column: 主键列，默认为第一列
+        output_key: 保存变更的共享数据键
+    """
+    from data_manager import get_data_manager
+    from workbook_cache import read_excel_cached
+
+    df = read_excel_cached(excel_path, sheet_name)
+    key_column = key_column or df.columns[0]
+    dm = get_data_manager()
+    changes = ChangeDetector(dm).detect(df, f"{excel_path}::{sheet_name}", key_column)
+    dm.save_shared_data(output_key, changes)
+    return changes
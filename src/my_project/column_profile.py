@@ -0,0 +1,256 @@
+"""列画像 - 单遍向量化计算每列的统计信息
+每列统计: 空值数、最小/最大值、均值/标准差、近似去重数（HyperLogLog）、
+近似分位数（KLL风格压缩器）、高频值（Misra-Gries）。
+
+所有统计量都是可合并的草图：可以逐块更新，也可以把不同分块、不同分区
+（例如进程池中的行范围分区）的结果合并，内存占用与总行数无关。
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+DEFAULT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+
+def _jsonable(value: Any) -> Any:
+    """把numpy标量、时间戳等转换为可JSON序列化的值。"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    return value
+
+
+class HyperLogLog:
+    """HyperLogLog 去重计数，2^p 个寄存器，相对误差约 1.04/sqrt(2^p)。"""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        """用64位哈希值更新寄存器。"""
+        if len(hashes) == 0:
+            return self
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        # 剩余位数不超过52，转为float64后log2是精确的
+        rest_bits = 64 - self.p
+        rest = (hashes & np.uint64((1 << rest_bits) - 1)).astype(np.float64)
+        with np.errstate(divide="ignore"):
+            highest = np.floor(np.log2(rest))
+        rank = np.where(rest > 0, rest_bits - highest, rest_bits + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("HyperLogLog 精度不一致，无法合并")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # 小基数时使用线性计数
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """KLL风格的分位数草图：每层一个容量为k的压缩器，满了就排序后隔一个取一个提升到上一层。"""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # 奇数个时留下一个，其余两两配对随机保留一个
+                keep = items[:len(items) % 2]
+                paired = items[len(items) % 2:]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: np.ndarray) -> "QuantileSketch":
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values.astype(np.float64, copy=False)])
+            self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    def quantiles(self, qs=DEFAULT_QUANTILES) -> Dict[str, Optional[float]]:
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return {str(q): None for q in qs}
+        weights = np.concatenate([np.full(len(items), 2.0 ** level)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        positions = np.minimum(positions, len(items) - 1)
+        return {str(q): float(items[pos]) for q, pos in zip(qs, positions)}
+
+
+class TopKSketch:
+    """Misra-Gries 高频值草图，计数是下界，误差不超过 总数/(capacity+1)。"""
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+
+    def _trim(self):
+        if len(self.counts) > self.capacity:
+            threshold = sorted(self.counts.values(), reverse=True)[self.capacity]
+            self.counts = {value: count - threshold for value, count in self.counts.items()
+                           if count > threshold}
+
+    def update(self, values: pd.Series) -> "TopKSketch":
+        counts = values.value_counts()
+        # 分类列的value_counts会包含计数为0的类别
+        counts = counts[counts > 0]
+        if len(counts) > self.capacity:
+            # 先把分块自身的计数压缩成同样容量的草图，避免逐个合并大量低频值
+            threshold = counts.iloc[self.capacity]
+            counts = counts[counts > threshold] - threshold
+        for value, count in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        self._trim()
+        return self
+
+    def merge(self, other: "TopKSketch") -> "TopKSketch":
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        self._trim()
+        return self
+
+    def top(self, k: int) -> List[Dict]:
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [{"value": _jsonable(value), "count": count} for value, count in ranked]
+
+
+class ColumnProfile:
+    """单列的可合并统计信息。"""
+
+    def __init__(self, hll_precision: int = 12, quantile_k: int = 200, topk_capacity: int = 100):
+        self.count = 0
+        self.null_count = 0
+        # 数值统计（Chan并行算法合并均值和二阶中心矩）
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.distinct = HyperLogLog(hll_precision)
+        self.quantiles = QuantileSketch(quantile_k)
+        self.top_values = TopKSketch(topk_capacity)
+
+    def _merge_moments(self, count: int, mean: float, m2: float, low: float, high: float):
+        total = self.numeric_count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.numeric_count * count / total
+        self.numeric_count = total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def update(self, series: pd.Series) -> "ColumnProfile":
+        """用一个分块中的一列更新统计信息。"""
+        self.count += len(series)
+        values = series.dropna()
+        self.null_count += len(series) - len(values)
+        if len(values) == 0:
+            return self
+
+        if ptypes.is_numeric_dtype(values) and not ptypes.is_bool_dtype(values):
+            array = values.to_numpy(dtype=np.float64)
+            mean = float(array.mean())
+            self._merge_moments(len(array), mean, float(((array - mean) ** 2).sum()),
+                                float(array.min()), float(array.max()))
+            self.quantiles.update(array)
+
+        self.distinct.update_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        self.top_values.update(values)
+        return self
+
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        """合并另一个分块或分区的统计信息。"""
+        self.count += other.count
+        self.null_count += other.null_count
+        if other.numeric_count:
+            self._merge_moments(other.numeric_count, other.mean, other.m2, other.min, other.max)
+        self.distinct.merge(other.distinct)
+        self.quantiles.merge(other.quantiles)
+        self.top_values.merge(other.top_values)
+        return self
+
+    def to_dict(self, top_k: int = 5, qs=DEFAULT_QUANTILES) -> Dict:
+        numeric = self.numeric_count > 0
+        return {
+            "count": self.count,
+            "null_count": self.null_count,
+            "distinct_count": self.distinct.count(),
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.mean, 6) if numeric else None,
+            "std": round(float(np.sqrt(self.m2 / (self.numeric_count - 1))), 6)
+                   if self.numeric_count > 1 else None,
+            "quantiles": self.quantiles.quantiles(qs) if numeric else None,
+            "top_values": self.top_values.top(top_k),
+        }
+
+
+class TableProfile:
+    """一张表所有列的统计信息，按列名合并。"""
+
+    def __init__(self, **column_options):
+        self.column_options = column_options
+        self.columns: Dict[str, ColumnProfile] = {}
+
+    def _column(self, name) -> ColumnProfile:
+        if name not in self.columns:
+            self.columns[name] = ColumnProfile(**self.column_options)
+        return self.columns[name]
+
+    def update(self, chunk: pd.DataFrame) -> "TableProfile":
+        for name in chunk.columns:
+            self._column(name).update(chunk[name])
+        return self
+
+    def merge(self, other: "TableProfile") -> "TableProfile":
+        for name, profile in other.columns.items():
+            self._column(name).merge(profile)
+        return self
+
+    def to_dict(self, top_k: int = 5) -> Dict[str, Dict]:
+        return {str(name): profile.to_dict(top_k) for name, profile in self.columns.items()}
+
+
+def profile_chunks(chunks) -> TableProfile:
+    """对一组DataFrame分块计算统计信息。"""
+    profile = TableProfile()
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile
@@ -2,22 +2,131 @@
 这个文件展示如何协调多个Python文件的执行和数据交换。
 """
 
+import os
 import time
 import subprocess
 import sys
-from datetime import datetime
+import tempfile
+from datetime import datetime, timedelta
 from pathlib import Path
 from data_manager import get_data_manager, save_data, load_data, list_data
+from dtype_optimizer import SCHEMA_STORE_KEY
+from partitioned_stage import fan_out_fan_in
+from pipeline_profiler import run_profiled_subprocess, summarize_cprofile
+from pipeline_trace import TRACK_DATA_WAIT, TraceRecorder
+from run_manifest import RunManifestStore
+from stage_cache import StageCache
+from stage_runner import WarmWorkerPool, run_stage_inprocess
+from stage_watchdog import RETRYABLE_REASONS, unsupported_limits
+from task_queue import SQLiteTaskQueue, local_worker_id, spawn_local_workers
+from utils import get_excel_input_path
+
+# 阶段执行模式：独立子进程 / 当前进程内 / 预热的工作进程池 / 任务队列（工作进程拉取）
+EXECUTION_MODES = ("subprocess", "inprocess", "pool", "queue")
+
+# clear_shared_data 保留的共享数据：执行日志，以及跨运行复用的状态
+# （dtype_optimizer 的schema、增量摄取的高水位、消费者的分析缓存）。
+# 这些状态都能自行发现与数据不一致并重建，清理它们只会让下次运行退化为全量处理
+PRESERVED_SHARED_KEYS = ("execution_log", SCHEMA_STORE_KEY, "ingest_watermarks", "analysis_cache")
+
+# queue模式下取消执行中的任务后，等待工作进程确认停止的时间（秒）
+CANCEL_GRACE_SECONDS = 10.0
+
+# 生产者读取的Excel文件（环境变量 EXCEL_INPUT_PATH，或 DataCoordinator 的 excel_path 参数）
+EXCEL_INPUT_PATH = get_excel_input_path()
+
+
+def build_pipeline_stages(excel_path: str = EXCEL_INPUT_PATH, sheet_name: str = "Sheet1") -> list:
+    """生成流水线阶段定义。
+    
+    文件路径相对于本目录；inputs/outputs 为共享数据键名（可以是JSON或JSON Lines记录集），
+    output_dirs 为阶段写入的数据目录下的子目录，和 outputs 一起由阶段缓存快照；
+    wait_for 为阶段结束后必须出现的关键数据；params 计入阶段指纹，并以 --键名 值 的形式传给脚本（见 stage_argv）。
+    """
+    return [
+        {
+            "name": "producer",
+            "title": "📊 运行数据生产者",
+            "file": "file_a_producer.py",
+            "inputs": [],
+            "input_files": [excel_path],
+            "outputs": ["excel_processing_result", "excel_stats", "app_config",
+                        "users", "projects", "metadata", "processing_status", SCHEMA_STORE_KEY],
+            "output_dirs": ["workbook_cache"],
+            "wait_for": ["excel_processing_result", "users", "projects"],
+            "error_message": "数据生产者执行失败，停止流水线",
+            "params": {"excel_path": excel_path, "sheet_name": sheet_name}
+        },
+        {
+            "name": "consumer",
+            "title": "📈 运行数据消费者",
+            "file": "file_b_consumer.py",
+            "inputs": ["excel_processing_result", "excel_stats", "users",
+                       "projects", "metadata", "processing_status"],
+            "outputs": ["analysis_report", "consumer_status"],
+            "wait_for": [],
+            "error_message": "数据消费者执行失败",
+            "params": {}
+        }
+    ]
+
+
+PIPELINE_STAGES = build_pipeline_stages()
+
+
+def stage_argv(stage: dict) -> list:
+    """把阶段的 params 转换为命令行参数，例如 {"sheet_name": "Sheet1"} -> ["--sheet-name", "Sheet1"]。"""
+    argv = []
+    for key, value in stage.get("params", {}).items():
+        argv += [f"--{key.replace('_', '-')}", str(value)]
+    return argv
+
 
 class DataCoordinator:
     """数据协调器，管理文件间的数据流和执行顺序。"""
     
-    def __init__(self):
+    def __init__(self, execution_mode: str = "subprocess", pool_size: int = 2,
+                 enable_cprofile: bool = False, queue_path: str = None,
+                 stage_limits: dict = None, excel_path: str = None):
+        """初始化数据协调器。
+        
+        Args:
+            execution_mode: 阶段执行模式，可选 "subprocess"、"inprocess"、"pool"、"queue"
+            pool_size: pool模式下的工作进程数量；queue模式下在本机启动的工作进程数量（0表示只使用外部工作进程）
+            enable_cprofile: 是否为每个阶段生成cProfile输出
+            queue_path: queue模式下的队列数据库路径，默认为数据目录下的 task_queue.db
+            stage_limits: 所有阶段默认的资源限制和看门狗配置（timeout、stall_timeout、
+                max_memory_mb、max_rss_mb、max_cpu_seconds、retries），阶段定义中的 limits 可覆盖；
+                仅在subprocess模式下生效；queue模式下只支持 timeout（等待任务完成的最长时间）和 retries，
+                inprocess/pool模式下只支持 retries，配置了不支持的限制时抛出 ValueError
+            excel_path: 生产者读取的Excel文件，默认为 EXCEL_INPUT_PATH
+        """
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"未知的执行模式: {execution_mode}，可选: {EXECUTION_MODES}")
+        self.execution_mode = execution_mode
+        self._check_limits_supported(stage_limits)
+        
         self.dm = get_data_manager()
         self.execution_log = []
         self.start_time = datetime.now()
+        self.pool_size = pool_size
+        self._worker_pool = None
+        self._stage_cache = None
+        self.run_manifests = RunManifestStore(self.dm)
+        self.current_run_id = None
+        self.queue_path = queue_path
+        self._task_queue = None
+        self._queue_workers = []
+        self.enable_cprofile = enable_cprofile
+        self.stage_profiles = []
+        self.stage_limits = stage_limits or {}
+        self.excel_path = excel_path or EXCEL_INPUT_PATH
+        self.pipeline_stages = build_pipeline_stages(self.excel_path)
+        self.watchdog_events = []
+        self.last_termination_reason = None
+        self.trace = TraceRecorder()
         
-        print("🎯 数据协调器启动")
+        print(f"🎯 数据协调器启动 (执行模式: {execution_mode})")
         self.log_event("coordinator_started", "数据协调器初始化完成")
     
     def log_event(self, event_type: str, message: str, data: dict = None):
@@ -33,59 +142,304 @@ class DataCoordinator:
         print(f"📝 [{event_type}] {message}")
         
         # 保存到共享数据
+        self._save_execution_log()
+    
+    def _save_execution_log(self):
+        """把完整的执行日志写入共享数据（子类可以改为异步写入）。"""
         self.dm.save_shared_data("execution_log", self.execution_log)
     
     def clear_shared_data(self):
-        """清理所有共享数据，重新开始。"""
+        """清理所有共享数据，重新开始（PRESERVED_SHARED_KEYS 除外）。"""
         print("\n🧹 清理共享数据...")
         
         all_keys = self.dm.list_shared_data()
         cleared_count = 0
         
         for key in all_keys:
-            if key != "execution_log":  # 保留执行日志
+            if key not in PRESERVED_SHARED_KEYS:
                 if self.dm.delete_shared_data(key):
                     cleared_count += 1
         
         self.log_event("data_cleared", f"已清理 {cleared_count} 个共享数据文件")
         return cleared_count
     
-    def run_python_file(self, file_path: str, wait_for_completion: bool = True):
+    def _get_worker_pool(self) -> WarmWorkerPool:
+        """懒加载预热的工作进程池。"""
+        if self._worker_pool is None:
+            self._worker_pool = WarmWorkerPool(max_workers=self.pool_size)
+            self.log_event("worker_pool_started", f"工作进程池已启动 ({self.pool_size} 个进程)")
+        return self._worker_pool
+    
+    def _get_task_queue(self) -> SQLiteTaskQueue:
+        """懒加载任务队列，并按需在本机启动工作进程。"""
+        if self._task_queue is None:
+            queue_path = self.queue_path or str(self.dm.data_dir / "task_queue.db")
+            self._task_queue = SQLiteTaskQueue(queue_path)
+            if self.pool_size > 0:
+                self._queue_workers = spawn_local_workers(queue_path, self.pool_size)
+            self.log_event("task_queue_started", f"任务队列已就绪: {queue_path}", {
+                "local_workers": [p.pid for p in self._queue_workers]
+            })
+        return self._task_queue
+    
+    def _replace_dead_queue_workers(self, queue: SQLiteTaskQueue) -> int:
+        """检查本机工作进程是否存活：已退出的进程正在执行的任务立即放回队列，并启动新的进程替换它们。
+        
+        Returns:
+            替换的进程数量
+        """
+        dead = [p for p in self._queue_workers if p.poll() is not None]
+        if not dead:
+            return 0
+        requeued = queue.requeue_worker_tasks([local_worker_id(p.pid) for p in dead])
+        replacements = spawn_local_workers(queue.db_path, len(dead))
+        self._queue_workers = [p for p in self._queue_workers if p not in dead] + replacements
+        self.log_event("queue_workers_respawned", f"{len(dead)} 个本机工作进程已退出，已重新启动", {
+            "exited": {p.pid: p.returncode for p in dead},
+            "requeued_tasks": requeued,
+            "replacements": [p.pid for p in replacements]
+        })
+        return len(dead)
+    
+    def _await_cancelled_stop(self, queue: SQLiteTaskQueue, task_id: int,
+                              grace: float = CANCEL_GRACE_SECONDS) -> bool:
+        """等待被取消的任务真正停止执行。
+        
+        执行中的任务被取消后，工作进程在下一次心跳时终止阶段并退出；超过 grace 秒仍未确认时，
+        持有任务的若是本机工作进程就直接杀死它。因取消而退出的本机工作进程立即替换，不计入重启次数。
+        
+        Returns:
+            确认已停止返回True；持有任务的是其他机器上的工作进程且未响应时返回False
+        """
+        task = queue.get(task_id)
+        if task["status"] != "cancelling":
+            return True
+        owners = [p for p in self._queue_workers if local_worker_id(p.pid) == task["worker_id"]]
+        if queue.wait(task_id, timeout=grace) is None:
+            if not owners:
+                return False
+            for process in owners:
+                process.kill()
+            queue.confirm_cancelled(task_id)
+        for process in owners:
+            try:
+                process.wait(timeout=grace)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self._replace_dead_queue_workers(queue)
+        return True
+    
+    def _run_via_queue(self, file_path: str, cprofile_path: str = None, timeout: float = None,
+                       check_interval: float = 1.0, argv: list = None) -> dict:
+        """把阶段放入任务队列并等待工作进程执行完成。
+        
+        等待期间定期检查本机工作进程，退出的进程会被替换（连续替换过多时判定阶段失败）；
+        超过 timeout 秒仍未完成时取消任务，并等到执行中的阶段确实停止后才以 timeout 失败，
+        因此重试不会与上一次执行同时写共享数据。
+        
+        Args:
+            file_path: 阶段脚本路径
+            cprofile_path: cProfile输出路径
+            timeout: 等待的最长时间（秒），None表示不限制
+            check_interval: 检查工作进程的间隔（秒）
+            argv: 传给阶段脚本的命令行参数
+        """
+        queue = self._get_task_queue()
+        task_id = queue.enqueue(str(Path(file_path).resolve()), {"cprofile_path": cprofile_path, "argv": argv})
+        self.log_event("task_enqueued", f"{Path(file_path).name} 已放入任务队列", {"task_id": task_id})
+        
+        deadline = None if timeout is None else time.time() + timeout
+        restarts_left = max(self.pool_size, 1) * 2
+        task = None
+        while task is None:
+            remaining = check_interval if deadline is None else min(check_interval, deadline - time.time())
+            task = queue.wait(task_id, timeout=max(remaining, 0))
+            if task is not None:
+                break
+            
+            termination_reason = None
+            if deadline is not None and time.time() >= deadline:
+                termination_reason, message = "timeout", f"任务 {task_id} 在 {timeout} 秒内未完成"
+            elif self.pool_size > 0:
+                restarts_left -= self._replace_dead_queue_workers(queue)
+                if restarts_left < 0:
+                    termination_reason, message = "worker_lost", f"本机工作进程反复退出，任务 {task_id} 无法完成"
+            
+            if termination_reason:
+                # 任务可能恰好在此时完成，取消失败时以实际结果为准
+                if queue.cancel(task_id, message):
+                    if not self._await_cancelled_stop(queue, task_id):
+                        # 仍有工作进程可能在写共享数据，不能重试
+                        termination_reason = "cancel_unconfirmed"
+                        message += "，且无法确认执行中的阶段已停止"
+                    self.log_event("task_abandoned", message, {"task_id": task_id, "reason": termination_reason})
+                    return {"returncode": 1, "stdout": "", "stderr": message, "metrics": {},
+                            "termination_reason": termination_reason}
+                task = queue.get(task_id)
+        
+        result = task["result"]
+        self.log_event("task_finished", f"任务 {task_id} 由 {result.get('worker_id')} 执行完成", {
+            "task_id": task_id,
+            "attempts": task["attempts"],
+            "queue_wait_seconds": round(task["started_at"] - task["enqueued_at"], 6)
+        })
+        return result
+    
+    def _cprofile_path(self, file_path: str):
+        """生成本次阶段执行的cProfile输出路径，未启用时返回None。"""
+        if not self.enable_cprofile:
+            return None
+        profile_dir = self.dm.data_dir / "profiles"
+        profile_dir.mkdir(exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return str(profile_dir / f"{Path(file_path).stem}_{timestamp}.prof")
+    
+    def _execute_stage(self, file_path: str, cprofile_path: str = None, limits: dict = None,
+                       argv: list = None) -> dict:
+        """运行阶段脚本，并在时间线上记录执行它的进程的生命周期。"""
+        start = time.time()
+        result = self._dispatch_stage(file_path, cprofile_path, limits, argv)
+        if result.get("reloaded_modules"):
+            self.log_event("modules_reloaded", f"项目模块已修改，{Path(file_path).name} 运行前重新导入",
+                           {"modules": result["reloaded_modules"]})
+        
+        pid = result.get("pid", self.trace.pid)
+        if pid != self.trace.pid:
+            self.trace.name_process(pid, f"{self.execution_mode} pid={pid}")
+        self.trace.add_complete(Path(file_path).name, start, time.time(), self.execution_mode,
+                                pid=pid, args={"returncode": result.get("returncode")})
+        return result
+    
+    def _check_limits_supported(self, limits: dict = None):
+        """当前执行模式无法执行的限制直接报错，避免配置了限制的阶段在没有保护的情况下运行。"""
+        unsupported = unsupported_limits(self.execution_mode, limits)
+        if unsupported:
+            raise ValueError(f"{self.execution_mode}模式不支持以下阶段限制: {unsupported}，"
+                             f"资源限制和看门狗只在subprocess模式下完整生效")
+    
+    def _dispatch_stage(self, file_path: str, cprofile_path: str = None, limits: dict = None,
+                        argv: list = None) -> dict:
+        """按当前执行模式运行阶段脚本，返回 returncode/stdout/stderr/metrics/pid。"""
+        limits = limits or {}
+        argv = list(argv or [])
+        
+        if self.execution_mode == "inprocess":
+            return run_stage_inprocess(file_path, argv, cprofile_path)
+        if self.execution_mode == "pool":
+            return self._get_worker_pool().run(file_path, argv, cprofile_path)
+        if self.execution_mode == "queue":
+            return self._run_via_queue(file_path, cprofile_path, limits.get("timeout"), argv=argv)
+        
+        cmd = [sys.executable]
+        if cprofile_path:
+            cmd += ["-m", "cProfile", "-o", cprofile_path]
+        cmd += [file_path] + argv
+        return run_profiled_subprocess(cmd, cwd=str(Path(file_path).parent), limits=limits)
+    
+    def record_stage_profile(self, file_name: str, result: dict, cprofile_path: str = None,
+                             cache_hit: bool = False) -> dict:
+        """记录一个阶段的资源消耗，并保存到共享数据 'stage_profiles'。"""
+        profile = {
+            "stage": file_name,
+            "finished_time": datetime.now().isoformat(),
+            "execution_mode": "cache" if cache_hit else self.execution_mode,
+            "returncode": result.get("returncode"),
+            **result.get("metrics", {})
+        }
+        if result.get("termination_reason"):
+            profile["termination_reason"] = result["termination_reason"]
+        if cprofile_path:
+            profile["cprofile_path"] = cprofile_path
+            profile["cprofile_top"] = summarize_cprofile(cprofile_path)
+        
+        self.stage_profiles.append(profile)
+        self.dm.save_shared_data("stage_profiles", self.stage_profiles)
+        return profile
+    
+    def shutdown(self):
+        """释放协调器持有的资源（如工作进程池）。"""
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+            self._worker_pool = None
+            self.log_event("worker_pool_stopped", "工作进程池已关闭")
+        if self._queue_workers:
+            for process in self._queue_workers:
+                process.terminate()
+            for process in self._queue_workers:
+                process.wait()
+            self.log_event("queue_workers_stopped", f"已停止 {len(self._queue_workers)} 个本机工作进程")
+            self._queue_workers = []
+    
+    def run_python_file(self, file_path: str, wait_for_completion: bool = True, limits: dict = None,
+                        argv: list = None):
         """运行Python文件。
         
         Args:
             file_path: Python文件路径
             wait_for_completion: 是否等待执行完成
+            limits: 资源限制和看门狗配置，见 stage_watchdog
+            argv: 传给脚本的命令行参数
+        
+        Raises:
+            ValueError: limits 中有当前执行模式不支持的限制
         """
+        self._check_limits_supported(limits)
         file_name = Path(file_path).name
-        self.log_event("file_execution_start", f"开始执行 {file_name}")
+        self.last_termination_reason = None
+        self.log_event("file_execution_start", f"开始执行 {file_name}", {
+            "execution_mode": self.execution_mode
+        })
         
         try:
             if wait_for_completion:
                 # 同步执行
-                result = subprocess.run(
-                    [sys.executable, file_path],
-                    capture_output=True,
-                    text=True,
-                    cwd=Path(file_path).parent
-                )
+                cprofile_path = self._cprofile_path(file_path)
+                result = self._execute_stage(file_path, cprofile_path, limits, argv)
+                profile = self.record_stage_profile(file_name, result, cprofile_path)
+                self.last_termination_reason = result.get("termination_reason")
+                
+                if self.last_termination_reason not in (None, "error"):
+                    watchdog_event = {
+                        "stage": file_name,
+                        "reason": self.last_termination_reason,
+                        "returncode": result["returncode"],
+                        "execution_time": profile.get("wall_time_seconds"),
+                        "limits": limits or {}
+                    }
+                    self.watchdog_events.append(watchdog_event)
+                    self.log_event("stage_terminated",
+                                   f"{file_name} 被终止: {self.last_termination_reason}", watchdog_event)
                 
-                if result.returncode == 0:
+                if result["returncode"] == 0:
                     self.log_event("file_execution_success", f"{file_name} 执行成功", {
-                        "stdout": result.stdout,
-                        "execution_time": (datetime.now() - self.start_time).total_seconds()
+                        "stdout": result["stdout"],
+                        "execution_time": profile.get("wall_time_seconds")
                     })
                     return True
                 else:
                     self.log_event("file_execution_error", f"{file_name} 执行失败", {
-                        "stderr": result.stderr,
-                        "returncode": result.returncode
+                        "stderr": result["stderr"],
+                        "returncode": result["returncode"],
+                        "execution_time": profile.get("wall_time_seconds")
                     })
                     return False
+            elif self.execution_mode == "pool":
+                # 异步提交到工作进程池，返回Future
+                future = self._get_worker_pool().submit(file_path, argv)
+                self.log_event("file_execution_async", f"{file_name} 已提交到工作进程池")
+                return future
+            elif self.execution_mode == "queue":
+                # 放入任务队列，返回任务ID
+                task_id = self._get_task_queue().enqueue(str(Path(file_path).resolve()), {"argv": argv})
+                self.log_event("file_execution_async", f"{file_name} 已放入任务队列", {
+                    "task_id": task_id
+                })
+                return task_id
             else:
                 # 异步执行
                 process = subprocess.Popen(
-                    [sys.executable, file_path],
+                    [sys.executable, file_path] + list(argv or []),
                     cwd=Path(file_path).parent
                 )
                 self.log_event("file_execution_async", f"{file_name} 异步执行启动", {
@@ -97,30 +451,130 @@ class DataCoordinator:
             self.log_event("file_execution_exception", f"{file_name} 执行异常: {str(e)}")
             return False
     
+    def run_partitioned_stage(self, name: str, partitions: list, map_func, reduce_func,
+                              output_key: str, max_workers: int = None):
+        """把一个逻辑阶段拆分为多个分区在进程池中并行执行，合并后写入一个数据键。
+        
+        Args:
+            name: 阶段名称（用于日志和性能记录）
+            partitions: 分区列表，见 partitioned_stage 中的分区辅助函数
+            map_func: 处理单个分区的模块级函数
+            reduce_func: 合并分区结果的函数
+            output_key: 合并结果保存到的共享数据键
+            max_workers: 进程数量，默认为CPU核数
+            
+        Returns:
+            合并后的结果，执行或保存失败时返回None
+        """
+        self.log_event("partitioned_stage_start", f"开始分区执行 {name} ({len(partitions)} 个分区)", {
+            "max_workers": max_workers
+        })
+        
+        wall_start = time.perf_counter()
+        try:
+            with self.trace.span(f"partitioned:{name}", "stage", args={"partitions": len(partitions)}):
+                merged, timings = fan_out_fan_in(partitions, map_func, reduce_func, max_workers)
+        except Exception as e:
+            self.log_event("partitioned_stage_error", f"{name} 分区执行失败: {str(e)}")
+            self.record_stage_profile(name, {"returncode": 1, "metrics": {
+                "wall_time_seconds": round(time.perf_counter() - wall_start, 6)
+            }})
+            return None
+        
+        wall_time = round(time.perf_counter() - wall_start, 6)
+        if not self.dm.save_shared_data(output_key, merged):
+            self.log_event("partitioned_stage_error", f"{name} 合并结果无法保存到 '{output_key}'")
+            self.record_stage_profile(name, {"returncode": 1, "metrics": {"wall_time_seconds": wall_time}})
+            return None
+        self.record_stage_profile(name, {"returncode": 0, "metrics": {
+            "wall_time_seconds": wall_time,
+            "partitions": timings
+        }})
+        self.log_event("partitioned_stage_success", f"{name} 分区执行完成，结果已保存到 '{output_key}'", {
+            "partition_count": len(partitions),
+            "execution_time": wall_time
+        })
+        return merged
+    
+    def orchestrate_streaming_pipeline(self, channel_address: str = None):
+        """以流式方式同时运行生产者和消费者，记录通过有界通道逐批传递。
+        
+        只运行两个阶段的流式模式：生产者逐批发送Excel记录，消费者增量统计并保存 "stream_analysis"。
+        批处理流水线中的其他工作（生成 users/projects 示例数据、用户和项目分析、"analysis_report"）
+        不会执行，也不使用阶段缓存和运行清单；两个阶段都成功后生成最终报告。
+        
+        Args:
+            channel_address: 通道地址，默认为数据目录下的Unix套接字 record_stream.sock
+            
+        Returns:
+            bool: 两个阶段都成功返回True
+        """
+        print("\n🌊 开始流式流水线（生产者与消费者重叠执行）")
+        channel_address = channel_address or str(self.dm.data_dir / "record_stream.sock")
+        stage_dir = Path(__file__).parent
+        
+        processes, stderr_files = {}, {}
+        with self.trace.span("streaming_pipeline", "stage", args={"channel": channel_address}):
+            stage_args = {"file_a_producer.py": ["--excel-path", self.excel_path], "file_b_consumer.py": []}
+            for file_name, extra_args in stage_args.items():
+                # stderr写入临时文件：两个进程同时运行，管道只按顺序读取时先等待的一方可能因另一方写满管道而死锁
+                stderr_files[file_name] = tempfile.TemporaryFile("w+", encoding="utf-8")
+                processes[file_name] = subprocess.Popen(
+                    [sys.executable, str(stage_dir / file_name), "--stream", channel_address] + extra_args,
+                    cwd=str(stage_dir),
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr_files[file_name],
+                    text=True
+                )
+                self.log_event("file_execution_start", f"开始流式执行 {file_name}", {
+                    "pid": processes[file_name].pid
+                })
+            
+            success = True
+            for file_name, process in processes.items():
+                process.wait()
+                with stderr_files[file_name] as stderr_file:
+                    stderr_file.seek(0)
+                    stderr = stderr_file.read()
+                if process.returncode == 0:
+                    self.log_event("file_execution_success", f"{file_name} 流式执行成功")
+                else:
+                    success = False
+                    self.log_event("file_execution_error", f"{file_name} 流式执行失败", {
+                        "stderr": stderr,
+                        "returncode": process.returncode
+                    })
+        
+        if success:
+            self.generate_final_report()
+        self.log_event("streaming_pipeline_finished", "流式流水线结束", {"success": success})
+        return success
+    
     def wait_for_data(self, key: str, timeout: int = 60, check_interval: int = 2):
-        """等待特定数据出现。"""
+        """等待特定数据出现，共享数据和记录集（.jsonl）都算。"""
         self.log_event("wait_for_data_start", f"等待数据 '{key}'")
         
         start_time = time.time()
         
-        while time.time() - start_time < timeout:
-            data = self.dm.load_shared_data(key)
-            if data is not None:
-                self.log_event("wait_for_data_success", f"数据 '{key}' 已可用")
-                return data
-            
-            time.sleep(check_interval)
+        with self.trace.span(f"wait:{key}", "data_wait", tid=TRACK_DATA_WAIT):
+            while time.time() - start_time < timeout:
+                data = self.dm.load_shared_data_or_records(key)
+                if data is not None:
+                    self.log_event("wait_for_data_success", f"数据 '{key}' 已可用")
+                    return data
+                
+                time.sleep(check_interval)
         
         self.log_event("wait_for_data_timeout", f"等待数据 '{key}' 超时")
         return None
     
     def check_data_dependencies(self, required_keys: list):
-        """检查数据依赖是否满足。"""
+        """检查数据依赖是否满足（共享数据或记录集）。"""
         missing_keys = []
         available_keys = []
         
         for key in required_keys:
-            data = self.dm.load_shared_data(key)
+            data = self.dm.load_shared_data_or_records(key)
             if data is not None:
                 available_keys.append(key)
             else:
@@ -134,54 +588,181 @@ class DataCoordinator:
         
         return len(missing_keys) == 0, missing_keys
     
-    def orchestrate_data_pipeline(self):
-        """协调整个数据处理流水线。"""
-        print("\n🚀 开始协调数据处理流水线")
-        
-        # 第一步：清理旧数据
-        self.clear_shared_data()
+    def _get_stage_cache(self) -> StageCache:
+        """懒加载阶段缓存。"""
+        if self._stage_cache is None:
+            self._stage_cache = StageCache(self.dm)
+        return self._stage_cache
+    
+    def run_stage(self, stage: dict, use_cache: bool = False) -> bool:
+        """运行流水线中的一个阶段。
         
-        # 第二步：运行数据生产者
-        producer_path = Path(__file__).parent / "file_a_producer.py"
-        if producer_path.exists():
-            print("\n📊 步骤1: 运行数据生产者")
-            success = self.run_python_file(str(producer_path))
+        Args:
+            stage: 阶段定义（见 build_pipeline_stages）
+            use_cache: 是否启用指纹缓存，指纹未变化时复用上次的输出
             
-            if not success:
-                self.log_event("pipeline_error", "数据生产者执行失败，停止流水线")
-                return False
+        Returns:
+            bool: 阶段成功（或命中缓存）返回True
+        """
+        stage_path = Path(__file__).parent / stage["file"]
+        if not stage_path.exists():
+            self.log_event("pipeline_error", f"找不到阶段文件: {stage_path}")
+            return False
+        
+        resolved_stage = dict(stage, file=str(stage_path))
+        stage_start = time.time()
+        with self.trace.span(f"stage:{stage['name']}", "stage", args={"file": stage["file"]}):
+            success = self._run_stage_body(stage, stage_path, resolved_stage, use_cache)
+        self._trace_key_writes(stage, stage_start)
+        return success
+    
+    def _trace_key_writes(self, stage: dict, since: float):
+        """把阶段执行期间写入的输出数据记录为时间线上的瞬时事件。"""
+        for key in stage.get("outputs", []):
+            info = self.dm.get_data_info(key)
+            if info and info.get("exists") and info["modified_time"] >= since:
+                self.trace.add_instant(f"write:{key}", info["modified_time"], "data_write", args={
+                    "size_bytes": info["size_bytes"]
+                })
+    
+    def export_trace(self, path: str = None) -> Path:
+        """导出Chrome/Perfetto trace-event JSON，默认保存到 data/traces/<运行ID>.json。"""
+        if path is None:
+            run_id = self.current_run_id or self.start_time.strftime("%Y%m%d_%H%M%S")
+            path = self.dm.data_dir / "traces" / f"{run_id}.json"
+        trace_path = self.trace.save(path)
+        self.log_event("trace_exported", f"时间线已导出: {trace_path}")
+        return trace_path
+    
+    def _run_stage_body(self, stage: dict, stage_path: Path, resolved_stage: dict, use_cache: bool) -> bool:
+        """run_stage 的主体：先查阶段缓存，未命中时执行阶段脚本。"""
+        fingerprint = None
+        
+        if use_cache:
+            cache = self._get_stage_cache()
+            fingerprint = cache.fingerprint(resolved_stage)
+            entry = cache.lookup(resolved_stage, fingerprint)
+            if entry:
+                cache_start = time.perf_counter()
+                restored = cache.restore(entry)
+                self.record_stage_profile(stage_path.name, {
+                    "returncode": 0,
+                    "metrics": {"wall_time_seconds": round(time.perf_counter() - cache_start, 6)}
+                }, cache_hit=True)
+                self.log_event("stage_cache_hit", f"阶段 {stage['name']} 未变化，复用缓存输出", {
+                    "fingerprint": fingerprint,
+                    "restored_keys": restored
+                })
+                return True
+            self.log_event("stage_cache_miss", f"阶段 {stage['name']} 指纹已变化，重新执行", {
+                "fingerprint": fingerprint
+            })
+        
+        limits = dict(self.stage_limits, **stage.get("limits", {}))
+        attempts = 1 + int(limits.get("retries", 0))
+        
+        for attempt in range(1, attempts + 1):
+            success = self.run_python_file(str(stage_path), limits=limits, argv=stage_argv(stage))
+            if success or self.last_termination_reason not in RETRYABLE_REASONS:
+                break
+            if attempt < attempts:
+                self.log_event("stage_retry", f"阶段 {stage['name']} 第 {attempt} 次执行被终止，重试", {
+                    "reason": self.last_termination_reason,
+                    "attempt": attempt + 1
+                })
+        
+        if success and use_cache:
+            self._get_stage_cache().store(resolved_stage, fingerprint)
+        return success
+    
+    def orchestrate_data_pipeline(self, use_cache: bool = False):
+        """协调整个数据处理流水线。
+        
+        每次运行都会在 data/runs/ 下保存运行清单，失败后可以用 resume(run_id) 从检查点恢复。
+        
+        Args:
+            use_cache: 增量模式，保留已有数据并跳过指纹未变化的阶段
+        """
+        print("\n🚀 开始协调数据处理流水线")
+        manifest = self.run_manifests.create(self.pipeline_stages)
+        self.current_run_id = manifest["run_id"]
+        self.log_event("pipeline_run_created", f"运行ID: {manifest['run_id']}")
+        
+        # 第一步：清理旧数据（增量模式下保留，由阶段缓存判断是否需要重算）
+        if use_cache:
+            self.log_event("pipeline_incremental", "增量模式：跳过数据清理，复用未变化阶段的输出")
         else:
-            self.log_event("pipeline_error", f"找不到数据生产者文件: {producer_path}")
+            self.clear_shared_data()
+        
+        return self._execute_stages(manifest, self.pipeline_stages, use_cache)
+    
+    def resume(self, run_id: str = None, use_cache: bool = False):
+        """从检查点恢复失败的流水线，只重新执行失败的阶段及其下游阶段。
+        
+        Args:
+            run_id: 要恢复的运行ID，默认为最近一次失败的运行
+            use_cache: 重新执行的阶段是否使用指纹缓存
+        """
+        run_id = run_id or self.run_manifests.latest_failed_run()
+        manifest = self.run_manifests.load(run_id) if run_id else None
+        if manifest is None:
+            self.log_event("pipeline_error", f"找不到可恢复的运行: {run_id}")
             return False
         
-        # 第三步：等待关键数据
-        print("\n⏳ 步骤2: 等待关键数据生成")
-        required_data = ["excel_processing_result", "users", "projects"]
+        start_index = self.run_manifests.first_stage_to_rerun(manifest, self.pipeline_stages)
+        if start_index is None:
+            self.log_event("pipeline_resume", f"运行 {run_id} 的所有阶段均已完成，无需恢复")
+            return True
         
-        for key in required_data:
-            data = self.wait_for_data(key, timeout=30)
-            if data is None:
-                self.log_event("pipeline_error", f"关键数据 '{key}' 未能及时生成")
-                return False
+        stages = self.pipeline_stages[start_index:]
+        manifest["resume_count"] = manifest.get("resume_count", 0) + 1
+        manifest["status"] = "running"
+        for stage in stages:
+            manifest["stages"][stage["name"]] = {"status": "pending", "outputs": {}}
+        self.run_manifests.save(manifest)
+        self.current_run_id = run_id
         
-        # 第四步：运行数据消费者
-        consumer_path = Path(__file__).parent / "file_b_consumer.py"
-        if consumer_path.exists():
-            print("\n📈 步骤3: 运行数据消费者")
-            success = self.run_python_file(str(consumer_path))
+        print(f"\n♻️ 从检查点恢复流水线: {run_id}")
+        self.log_event("pipeline_resume", f"恢复运行 {run_id}", {
+            "skipped": [stage["name"] for stage in self.pipeline_stages[:start_index]],
+            "rerun": [stage["name"] for stage in stages]
+        })
+        return self._execute_stages(manifest, stages, use_cache)
+    
+    def _execute_stages(self, manifest: dict, stages: list, use_cache: bool):
+        """依次执行阶段并在每个阶段结束后写入检查点。"""
+        # 每次运行单独记录时间线，导出的trace只包含本次运行的事件
+        self.trace = TraceRecorder()
+        for step, stage in enumerate(stages, 1):
+            print(f"\n步骤{step}: {stage['title']}")
+            success = self.run_stage(stage, use_cache=use_cache)
             
+            if success:
+                # 等待阶段产出的关键数据
+                for key in stage.get("wait_for", []):
+                    if self.wait_for_data(key, timeout=30) is None:
+                        self.log_event("pipeline_error", f"关键数据 '{key}' 未能及时生成")
+                        success = False
+                        break
+            elif stage.get("error_message"):
+                self.log_event("pipeline_error", stage["error_message"])
+            
+            self.run_manifests.mark_stage(manifest, stage, success)
             if not success:
-                self.log_event("pipeline_error", "数据消费者执行失败")
+                manifest["status"] = "failed"
+                self.run_manifests.save(manifest)
+                self.export_trace()
+                print(f"💾 检查点已保存，可使用 resume('{manifest['run_id']}') 恢复")
                 return False
-        else:
-            self.log_event("pipeline_error", f"找不到数据消费者文件: {consumer_path}")
-            return False
         
-        # 第五步：生成最终报告
-        print("\n📋 步骤4: 生成最终报告")
-        self.generate_final_report()
+        print("\n📋 生成最终报告")
+        with self.trace.span("generate_final_report", "report"):
+            self.generate_final_report()
         
-        self.log_event("pipeline_success", "数据处理流水线执行完成")
+        manifest["status"] = "completed"
+        self.run_manifests.save(manifest)
+        self.export_trace()
+        self.log_event("pipeline_success", "数据处理流水线执行完成", {"run_id": manifest["run_id"]})
         return True
     
     def generate_final_report(self):
@@ -190,6 +771,7 @@ class DataCoordinator:
         
         report = {
             "pipeline_execution": {
+                "run_id": self.current_run_id,
                 "start_time": self.start_time.isoformat(),
                 "end_time": datetime.now().isoformat(),
                 "duration_seconds": (datetime.now() - self.start_time).total_seconds(),
@@ -200,6 +782,8 @@ class DataCoordinator:
                 "data_files": all_data
             },
             "execution_events": len(self.execution_log),
+            "stage_profiles": self.stage_profiles,
+            "watchdog_events": self.watchdog_events,
             "recommendations": []
         }
         
@@ -226,6 +810,15 @@ class DataCoordinator:
         print(f"⏱️ 执行时间: {report['pipeline_execution']['duration_seconds']:.2f} 秒")
         print(f"📁 生成数据文件: {report['data_summary']['total_data_files']} 个")
         print(f"📝 执行事件: {report['execution_events']} 个")
+        if self.stage_profiles:
+            print("\n⏱️ 阶段耗时:")
+            for profile in self.stage_profiles:
+                cpu = profile.get("cpu_time_seconds")
+                rss = profile.get("peak_rss_bytes")
+                print(f"  {profile['stage']} [{profile['execution_mode']}]: "
+                      f"墙钟 {profile.get('wall_time_seconds') or 0:.3f}s, "
+                      f"CPU {cpu if cpu is not None else '-'}s, "
+                      f"峰值内存 {rss / 1024 / 1024 if rss else 0:.1f} MB")
         print("\n🎯 执行结果:")
         for rec in report["recommendations"]:
             print(f"  {rec}")
@@ -257,9 +850,236 @@ class DataCoordinator:
         
         print("👁️ 监控结束")
 
-def run_interactive_demo():
+def _parse_cron_field(field: str, low: int, high: int) -> set:
+    """解析cron表达式的一个字段，支持 *、*/n、a-b、a-b/n 和逗号列表。"""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or step <= 0:
+            raise ValueError(f"cron字段超出范围: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """简化的5字段cron表达式：分 时 日 月 周（周日为0）。
+    
+    与标准cron一致：日和周两个字段都有限制（都不以 * 开头）时，满足任意一个即可，
+    例如 "0 9 1 * 1" 在每月1日和每个周一的9点触发；否则两个字段需同时满足。
+    """
+    
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式需要5个字段: {expression}")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_cron_field(fields[4], 0, 7)}
+        self.day_or_weekday = not fields[2].startswith("*") and not fields[4].startswith("*")
+    
+    def matches(self, moment: datetime) -> bool:
+        if not (moment.minute in self.minutes and moment.hour in self.hours and moment.month in self.months):
+            return False
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        return day_match or weekday_match if self.day_or_weekday else day_match and weekday_match
+    
+    def next_after(self, moment: datetime) -> datetime:
+        """返回严格晚于 moment 的下一个触发时刻（精确到分钟）。"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 24 * 60):
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        raise ValueError(f"cron表达式在一年内没有触发时刻: {self.expression}")
+
+
+def _process_exists(pid: int) -> bool:
+    """判断进程是否仍在运行。
+    
+    POSIX上用信号0探测；Windows上 os.kill 会直接终止目标进程，因此改用 OpenProcess 查询退出码。
+    """
+    if os.name == "posix":
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # 进程存在但属于其他用户
+            return True
+        return True
+    
+    import ctypes
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    ERROR_ACCESS_DENIED = 5
+    STILL_ACTIVE = 259
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+    try:
+        exit_code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return True
+        return exit_code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+class PipelineScheduler:
+    """流水线调度器：按固定间隔或cron表达式运行，也可以在输入文件变化时触发。
+    
+    - 单飞保护：通过数据目录下的锁文件保证同一时间只有一个流水线在运行（包括其他进程）
+    - 错过合并：一次运行耗时超过多个周期时，错过的触发只补跑一次
+    - 代码更新：常驻进程执行模式下，项目模块被修改后下一次运行前重新导入（见 stage_runner），
+      不会用旧代码产生结果并写入新指纹的缓存
+    """
+    
+    def __init__(self, coordinator: DataCoordinator, interval_seconds: float = None,
+                 cron: str = None, watch_paths: list = None, poll_interval: float = 1.0,
+                 use_cache: bool = True):
+        """初始化调度器。
+        
+        Args:
+            coordinator: 用于运行流水线的数据协调器
+            interval_seconds: 固定运行间隔（秒）
+            cron: cron表达式，例如 "*/15 * * * *"
+            watch_paths: 变化时触发运行的输入文件
+            poll_interval: 检查触发条件的间隔（秒）
+            use_cache: 是否以增量模式运行流水线
+        """
+        if not interval_seconds and not cron and not watch_paths:
+            raise ValueError("至少需要指定 interval_seconds、cron 或 watch_paths 之一")
+        if interval_seconds and cron:
+            raise ValueError("interval_seconds 和 cron 不能同时指定")
+        
+        self.coordinator = coordinator
+        self.interval_seconds = interval_seconds
+        self.cron = CronSchedule(cron) if cron else None
+        self.watch_paths = [Path(p) for p in (watch_paths or [])]
+        self.poll_interval = poll_interval
+        self.use_cache = use_cache
+        self.lock_path = coordinator.dm.data_dir / "pipeline.lock"
+        self.run_count = 0
+        self._file_states = {p: self._file_state(p) for p in self.watch_paths}
+        self._next_tick = self._compute_next_tick(datetime.now())
+    
+    def _compute_next_tick(self, after: datetime):
+        if self.interval_seconds:
+            return after + timedelta(seconds=self.interval_seconds)
+        if self.cron:
+            return self.cron.next_after(after)
+        return None
+    
+    @staticmethod
+    def _file_state(path: Path):
+        try:
+            stat = path.stat()
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+    
+    def _changed_files(self) -> list:
+        changed = []
+        for path in self.watch_paths:
+            state = self._file_state(path)
+            if state != self._file_states[path]:
+                self._file_states[path] = state
+                changed.append(str(path))
+        return changed
+    
+    def _acquire_lock(self) -> bool:
+        """创建锁文件；锁的持有进程已不存在时视为过期锁并接管。"""
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, "w") as f:
+                    f.write(str(os.getpid()))
+                return True
+            except FileExistsError:
+                try:
+                    owner_pid = int(self.lock_path.read_text().strip() or 0)
+                except ValueError:
+                    owner_pid = None
+                except FileNotFoundError:
+                    return False
+                # 内容为空说明另一个进程刚创建锁、还没写入PID，视为已被持有
+                if owner_pid == 0 or (owner_pid is not None and _process_exists(owner_pid)):
+                    return False
+                self.lock_path.unlink(missing_ok=True)
+        return False
+    
+    def _release_lock(self):
+        self.lock_path.unlink(missing_ok=True)
+    
+    def run_once(self, trigger: str, details: dict = None) -> bool:
+        """在单飞保护下运行一次流水线；已有运行时直接跳过。"""
+        if not self._acquire_lock():
+            self.coordinator.log_event("schedule_skipped", f"流水线正在运行，跳过本次触发 ({trigger})")
+            return False
+        
+        try:
+            self.coordinator.log_event("schedule_triggered", f"调度触发流水线: {trigger}", details)
+            self.run_count += 1
+            return self.coordinator.orchestrate_data_pipeline(use_cache=self.use_cache)
+        finally:
+            self._release_lock()
+    
+    def tick(self) -> bool:
+        """检查一次触发条件，需要时运行流水线。返回是否运行了流水线。"""
+        now = datetime.now()
+        changed = self._changed_files()
+        due = self._next_tick is not None and now >= self._next_tick
+        if not changed and not due:
+            return False
+        
+        if due:
+            # 合并错过的触发：无论错过多少个周期，只运行一次
+            missed = 0
+            next_tick = self._compute_next_tick(self._next_tick)
+            while next_tick <= now:
+                missed += 1
+                next_tick = self._compute_next_tick(next_tick)
+            if missed:
+                self.coordinator.log_event("schedule_coalesced", f"合并了 {missed} 个错过的触发")
+            self._next_tick = next_tick
+        
+        trigger = "file_change" if changed else "schedule"
+        self.run_once(trigger, {"changed_files": changed} if changed else None)
+        
+        # 运行期间又到期的周期在下一次tick中合并处理
+        return True
+    
+    def run_forever(self, max_runs: int = None):
+        """持续调度，直到达到 max_runs 或被 Ctrl+C 中断。"""
+        print(f"⏰ 调度器启动: 间隔={self.interval_seconds} cron={self.cron and self.cron.expression} "
+              f"监视文件={[str(p) for p in self.watch_paths]}")
+        try:
+            while max_runs is None or self.run_count < max_runs:
+                self.tick()
+                sleep_seconds = self.poll_interval
+                if self._next_tick is not None:
+                    until_tick = (self._next_tick - datetime.now()).total_seconds()
+                    sleep_seconds = max(0, min(sleep_seconds, until_tick))
+                time.sleep(sleep_seconds)
+        except KeyboardInterrupt:
+            print("\n⏰ 调度器已停止")
+
+def run_interactive_demo(excel_path: str = None):
     """运行交互式演示。"""
-    coordinator = DataCoordinator()
+    coordinator = DataCoordinator(excel_path=excel_path)
     
     while True:
         print("\n" + "="*50)
@@ -272,9 +1092,11 @@ def run_interactive_demo():
         print("5. 运行数据消费者")
         print("6. 生成执行报告")
         print("7. 监控数据变化")
+        print("8. 增量运行流水线（跳过未变化的阶段）")
+        print("9. 从检查点恢复失败的流水线")
         print("0. 退出")
         
-        choice = input("\n请选择操作 (0-7): ").strip()
+        choice = input("\n请选择操作 (0-9): ").strip()
         
         if choice == "1":
             coordinator.orchestrate_data_pipeline()
@@ -289,7 +1111,7 @@ def run_interactive_demo():
                 print(f"  📄 {key}: {size:.2f} KB")
         elif choice == "4":
             producer_path = Path(__file__).parent / "file_a_producer.py"
-            coordinator.run_python_file(str(producer_path))
+            coordinator.run_python_file(str(producer_path), argv=stage_argv(coordinator.pipeline_stages[0]))
         elif choice == "5":
             consumer_path = Path(__file__).parent / "file_b_consumer.py"
             coordinator.run_python_file(str(consumer_path))
@@ -299,6 +1121,11 @@ def run_interactive_demo():
             duration = input("监控时长（秒，默认60）: ").strip()
             duration = int(duration) if duration.isdigit() else 60
             coordinator.monitor_data_changes(duration)
+        elif choice == "8":
+            coordinator.orchestrate_data_pipeline(use_cache=True)
+        elif choice == "9":
+            run_id = input("运行ID（留空表示最近一次失败的运行）: ").strip()
+            coordinator.resume(run_id or None)
         elif choice == "0":
             print("👋 再见！")
             break
@@ -306,21 +1133,40 @@ def run_interactive_demo():
             print("❌ 无效选择，请重试")
 
 if __name__ == "__main__":
+    # 输入文件: python data_coordinator.py --excel-path <路径>，默认为 EXCEL_INPUT_PATH
+    excel_path = sys.argv[sys.argv.index("--excel-path") + 1] if "--excel-path" in sys.argv else None
+    
     print("🎯 数据协调器启动")
     print("选择运行模式:")
     print("1. 自动运行完整流水线")
     print("2. 交互式演示")
+    print("3. 自动运行完整流水线（进程内执行，跳过解释器启动）")
+    print("4. 定时调度模式")
     
-    mode = input("请选择 (1-2): ").strip()
+    mode = input("请选择 (1-4): ").strip()
     
-    if mode == "1":
-        coordinator = DataCoordinator()
+    if mode in ("1", "3"):
+        coordinator = DataCoordinator(execution_mode="inprocess" if mode == "3" else "subprocess",
+                                      excel_path=excel_path)
         success = coordinator.orchestrate_data_pipeline()
+        coordinator.shutdown()
         if success:
             print("\n🎉 流水线执行成功！")
         else:
             print("\n❌ 流水线执行失败！")
     elif mode == "2":
-        run_interactive_demo()
+        run_interactive_demo(excel_path)
+    elif mode == "4":
+        schedule = input("运行间隔秒数或cron表达式（例如 300 或 */15 * * * *）: ").strip()
+        watch = input("输入文件变化时也触发？(y/N): ").strip().lower() == "y"
+        coordinator = DataCoordinator(execution_mode="inprocess", excel_path=excel_path)
+        scheduler = PipelineScheduler(
+            coordinator,
+            interval_seconds=float(schedule) if schedule.replace(".", "", 1).isdigit() else None,
+            cron=None if schedule.replace(".", "", 1).isdigit() else schedule,
+            watch_paths=[coordinator.excel_path] if watch else None
+        )
+        scheduler.run_forever()
+        scheduler.coordinator.shutdown()
     else:
         print("❌ 无效选择")
\ No newline at end of file
@@ -4,7 +4,7 @@ import json
 import os
 from pathlib import Path
 from typing import Any, Optional, Dict
-from utils import get_model_settings, find_project_root
+from utils import get_model_settings, find_project_root, compute_file_hash
 
 
 class DataManager:
@@ -42,8 +42,12 @@ class DataManager:
         """
         try:
             file_path = self.data_dir / f"{key}.json"
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            # 先完整序列化，再写临时文件并替换：序列化失败或写入中断都不会留下半截文件
+            content = json.dumps(data, ensure_ascii=False, indent=2)
+            temp_path = file_path.with_name(f".{file_path.name}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(temp_path, file_path)
             print(f"数据已保存: {key} -> {file_path}")
             return True
         except Exception as e:
@@ -77,8 +81,18 @@ class DataManager:
             print(f"加载数据失败: {key}, 错误: {e}")
             return default
     
+    def load_shared_data_or_records(self, key: str, default: Any = None) -> Any:
+        """加载共享数据；没有JSON文件时读取同名的记录集（见 append_shared_records）。
+        
+        Returns:
+            加载的数据或记录列表，两者都不存在时返回default
+        """
+        if (self.data_dir / f"{key}.json").exists():
+            return self.load_shared_data(key, default)
+        return self.load_shared_records(key, default)
+    
     def delete_shared_data(self, key: str) -> bool:
-        """删除共享数据文件。
+        """删除共享数据文件，以及同名的记录集。
         
         Args:
             key: 数据的唯一标识符
@@ -87,9 +101,11 @@ class DataManager:
             bool: 删除成功返回True，失败返回False
         """
         try:
-            file_path = self.data_dir / f"{key}.json"
-            if file_path.exists():
-                file_path.unlink()
+            file_paths = [self.data_dir / f"{key}{suffix}" for suffix in (".json", ".jsonl")]
+            existing = [p for p in file_paths if p.exists()]
+            if existing:
+                for file_path in existing:
+                    file_path.unlink()
                 print(f"数据已删除: {key}")
                 return True
             else:
@@ -100,14 +116,15 @@ class DataManager:
             return False
     
     def list_shared_data(self) -> list:
-        """列出所有共享数据的键名。
+        """列出所有共享数据的键名，包括只有记录集（.jsonl）的键。
         
         Returns:
             list: 所有数据键名的列表
         """
         try:
-            json_files = list(self.data_dir.glob("*.json"))
-            keys = [f.stem for f in json_files]  # 获取不带扩展名的文件名
+            json_files = list(self.data_dir.glob("*.json")) + list(self.data_dir.glob("*.jsonl"))
+            # 获取不带扩展名的文件名，同时有两种文件的键只列出一次
+            keys = list(dict.fromkeys(f.stem for f in json_files))
             print(f"共享数据列表: {keys}")
             return keys
         except Exception as e:
@@ -143,7 +160,7 @@ class DataManager:
             return False
     
     def get_data_info(self, key: str) -> Optional[Dict]:
-        """获取数据文件的信息。
+        """获取数据文件的信息；没有JSON文件时返回同名记录集的信息。
         
         Args:
             key: 数据的唯一标识符
@@ -153,6 +170,8 @@ class DataManager:
         """
         try:
             file_path = self.data_dir / f"{key}.json"
+            if not file_path.exists():
+                file_path = self.data_dir / f"{key}.jsonl"
             if file_path.exists():
                 stat = file_path.stat()
                 return {
@@ -168,6 +187,136 @@ class DataManager:
             print(f"获取文件信息失败: {key}, 错误: {e}")
             return None
 
+    def scan_shared_data_info(self, suffix: str = ".json") -> Dict[str, Dict]:
+        """一次遍历数据目录，获取所有共享数据的文件信息（不读取内容）。
+
+        Args:
+            suffix: 文件后缀，".json" 为共享数据，".jsonl" 为 append_shared_records 写入的记录集
+
+        Returns:
+            键名到文件信息的字典，字段与 get_data_info 一致，另有纳秒精度的 modified_ns
+        """
+        infos = {}
+        try:
+            with os.scandir(self.data_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(suffix) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    infos[entry.name[:-len(suffix)]] = {
+                        "file_path": entry.path,
+                        "size_bytes": stat.st_size,
+                        "created_time": stat.st_ctime,
+                        "modified_time": stat.st_mtime,
+                        "modified_ns": stat.st_mtime_ns,
+                        "exists": True
+                    }
+        except Exception as e:
+            print(f"扫描数据目录失败, 错误: {e}")
+        return infos
+
+    def load_shared_data_batch(self, keys: list, max_workers: int = 8) -> Dict[str, Any]:
+        """在线程池中并发读取多个共享数据，每个文件只解析一次。
+
+        Args:
+            keys: 要读取的键名列表
+            max_workers: 线程数量
+
+        Returns:
+            键名到数据的字典，读取或解析失败的键值为None
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        def read(key):
+            try:
+                with open(self.data_dir / f"{key}.json", "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(keys, executor.map(read, keys)))
+
+    def get_data_hash(self, key: str) -> Optional[str]:
+        """获取数据文件内容的哈希值，用于判断数据是否发生变化；没有JSON文件时为同名记录集的哈希。
+        
+        Args:
+            key: 数据的唯一标识符
+            
+        Returns:
+            SHA-256哈希字符串，如果文件不存在返回None
+        """
+        file_path = self.data_dir / f"{key}.json"
+        if not file_path.exists():
+            file_path = self.data_dir / f"{key}.jsonl"
+        return compute_file_hash(file_path)
+
+    def append_shared_records(self, key: str, records: list, reset: bool = False) -> bool:
+        """向只追加的记录集追加记录（JSON Lines文件，每行一条记录）。
+
+        与 save_shared_data 不同，追加只写入新记录，不需要重写已有数据。
+
+        Args:
+            key: 记录集的唯一标识符
+            records: 要追加的记录列表（必须可JSON序列化）
+            reset: 是否先清空已有记录
+
+        Returns:
+            bool: 追加成功返回True，失败返回False
+        """
+        try:
+            file_path = self.data_dir / f"{key}.jsonl"
+            with open(file_path, "w" if reset else "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            print(f"记录已追加: {key} (+{len(records)}) -> {file_path}")
+            return True
+        except Exception as e:
+            print(f"追加记录失败: {key}, 错误: {e}")
+            return False
+
+    def get_records_size(self, key: str) -> Optional[int]:
+        """获取记录集文件的字节数，文件不存在时返回None。"""
+        try:
+            return (self.data_dir / f"{key}.jsonl").stat().st_size
+        except OSError:
+            return None
+
+    def truncate_shared_records(self, key: str, size: int) -> bool:
+        """把记录集截断到指定字节数，丢弃之后追加的记录（用于撤销未完成的追加）。
+
+        Args:
+            key: 记录集的唯一标识符
+            size: 保留的字节数，应为某次追加结束时的文件大小
+
+        Returns:
+            bool: 截断成功返回True，失败返回False
+        """
+        try:
+            os.truncate(self.data_dir / f"{key}.jsonl", size)
+            print(f"记录已截断: {key} -> {size} 字节")
+            return True
+        except Exception as e:
+            print(f"截断记录失败: {key}, 错误: {e}")
+            return False
+
+    def load_shared_records(self, key: str, default: Any = None) -> Any:
+        """读取 append_shared_records 写入的全部记录。
+
+        Returns:
+            记录列表，如果文件不存在或加载失败则返回default
+        """
+        try:
+            file_path = self.data_dir / f"{key}.jsonl"
+            if not file_path.exists():
+                print(f"记录文件不存在: {key}")
+                return default
+            with open(file_path, "r", encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except Exception as e:
+            print(f"加载记录失败: {key}, 错误: {e}")
+            return default
+
 
 # 创建全局数据管理器实例
 _global_data_manager = None
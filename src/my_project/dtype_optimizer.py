@@ -0,0 +1,173 @@
+"""数据类型压缩 - 为读入的DataFrame推断并应用更紧凑的dtype
+- 整数列降为能容纳取值范围的最小整数类型
+- 只含整数和空值的浮点列转为可空整数（Int8/UInt16等）
+- 可以无损表示为float32的浮点列转为float32
+- 低基数的字符串列转为category，只含布尔值和空值的列转为可空boolean
+
+推断出的类型表（schema）按 "文件路径::工作表" 保存在共享数据 "dtype_schemas" 中，
+之后的运行直接应用；数据变化导致某列无法安全转换时，只重新推断该列。
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+SCHEMA_STORE_KEY = "dtype_schemas"
+
+# 唯一值占非空值的比例不超过该值的字符串列转为category
+CATEGORY_RATIO = 0.5
+
+_INT_CANDIDATES = [np.int8, np.int16, np.int32, np.int64]
+_UINT_CANDIDATES = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+
+def _smallest_int(low, high) -> Optional[str]:
+    candidates = _UINT_CANDIDATES if low >= 0 else _INT_CANDIDATES
+    for candidate in candidates:
+        info = np.iinfo(candidate)
+        if info.min <= low and high <= info.max:
+            return np.dtype(candidate).name
+    return None
+
+
+def _nullable_int_name(name: str) -> str:
+    """numpy整数类型名对应的可空整数类型名，例如 int8 -> Int8、uint16 -> UInt16。"""
+    return "UInt" + name[4:] if name.startswith("uint") else name.capitalize()
+
+
+def _is_integral(values: pd.Series) -> bool:
+    array = values.to_numpy(dtype=np.float64)
+    return bool(np.all(np.isfinite(array)) and np.all(np.mod(array, 1) == 0))
+
+
+def _float32_lossless(values: pd.Series) -> bool:
+    array = values.to_numpy(dtype=np.float64)
+    with np.errstate(over="ignore"):
+        return bool(np.array_equal(array.astype(np.float32).astype(np.float64), array, equal_nan=True))
+
+
+def infer_column_dtype(series: pd.Series) -> str:
+    """推断单列的紧凑dtype，无法压缩时返回原dtype名称。"""
+    current = str(series.dtype)
+    values = series.dropna()
+    if len(values) == 0 or ptypes.is_bool_dtype(series) or ptypes.is_datetime64_any_dtype(series):
+        return current
+
+    if ptypes.is_integer_dtype(series) or (ptypes.is_float_dtype(series) and _is_integral(values)):
+        name = _smallest_int(values.min(), values.max())
+        if name is None:
+            return current
+        nullable = len(values) < len(series) or ptypes.is_extension_array_dtype(series)
+        return _nullable_int_name(name) if nullable else name
+
+    if ptypes.is_float_dtype(series):
+        return "float32" if _float32_lossless(values) else current
+
+    if current == "object" or ptypes.is_string_dtype(series):
+        inferred = ptypes.infer_dtype(values, skipna=True)
+        if inferred == "boolean":
+            return "boolean"
+        if inferred == "string" and values.nunique() <= CATEGORY_RATIO * len(values):
+            return "category"
+    return current
+
+
+def infer_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """推断整张表的紧凑dtype。"""
+    return {str(column): infer_column_dtype(df[column]) for column in df.columns}
+
+
+def _can_cast(series: pd.Series, dtype: str) -> bool:
+    """检查按已保存的schema转换是否安全（不溢出、不丢精度）。"""
+    values = series.dropna()
+    if dtype == str(series.dtype) or dtype == "category":
+        return True
+    if dtype == "boolean":
+        return ptypes.is_bool_dtype(series) or ptypes.infer_dtype(values, skipna=True) == "boolean"
+    if dtype == "float32":
+        return ptypes.is_numeric_dtype(series) and _float32_lossless(values)
+
+    target = np.dtype(dtype.lower())
+    if target.kind not in "iu" or not ptypes.is_numeric_dtype(series) or ptypes.is_bool_dtype(series):
+        return False
+    if len(values) < len(series) and dtype.islower():
+        # numpy整数类型不能表示空值
+        return False
+    if len(values) == 0:
+        return True
+    info = np.iinfo(target)
+    return _is_integral(values) and info.min <= values.min() and values.max() <= info.max
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """按schema转换各列；不安全的列重新推断。
+
+    Returns:
+        (转换后的DataFrame, 实际使用的schema)
+    """
+    applied = {}
+    result = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        dtype = schema.get(str(column))
+        if dtype is None or not _can_cast(series, dtype):
+            dtype = infer_column_dtype(series)
+        applied[str(column)] = dtype
+        if dtype != str(series.dtype):
+            result[column] = series.astype(dtype)
+    return result, applied
+
+
+def optimize_dtypes(df: pd.DataFrame, schema: Optional[Dict[str, str]] = None) -> Tuple[pd.DataFrame, Dict]:
+    """压缩DataFrame的dtype并报告内存变化。
+
+    Args:
+        df: 要压缩的DataFrame
+        schema: 之前保存的schema；为None时重新推断
+
+    Returns:
+        (压缩后的DataFrame, 报告)，报告包含 memory_before_bytes、memory_after_bytes、
+        schema，以及 schema_reused（是否直接使用了保存的schema）
+    """
+    memory_before = int(df.memory_usage(deep=True).sum())
+    if schema is None:
+        optimized, applied = apply_schema(df, infer_schema(df))
+    else:
+        optimized, applied = apply_schema(df, schema)
+    memory_after = int(optimized.memory_usage(deep=True).sum())
+
+    return optimized, {
+        "memory_before_bytes": memory_before,
+        "memory_after_bytes": memory_after,
+        "memory_saved_ratio": round(1 - memory_after / memory_before, 4) if memory_before else 0.0,
+        "schema": applied,
+        "schema_reused": schema is not None and applied == schema,
+    }
+
+
+def schema_source_key(excel_path: str, sheet_name) -> str:
+    """schema在共享数据中的键。"""
+    return f"{Path(excel_path).resolve()}::{sheet_name}"
+
+
+def load_schemas() -> Dict[str, Dict[str, str]]:
+    """读取所有保存的schema，键见 schema_source_key。"""
+    from data_manager import get_data_manager
+    entries = get_data_manager().load_shared_data(SCHEMA_STORE_KEY, {})
+    return {key: entry["schema"] for key, entry in entries.items()}
+
+
+def save_schemas(schemas: Dict[str, Dict[str, str]]):
+    """合并保存若干个schema供下次运行使用（在主进程中一次性写入）。"""
+    if not schemas:
+        return
+    from data_manager import get_data_manager
+    dm = get_data_manager()
+    entries = dm.load_shared_data(SCHEMA_STORE_KEY, {})
+    for key, schema in schemas.items():
+        entries[key] = {"schema": schema, "updated_time": datetime.now().isoformat()}
+    dm.save_shared_data(SCHEMA_STORE_KEY, entries)
@@ -0,0 +1,296 @@
+"""Excel数据摄取 - 分块流式读取工作表并增量计算统计信息
+使用openpyxl的只读模式逐行解析，每次只在内存中保留一个分块，
+峰值内存由分块大小决定，而不是工作表的总行数。
+
+同样支持CSV/TSV和Parquet输入，格式根据文件内容自动识别；
+安装了pyarrow时CSV使用多线程解析，Parquet支持列投影和谓词下推。
+"""
+
+import csv
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from pandas.api import types as ptypes
+from column_profile import TableProfile
+from dtype_optimizer import optimize_dtypes
+from sampling import ReservoirSampler
+
+# 尝试导入pyarrow，如果安装了的话
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 默认每个分块的行数
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def _header_names(raw_header) -> List:
+    """按pandas的规则处理表头：空表头命名为 Unnamed: i，重复列名追加 .1、.2。"""
+    names, seen = [], {}
+    for index, value in enumerate(raw_header):
+        name = f"Unnamed: {index}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_excel_chunks(excel_path: str, sheet_name: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                      skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """逐块读取工作表，每块是一个最多 chunk_rows 行的DataFrame。
+
+    Args:
+        excel_path: Excel文件路径
+        sheet_name: 工作表名称，为None时读取活动工作表
+        chunk_rows: 每个分块的行数
+        skip_rows: 跳过表头之后的前若干数据行
+
+    Yields:
+        列名与表头一致的DataFrame分块
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_names(header)
+
+        buffer = []
+        for index, row in enumerate(rows):
+            if index < skip_rows:
+                continue
+            # 只读模式下行长度可能不一致，按表头补齐或截断
+            row = tuple(row[:len(columns)]) + (None,) * (len(columns) - len(row))
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def detect_format(path: str) -> Tuple[str, Optional[str]]:
+    """根据文件内容识别格式。
+
+    Returns:
+        (格式, 分隔符)，格式为 "excel"、"parquet" 或 "csv"；只有csv有分隔符
+    """
+    with open(path, "rb") as f:
+        head = f.read(64 * 1024)
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"\xd0\xcf\x11\xe0"):
+        # xlsx是zip包，xls是OLE复合文档
+        return "excel", None
+    if head.startswith(b"PAR1"):
+        return "parquet", None
+
+    suffix = Path(path).suffix.lower()
+    if suffix in (".xlsx", ".xlsm", ".xls"):
+        # 扩展名是Excel但内容不是，交给Excel解析器报错
+        return "excel", None
+    if suffix == ".parquet":
+        return "parquet", None
+    if suffix in (".csv", ".tsv"):
+        return "csv", "\t" if suffix == ".tsv" else ","
+    try:
+        dialect = csv.Sniffer().sniff(head.decode("utf-8", errors="ignore"), delimiters=",\t;|")
+        return "csv", dialect.delimiter
+    except csv.Error:
+        return "csv", ","
+
+
+def _apply_filters(df: pd.DataFrame, filters: Optional[List[Tuple]]) -> pd.DataFrame:
+    """按 [(列, 运算符, 值), ...] 过滤行（与pyarrow的filters格式一致）。"""
+    operators = {
+        "==": lambda s, v: s == v, "=": lambda s, v: s == v, "!=": lambda s, v: s != v,
+        ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+        "<": lambda s, v: s < v, "<=": lambda s, v: s <= v,
+        "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+    }
+    for column, op, value in filters or []:
+        df = df[operators[op](df[column], value)]
+    return df
+
+
+def read_table(path: str, sheet_name: Optional[str] = None, columns: Optional[List[str]] = None,
+               filters: Optional[List[Tuple]] = None, use_cache: bool = False) -> pd.DataFrame:
+    """用最快的可用引擎读取Excel、CSV/TSV或Parquet文件。
+
+    Args:
+        path: 文件路径，格式自动识别
+        sheet_name: 工作表名称（仅Excel）
+        columns: 只读取这些列（Parquet和CSV在解析时投影，不读取其他列）
+        filters: 行过滤条件，格式为 [(列, 运算符, 值), ...]；Parquet下推到文件读取
+        use_cache: Excel使用工作簿解析缓存
+    """
+    fmt, delimiter = detect_format(path)
+    if fmt == "parquet":
+        if not PYARROW_AVAILABLE:
+            raise ImportError("读取Parquet需要安装pyarrow: pip install pyarrow")
+        return pd.read_parquet(path, columns=columns, filters=filters)
+
+    if fmt == "csv":
+        # pyarrow引擎多线程解析，否则使用pandas的C解析器
+        df = pd.read_csv(path, sep=delimiter, usecols=columns,
+                         engine="pyarrow" if PYARROW_AVAILABLE else "c")
+    elif use_cache:
+        from workbook_cache import read_excel_cached
+        df = read_excel_cached(path, sheet_name or 0)
+        df = df[columns] if columns else df
+    else:
+        df = pd.read_excel(path, sheet_name=sheet_name or 0, usecols=columns)
+    return _apply_filters(df, filters)
+
+
+def iter_source_chunks(path: str, sheet_name: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                       skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """逐块读取Excel工作表、CSV/TSV或Parquet文件，格式自动识别，参数含义同 iter_excel_chunks。"""
+    fmt, delimiter = detect_format(path)
+    if fmt == "csv":
+        reader = pd.read_csv(path, sep=delimiter, chunksize=chunk_rows,
+                             skiprows=range(1, skip_rows + 1))
+        with reader:
+            yield from reader
+    elif fmt == "parquet":
+        if not PYARROW_AVAILABLE:
+            raise ImportError("读取Parquet需要安装pyarrow: pip install pyarrow")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+    else:
+        yield from iter_excel_chunks(path, sheet_name, chunk_rows, skip_rows)
+
+
+def _column_kind(series: pd.Series) -> Optional[str]:
+    """判断一个分块中某列的类型；全部为空时返回None（不提供类型信息）。"""
+    if series.isna().all():
+        return None
+    if ptypes.is_bool_dtype(series):
+        return "bool"
+    if ptypes.is_numeric_dtype(series):
+        return "number"
+    if ptypes.is_datetime64_any_dtype(series):
+        return "datetime"
+    return "object"
+
+
+class IncrementalStats:
+    """逐块累积 excel_processing_result / excel_stats 所需的统计信息。"""
+
+    def __init__(self, sample_size: int = 3, profile: bool = False, stratify_by: Optional[str] = None,
+                 sample_seed: Optional[int] = None):
+        self.sample_size = sample_size
+        # 样本在全部行上等概率抽取，而不是取开头几行，见 sampling
+        self.sampler = ReservoirSampler(sample_size, stratify_by, sample_seed)
+        # 可选的逐列统计（空值、分布、去重数、高频值），见 column_profile
+        self.profile = TableProfile() if profile else None
+        self.columns: List[str] = []
+        self.row_count = 0
+        self._kinds: Dict[str, set] = {}
+
+    def update(self, chunk: pd.DataFrame) -> "IncrementalStats":
+        """合并一个分块的统计信息。"""
+        for column in chunk.columns:
+            if column not in self._kinds:
+                self.columns.append(column)
+                self._kinds[column] = set()
+            kind = _column_kind(chunk[column])
+            if kind:
+                self._kinds[column].add(kind)
+
+        self.sampler.update(chunk)
+        if self.profile is not None:
+            self.profile.update(chunk)
+        self.row_count += len(chunk)
+        return self
+
+    def column_types(self) -> Dict[str, str]:
+        """每列的最终类型：与整表读取时pandas推断的dtype类别保持一致。"""
+        types = {}
+        for column in self.columns:
+            kinds = self._kinds[column]
+            if not kinds:
+                # 整列为空时pandas读出float64
+                types[column] = "number"
+            elif len(kinds) == 1:
+                types[column] = next(iter(kinds))
+            else:
+                # 混合类型的列在整表读取时会是object
+                types[column] = "object"
+        return types
+
+    def summary(self) -> Dict:
+        """返回汇总结果，可直接保存为JSON。
+
+        表头可能是数字或日期（例如按年份命名的列），列名统一转为字符串，与 column_profiles 的键一致。
+        """
+        types = {str(column): kind for column, kind in self.column_types().items()}
+        summary = {
+            "columns": [str(column) for column in self.columns],
+            "row_count": self.row_count,
+            "column_count": len(self.columns),
+            "column_types": types,
+            "numeric_columns": sum(1 for t in types.values() if t == "number"),
+            "text_columns": sum(1 for t in types.values() if t == "object"),
+            "sample_data": self.sampler.sample(),
+        }
+        if self.profile is not None:
+            summary["column_profiles"] = self.profile.to_dict()
+        return summary
+
+
+def summarize_excel(excel_path: str, sheet_name: str, chunk_rows: Optional[int] = None,
+                    use_cache: bool = False, profile: bool = False, optimize: bool = False,
+                    dtype_schema: Optional[Dict[str, str]] = None, sample_size: int = 3,
+                    stratify_by: Optional[str] = None) -> Dict:
+    """读取工作表（或CSV/Parquet文件）并计算统计信息。
+
+    Args:
+        excel_path: Excel、CSV/TSV或Parquet文件路径
+        sheet_name: 工作表名称（CSV/Parquet忽略）
+        chunk_rows: 分块行数；为None时整表读入（适合小文件）
+        use_cache: 整表读入时使用工作簿解析缓存，文件未变化时跳过xlsx解析
+        profile: 同时计算逐列统计，结果在 column_profiles 字段
+        optimize: 整表读入时压缩dtype，统计期间常驻内存的是压缩后的表；内存变化和使用的schema
+            在 memory_usage 字段。与解析缓存同时使用时缓存的是压缩后的表，命中时不再推断和转换。
+            分块模式下每个分块统计完即丢弃，压缩不会降低峰值内存，因此不做压缩，也没有 memory_usage
+        dtype_schema: 上次保存的schema，提供时跳过推断（见 dtype_optimizer）
+        sample_size: sample_data 的行数
+        stratify_by: 按该列分层抽样
+    """
+    stats = IncrementalStats(sample_size, profile=profile, stratify_by=stratify_by)
+    memory = None
+
+    if chunk_rows:
+        for chunk in iter_source_chunks(excel_path, sheet_name, chunk_rows):
+            stats.update(chunk)
+    elif optimize and use_cache and detect_format(excel_path)[0] == "excel":
+        from workbook_cache import read_excel_optimized_cached
+        df, memory = read_excel_optimized_cached(excel_path, sheet_name or 0, dtype_schema)
+        stats.update(df)
+    else:
+        df = read_table(excel_path, sheet_name, use_cache=use_cache)
+        if optimize:
+            # 替换后未压缩的表随即释放
+            df, memory = optimize_dtypes(df, dtype_schema)
+        stats.update(df)
+
+    summary = stats.summary()
+    if memory is not None:
+        summary["memory_usage"] = memory
+    return summary
@@ -2,57 +2,111 @@
 这个文件负责生成和保存数据，供其他文件使用。
 """
 
+import sys
+import time
 import pandas as pd
 from datetime import datetime
+from pathlib import Path
 from data_manager import get_data_manager, save_data
+from change_detection import detect_workbook_changes
+from column_profile import TableProfile
+from dtype_optimizer import load_schemas, save_schemas, schema_source_key
+from excel_ingest import (DEFAULT_CHUNK_ROWS, detect_format, iter_excel_chunks, iter_source_chunks,
+                          summarize_excel)
+from partitioned_stage import fan_out_fan_in, file_partitions, sheet_partitions
+from record_channel import ChannelWriter
+from sampling import ReservoirSampler
+from synthetic_data import SyntheticDataGenerator
+from utils import df_to_records, get_excel_input_path
 
-def process_excel_data():
-    """处理Excel数据并保存结果供其他文件使用。"""
-    print("=== 文件A: 数据生产者 ===")
+# 默认处理的Excel文件（环境变量 EXCEL_INPUT_PATH，命令行 --excel-path 可覆盖）
+EXCEL_PATH = get_excel_input_path()
+SHEET_NAME = "Sheet1"
+
+def summarize_sheet(excel_path: str, sheet_name: str, chunk_rows: int = None,
+                    use_cache: bool = True, profile: bool = True, optimize: bool = True,
+                    dtype_schema: dict = None, sample_size: int = 3, stratify_by: str = None) -> tuple:
+    """读取单个工作表，返回 (excel_processing_result, excel_stats)，不写共享存储。"""
+    summary = summarize_excel(excel_path, sheet_name, chunk_rows, use_cache=use_cache, profile=profile,
+                              optimize=optimize, dtype_schema=dtype_schema, sample_size=sample_size,
+                              stratify_by=stratify_by)
+    row_count, column_count = summary["row_count"], summary["column_count"]
+    
+    # 数据处理结果
+    processing_result = {
+        "file_path": excel_path,
+        "sheet_name": sheet_name,
+        "data_shape": (row_count, column_count),
+        "columns": summary["columns"],
+        "row_count": row_count,
+        "column_count": column_count,
+        "processing_time": datetime.now().isoformat(),
+        "status": "success",
+        "sample_data": summary["sample_data"]
+    }
     
-    # 模拟处理Excel数据（使用之前的test_change_intime.py逻辑）
-    excel_path = "C:/Users/唐朝/Desktop/12345.xlsx"
+    # 统计信息
+    stats = {
+        "total_rows": row_count,
+        "total_columns": column_count,
+        "numeric_columns": summary["numeric_columns"],
+        "text_columns": summary["text_columns"],
+        "column_types": summary["column_types"],
+        "column_profiles": summary.get("column_profiles"),
+        "memory_usage": summary.get("memory_usage"),
+        "last_updated": datetime.now().isoformat()
+    }
+    return processing_result, stats
+
+def process_excel_data(excel_path: str = EXCEL_PATH, sheet_name: str = SHEET_NAME,
+                       chunk_rows: int = None, use_cache: bool = True, profile: bool = True,
+                       optimize: bool = True, sample_size: int = 3, stratify_by: str = None):
+    """处理Excel数据并保存结果供其他文件使用。
+    
+    Args:
+        excel_path: Excel文件路径（也支持CSV/TSV和Parquet，格式自动识别）
+        sheet_name: 工作表名称
+        chunk_rows: 分块读取的行数；设置后以只读模式流式解析，峰值内存由分块大小决定
+        use_cache: 整表读取时使用工作簿解析缓存（见 workbook_cache）
+        profile: 在 excel_stats 中附带逐列统计（见 column_profile）
+        optimize: 整表读取时压缩dtype并保存schema，下次运行跳过类型推断（见 dtype_optimizer）；
+            分块读取时不压缩
+        sample_size: sample_data 的行数，在全部行上做蓄水池抽样（见 sampling）
+        stratify_by: 按该列分层抽样
+    """
+    print("=== 文件A: 数据生产者 ===")
     
     try:
-        # 读取Excel数据
-        df = pd.read_excel(excel_path, sheet_name="Sheet1")
+        # 读取Excel数据并计算统计信息
+        schema_key = schema_source_key(excel_path, sheet_name)
+        dtype_schema = load_schemas().get(schema_key) if optimize else None
+        processing_result, stats = summarize_sheet(excel_path, sheet_name, chunk_rows, use_cache,
+                                                   profile, optimize, dtype_schema, sample_size, stratify_by)
+        row_count, column_count = processing_result["row_count"], processing_result["column_count"]
         
-        # 数据处理结果
-        processing_result = {
-            "file_path": excel_path,
-            "sheet_name": "Sheet1",
-            "data_shape": df.shape,
-            "columns": df.columns.tolist(),
-            "row_count": len(df),
-            "column_count": len(df.columns),
-            "processing_time": datetime.now().isoformat(),
-            "status": "success",
-            "sample_data": df.head(3).to_dict('records') if len(df) > 0 else []
-        }
+        memory = stats["memory_usage"]
+        if memory:
+            if not memory["schema_reused"] and memory["schema"]:
+                save_schemas({schema_key: memory["schema"]})
+            print(f"📉 内存占用: {memory['memory_before_bytes'] / 1024 / 1024:.2f} MB -> "
+                  f"{memory['memory_after_bytes'] / 1024 / 1024:.2f} MB")
         
         # 保存处理结果到共享数据
         dm = get_data_manager()
         dm.save_shared_data("excel_processing_result", processing_result)
         
         # 保存统计信息
-        stats = {
-            "total_rows": len(df),
-            "total_columns": len(df.columns),
-            "numeric_columns": len(df.select_dtypes(include=['number']).columns),
-            "text_columns": len(df.select_dtypes(include=['object']).columns),
-            "last_updated": datetime.now().isoformat()
-        }
         dm.save_shared_data("excel_stats", stats)
         
         # 使用便捷函数保存配置信息
         config = {
             "default_excel_path": excel_path,
-            "default_sheet": "Sheet1",
+            "default_sheet": sheet_name,
             "auto_process": True
         }
         save_data("app_config", config)
         
-        print(f"✅ 数据处理完成，共 {len(df)} 行 {len(df.columns)} 列")
+        print(f"✅ 数据处理完成，共 {row_count} 行 {column_count} 列")
         print(f"✅ 处理结果已保存到共享数据")
         
         return processing_result
@@ -79,10 +133,319 @@ def process_excel_data():
         print(f"❌ 处理失败: {e}")
         return error_result
 
-def generate_sample_data():
-    """生成一些示例数据供其他文件使用。"""
+def read_excel_partition(partition: dict) -> dict:
+    """处理单个分区（一个工作表或其中的一段行范围），供分区并行阶段使用。
+    
+    Args:
+        partition: 包含 path、sheet_name，可选 start/stop（数据行范围）的字典
+    """
+    sheet_name = partition.get("sheet_name", SHEET_NAME)
+    read_kwargs = {}
+    if "start" in partition:
+        # 保留表头行，跳过分区之前的数据行
+        read_kwargs["skiprows"] = range(1, partition["start"] + 1)
+        read_kwargs["nrows"] = partition["stop"] - partition["start"]
+    
+    df = pd.read_excel(partition["path"], sheet_name=sheet_name, **read_kwargs)
+    return {
+        "partition": partition,
+        "columns": df.columns.tolist(),
+        "row_count": len(df),
+        "numeric_columns": df.select_dtypes(include=['number']).columns.tolist(),
+        "text_columns": df.select_dtypes(include=['object']).columns.tolist(),
+        # 草图和抽样器随结果返回主进程，在reduce中合并
+        "profile": TableProfile().update(df),
+        "sampler": ReservoirSampler(3).update(df)
+    }
+
+def merge_excel_partitions(results: list) -> dict:
+    """合并各分区的处理结果，格式与 excel_processing_result 保持一致。"""
+    columns = []
+    for result in results:
+        columns.extend(c for c in result["columns"] if c not in columns)
+    
+    # 只有在所有分区中都是数值类型的列才算数值列
+    numeric_columns = [c for c in columns if all(
+        c in r["numeric_columns"] for r in results if c in r["columns"])]
+    text_columns = [c for c in columns if any(c in r["text_columns"] for r in results)]
+    row_count = sum(r["row_count"] for r in results)
+    profile = TableProfile()
+    sampler = ReservoirSampler(3)
+    for result in results:
+        profile.merge(result["profile"])
+        # 按分区顺序合并，样本在所有分区的行上等概率抽取
+        sampler.merge(result["sampler"])
+    
+    return {
+        "file_path": sorted({r["partition"]["path"] for r in results}),
+        "sheet_name": sorted({r["partition"].get("sheet_name", SHEET_NAME) for r in results}),
+        "data_shape": [row_count, len(columns)],
+        "columns": columns,
+        "row_count": row_count,
+        "column_count": len(columns),
+        "numeric_columns": len(numeric_columns),
+        "text_columns": len(text_columns),
+        "partition_count": len(results),
+        "column_profiles": profile.to_dict(),
+        "processing_time": datetime.now().isoformat(),
+        "status": "success",
+        "sample_data": sampler.sample()
+    }
+
+def ingest_sheet_partition(partition: dict) -> dict:
+    """批量摄取的map函数：处理一个工作表，失败时记录错误而不中断整个批次。"""
+    try:
+        result, stats = summarize_sheet(partition["path"], partition["sheet_name"],
+                                        partition.get("chunk_rows"), partition.get("use_cache", True),
+                                        dtype_schema=partition.get("dtype_schema"))
+        return {"partition": partition, "status": "success", "result": result, "stats": stats}
+    except Exception as e:
+        return {"partition": partition, "status": "error", "error_message": str(e)}
+
+def merge_sheet_results(results: list) -> dict:
+    """批量摄取的reduce函数：按 "文件路径::工作表" 合并各工作表的结果和统计信息。"""
+    sheets, stats, errors = {}, {}, {}
+    for item in results:
+        key = f"{item['partition']['path']}::{item['partition']['sheet_name']}"
+        if item["status"] == "success":
+            sheets[key] = item["result"]
+            stats[key] = item["stats"]
+        else:
+            errors[key] = item["error_message"]
+    return {"sheets": sheets, "stats": stats, "errors": errors}
+
+def ingest_excel_batch(pattern: str, sheet_names: list = None, max_workers: int = None,
+                       chunk_rows: int = None, use_cache: bool = True) -> dict:
+    """批量摄取：按glob发现工作簿，在进程池中并行处理所有工作表。
+    
+    合并结果保存到共享数据 "excel_batch_result"（每个工作表的处理结果）
+    和 "excel_batch_stats"（每个工作表的统计信息及吞吐量）。
+    
+    Args:
+        pattern: glob模式，例如 "data/input/**/*.xlsx"，也可以匹配CSV/TSV/Parquet文件
+        sheet_names: 只处理这些工作表；为None时处理每个工作簿的全部工作表
+        max_workers: 进程数量，默认为CPU核数
+        chunk_rows: 分块读取的行数，见 process_excel_data
+        use_cache: 是否使用工作簿解析缓存
+    """
+    print("=== 文件A: 批量数据生产者 ===")
+    start = time.perf_counter()
+    
+    partitions, errors = [], {}
+    saved_schemas = load_schemas()
+    for workbook in file_partitions(pattern):
+        try:
+            if detect_format(workbook["path"])[0] == "excel":
+                sheets = sheet_partitions(workbook["path"])
+            else:
+                # CSV/Parquet文件整体作为一个分区
+                sheets = [{"path": workbook["path"], "sheet_name": None}]
+        except Exception as e:
+            errors[workbook["path"]] = f"无法打开工作簿: {e}"
+            continue
+        partitions.extend(
+            dict(sheet, chunk_rows=chunk_rows, use_cache=use_cache,
+                 dtype_schema=saved_schemas.get(schema_source_key(sheet["path"], sheet["sheet_name"])))
+            for sheet in sheets
+            if sheet_names is None or sheet["sheet_name"] in sheet_names or sheet["sheet_name"] is None)
+    
+    if not partitions:
+        print(f"❌ 没有匹配的工作表: {pattern}")
+        return {"pattern": pattern, "status": "error", "error_message": "没有匹配的工作表", "errors": errors}
+    
+    merged, timings = fan_out_fan_in(partitions, ingest_sheet_partition, merge_sheet_results, max_workers)
+    errors.update(merged["errors"])
+    elapsed = time.perf_counter() - start
+    
+    # 每个工作表的吞吐量
+    for timing in timings:
+        partition = timing["partition"]
+        key = f"{partition['path']}::{partition['sheet_name']}"
+        if key in merged["stats"]:
+            seconds = timing["wall_time_seconds"]
+            sheet_stats = merged["stats"][key]
+            sheet_stats["wall_time_seconds"] = seconds
+            sheet_stats["rows_per_second"] = round(sheet_stats["total_rows"] / seconds, 2) if seconds > 0 else None
+    
+    total_rows = sum(r["row_count"] for r in merged["sheets"].values())
+    batch_result = {
+        "pattern": pattern,
+        "workbook_count": len({p["path"] for p in partitions}),
+        "sheet_count": len(partitions),
+        "total_rows": total_rows,
+        "sheets": merged["sheets"],
+        "errors": errors,
+        "processing_time": datetime.now().isoformat(),
+        "status": "success" if not errors else "partial"
+    }
+    batch_stats = {
+        "pattern": pattern,
+        "total_rows": total_rows,
+        "wall_time_seconds": round(elapsed, 6),
+        "rows_per_second": round(total_rows / elapsed, 2) if elapsed > 0 else None,
+        "max_workers": max_workers,
+        "sheets": merged["stats"],
+        "last_updated": datetime.now().isoformat()
+    }
+    
+    dm = get_data_manager()
+    dm.save_shared_data("excel_batch_result", batch_result)
+    dm.save_shared_data("excel_batch_stats", batch_stats)
+    
+    # 各工作表推断出的新schema在主进程中统一保存，避免worker并发写同一个文件
+    save_schemas({schema_source_key(*key.split("::", 1)): stats["memory_usage"]["schema"]
+                  for key, stats in merged["stats"].items()
+                  if stats["memory_usage"] and not stats["memory_usage"]["schema_reused"]})
+    
+    print(f"✅ 批量处理完成: {batch_result['workbook_count']} 个工作簿, "
+          f"{batch_result['sheet_count']} 个工作表, 共 {total_rows} 行")
+    print(f"✅ 吞吐量: {batch_stats['rows_per_second']} 行/秒 (耗时 {elapsed:.2f} 秒)")
+    if errors:
+        print(f"❌ {len(errors)} 个工作簿/工作表处理失败")
+    return batch_result
+
+def ingest_new_rows(source_path: str, sheet_name: str = SHEET_NAME, watermark_column: str = None,
+                    dataset_key: str = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """增量摄取只增长的工作簿或CSV：只把上次之后新增的行追加到共享记录集。
+    
+    每个数据源的高水位保存在共享数据 "ingest_watermarks" 中：
+    - 未指定 watermark_column 时按已摄取的行数，跳过这些行只解析新行
+    - 指定 watermark_column（单调递增的列，例如自增ID或时间）时，只摄取该列大于上次最大值的行；
+      这种模式每次仍需解析整个文件才能比较，只增长的大文件应使用按行数模式
+    文件变小（被截断或重写）时高水位失效，重新全量摄取。
+    
+    高水位同时记录追加结束时记录集的字节数。上次运行在追加之后、保存高水位之前中断时，
+    记录集比高水位记录的长，这次先截断多出的部分再重新摄取，不会产生重复记录。
+    
+    Args:
+        source_path: Excel、CSV/TSV或Parquet文件路径
+        sheet_name: 工作表名称（CSV忽略）
+        watermark_column: 单调递增的列名
+        dataset_key: 记录集的键，默认为 "<文件名>_rows"
+        chunk_rows: 分块读取的行数
+    """
+    print("=== 文件A: 增量数据生产者 ===")
+    path = Path(source_path)
+    is_excel = detect_format(source_path)[0] == "excel"
+    source_key = f"{path.resolve()}::{sheet_name}" if is_excel else str(path.resolve())
+    dataset_key = dataset_key or f"{path.stem}_rows"
+    
+    dm = get_data_manager()
+    watermarks = dm.load_shared_data("ingest_watermarks", {})
+    mark = watermarks.get(source_key)
+    stat = path.stat()
+    reset = (mark is None or stat.st_size < mark["size"] or mark.get("column") != watermark_column
+             or mark.get("dataset_key") != dataset_key)
+    if not reset and mark.get("records_bytes") is not None:
+        records_size = dm.get_records_size(dataset_key)
+        if records_size is None or records_size < mark["records_bytes"]:
+            # 记录集被删除或截断，与高水位不再一致
+            reset = True
+        elif records_size > mark["records_bytes"]:
+            # 上次运行追加后未能保存高水位，丢弃未确认的记录
+            dm.truncate_shared_records(dataset_key, mark["records_bytes"])
+    
+    # 按行数模式跳过已摄取的行；按列模式需要看到所有行才能比较
+    seen_rows = 0 if reset else mark["rows"]
+    skip_rows = seen_rows if watermark_column is None else 0
+    last_value = None if reset else mark.get("value")
+    if last_value is not None and mark.get("value_type") == "datetime":
+        last_value = pd.Timestamp(last_value)
+    
+    new_rows, total_rows = 0, skip_rows
+    if reset:
+        # 清空旧的记录集，之后的分块只追加
+        dm.append_shared_records(dataset_key, [], reset=True)
+    sheet = sheet_name if is_excel else None
+    for chunk in iter_source_chunks(source_path, sheet, chunk_rows, skip_rows):
+        total_rows += len(chunk)
+        if watermark_column is not None:
+            if last_value is not None:
+                chunk = chunk[chunk[watermark_column] > last_value]
+            if len(chunk):
+                chunk_max = chunk[watermark_column].max()
+                last_value = chunk_max if last_value is None else max(last_value, chunk_max)
+        if len(chunk):
+            dm.append_shared_records(dataset_key, df_to_records(chunk))
+            new_rows += len(chunk)
+    
+    value_type = "datetime" if isinstance(last_value, pd.Timestamp) else None
+    if value_type:
+        last_value = last_value.isoformat()
+    elif hasattr(last_value, "item"):
+        last_value = last_value.item()
+    watermarks[source_key] = {
+        "dataset_key": dataset_key,
+        "column": watermark_column,
+        "value": last_value,
+        "value_type": value_type,
+        "rows": total_rows,
+        "records_bytes": dm.get_records_size(dataset_key),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "updated_time": datetime.now().isoformat()
+    }
+    dm.save_shared_data("ingest_watermarks", watermarks)
+    
+    result = {
+        "source": source_key,
+        "dataset_key": dataset_key,
+        "full_reload": reset,
+        "new_rows": new_rows,
+        "total_rows": total_rows,
+        "watermark": last_value if watermark_column else total_rows,
+        "processing_time": datetime.now().isoformat(),
+        "status": "success"
+    }
+    print(f"✅ 新增 {new_rows} 行已追加到 '{dataset_key}'" + ("（全量摄取）" if reset else ""))
+    return result
+
+def stream_excel_records(channel_address: str, excel_path: str = EXCEL_PATH,
+                         sheet_name: str = SHEET_NAME, batch_size: int = 1000,
+                         capacity: int = 8) -> dict:
+    """把Excel记录按批写入流通道，消费者可以边收边处理。
+    
+    Args:
+        channel_address: 通道地址，见 record_channel
+        excel_path: Excel文件路径
+        sheet_name: 工作表名称
+        batch_size: 每批记录数
+        capacity: 通道中允许未确认的最大批次数
+    """
+    print("=== 文件A: 流式数据生产者 ===")
+    
+    with ChannelWriter(channel_address, capacity=capacity) as writer:
+        # 分块读取，边解析边发送，生产者内存只保留一个批次
+        for batch in iter_excel_chunks(excel_path, sheet_name, batch_size):
+            writer.send_batch(df_to_records(batch))
+    
+    summary = {
+        "channel": channel_address,
+        "batches_sent": writer.batches_sent,
+        "records_sent": writer.records_sent,
+        "backpressure_seconds": round(writer.blocked_seconds, 6)
+    }
+    print(f"✅ 已发送 {summary['records_sent']} 条记录 ({summary['batches_sent']} 批)")
+    return summary
+
+def generate_sample_data(user_count: int = None, project_count: int = None, seed: int = None):
+    """生成一些示例数据供其他文件使用。
+    
+    Args:
+        user_count: 指定时改用合成数据生成器生成该数量的用户（用于压测，见 synthetic_data）；
+            数量较大时用户和项目写为JSON Lines记录集，见 SyntheticDataGenerator.save_to_shared_store
+        project_count: 合成项目数量，默认为用户数的十分之一
+        seed: 合成数据的随机种子
+    """
     print("\n=== 生成示例数据 ===")
     
+    if user_count is not None:
+        project_count = project_count if project_count is not None else max(user_count // 10, 1)
+        SyntheticDataGenerator(seed).save_to_shared_store(user_count, project_count)
+        print(f"✅ 已生成 {user_count} 个用户和 {project_count} 个项目数据")
+        print("✅ 数据已保存到共享存储")
+        return
+    
     # 用户数据
     users = [
         {"id": 1, "name": "张三", "age": 25, "department": "技术部"},
@@ -92,9 +455,9 @@ def generate_sample_data():
     
     # 项目数据
     projects = [
-        {"id": 101, "name": "数据分析项目", "status": "进行中", "progress": 75},
-        {"id": 102, "name": "网站优化", "status": "已完成", "progress": 100},
-        {"id": 103, "name": "移动应用开发", "status": "计划中", "progress": 10}
+        {"id": 101, "name": "数据分析项目", "status": "进行中", "progress": 75, "owner_id": 1},
+        {"id": 102, "name": "网站优化", "status": "已完成", "progress": 100, "owner_id": 2},
+        {"id": 103, "name": "移动应用开发", "status": "计划中", "progress": 10, "owner_id": 1}
     ]
     
     # 保存数据
@@ -128,13 +491,47 @@ def update_processing_status(status: str, message: str = ""):
     print(f"📊 状态更新: {status} - {message}")
 
 if __name__ == "__main__":
+    # 输入文件和工作表: --excel-path <路径> --sheet-name <工作表>（协调器按阶段的 params 传入）
+    excel_path = sys.argv[sys.argv.index("--excel-path") + 1] if "--excel-path" in sys.argv else EXCEL_PATH
+    sheet_name = sys.argv[sys.argv.index("--sheet-name") + 1] if "--sheet-name" in sys.argv else SHEET_NAME
+    
+    # 流式模式: python file_a_producer.py --stream <通道地址>
+    if "--stream" in sys.argv:
+        stream_excel_records(sys.argv[sys.argv.index("--stream") + 1], excel_path, sheet_name)
+        sys.exit(0)
+    
+    # 变更检测模式: python file_a_producer.py --changes <主键列>，变更保存到 "excel_changes"
+    if "--changes" in sys.argv:
+        changes = detect_workbook_changes(excel_path, sheet_name, sys.argv[sys.argv.index("--changes") + 1])
+        print(f"✅ 新增 {changes['counts']['inserted']} 行, 修改 {changes['counts']['updated']} 行, "
+              f"删除 {changes['counts']['deleted']} 行")
+        sys.exit(0)
+    
+    # 增量模式: python file_a_producer.py --incremental <文件路径> [--watermark-column 列名]
+    if "--incremental" in sys.argv:
+        column = sys.argv[sys.argv.index("--watermark-column") + 1] if "--watermark-column" in sys.argv else None
+        ingest_new_rows(sys.argv[sys.argv.index("--incremental") + 1], sheet_name, watermark_column=column)
+        sys.exit(0)
+    
+    # 批量模式: python file_a_producer.py --batch "<glob模式>" [--workers N]
+    if "--batch" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else None
+        batch = ingest_excel_batch(sys.argv[sys.argv.index("--batch") + 1], max_workers=workers)
+        sys.exit(0 if batch["status"] == "success" else 1)
+    
     print("启动文件A - 数据生产者")
     
     # 更新状态
     update_processing_status("starting", "开始数据处理")
     
-    # 处理Excel数据
-    result = process_excel_data()
+    # 处理Excel数据（--chunk-rows N 启用分块流式读取，--no-cache 强制重新解析xlsx）
+    # --sample-size N 和 --stratify 列名 控制 sample_data 的抽样
+    chunk_rows = int(sys.argv[sys.argv.index("--chunk-rows") + 1]) if "--chunk-rows" in sys.argv else None
+    sample_size = int(sys.argv[sys.argv.index("--sample-size") + 1]) if "--sample-size" in sys.argv else 3
+    stratify_by = sys.argv[sys.argv.index("--stratify") + 1] if "--stratify" in sys.argv else None
+    result = process_excel_data(excel_path, sheet_name, chunk_rows=chunk_rows,
+                                use_cache="--no-cache" not in sys.argv,
+                                sample_size=sample_size, stratify_by=stratify_by)
     
     # 生成示例数据
     generate_sample_data()
@@ -2,9 +2,30 @@
 这个文件负责读取和使用其他文件生成的共享数据。
 """
 
+import hashlib
+import json
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from data_manager import get_data_manager, load_data, list_data
+from record_channel import ChannelReader
+from relational import Relation, shared_records_format
+from utils import df_to_records
+
+# 尝试导入watchdog，如果安装了的话（守护模式下用文件系统事件代替轮询）
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+# 逐键分析结果（含内容哈希），用于增量生成分析报告
+ANALYSIS_CACHE_KEY = "analysis_cache"
+# 消费者自己写入的键：不作为分析对象，也不触发守护进程
+CONSUMER_OUTPUT_KEYS = {ANALYSIS_CACHE_KEY, "analysis_report", "relational_analysis", "consumer_status"}
 
 def check_data_availability():
     """检查共享数据的可用性。"""
@@ -129,59 +150,205 @@ def monitor_processing_status():
     
     return status
 
-def analyze_shared_data():
-    """分析所有共享数据并生成报告。"""
+def summarize_value(data, info: dict) -> dict:
+    """单个共享数据的分析摘要。"""
+    summary = {
+        "type": type(data).__name__,
+        "size_bytes": info.get('size_bytes', 0),
+        "has_content": bool(data)
+    }
+    
+    # 根据数据类型添加更多信息
+    if isinstance(data, list):
+        summary["item_count"] = len(data)
+    elif isinstance(data, dict):
+        summary["key_count"] = len(data.keys())
+    return summary
+
+def build_recommendations(entries: dict) -> list:
+    """根据各数据的分析结果生成建议。"""
+    recommendations = []
+    if "excel_processing_result" in entries:
+        if entries["excel_processing_result"].get('status') == 'success':
+            recommendations.append("Excel数据处理成功，可以进行进一步分析")
+        else:
+            recommendations.append("Excel数据处理失败，需要检查文件路径和格式")
+    
+    if "users" in entries and "projects" in entries:
+        recommendations.append("用户和项目数据完整，可以进行关联分析")
+    return recommendations
+
+def analyze_entry(data, info: dict, content_hash: str) -> dict:
+    """单个数据的分析结果，带上产生它的文件指纹和内容哈希。"""
+    return {
+        "size_bytes": info['size_bytes'],
+        "modified_ns": info['modified_ns'],
+        "hash": content_hash,
+        "summary": summarize_value(data, info) if data else None,
+        "status": data.get('status') if isinstance(data, dict) else None
+    }
+
+def read_if_changed(dm, key: str, cached_hash: str = None) -> tuple:
+    """读取一次共享数据文件，用同一份字节计算哈希，内容变化时再解析。
+
+    Returns:
+        (哈希, 数据, 是否变化)；哈希与 cached_hash 相同时数据为None，
+        文件无法读取时哈希为None，无法解析时数据为None
+    """
+    try:
+        with open(dm.data_dir / f"{key}.json", "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None, None, True
+    content_hash = hashlib.sha256(raw).hexdigest()
+    if content_hash == cached_hash:
+        return content_hash, None, False
+    try:
+        return content_hash, json.loads(raw), True
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return content_hash, None, True
+
+def analyze_shared_data(max_workers: int = 8, full: bool = False):
+    """分析所有共享数据并生成报告（增量）。
+    
+    每个键的分析结果连同其内容哈希保存在 ANALYSIS_CACHE_KEY 中。
+    消费者自己的输出（CONSUMER_OUTPUT_KEYS）不参与分析，输入未变化时 reanalyzed_keys 为空。
+    文件大小和修改时间未变的键直接复用；其余的键在线程池中各读取一次，
+    用读到的字节比较哈希，只有内容确实改变时才解析并合并进报告（见 read_if_changed）。
+    
+    Args:
+        max_workers: 读取数据的线程数量
+        full: 忽略已有结果，重新分析全部数据
+    """
     print("\n=== 数据分析报告 ===")
     
     dm = get_data_manager()
-    all_keys = dm.list_shared_data()
+    infos = dm.scan_shared_data_info()
+    for key in CONSUMER_OUTPUT_KEYS:
+        infos.pop(key, None)
+    cache = {} if full else dm.load_shared_data(ANALYSIS_CACHE_KEY, {})
+    
+    entries = {}
+    stale = []
+    for key, info in infos.items():
+        cached = cache.get(key)
+        if cached and cached['size_bytes'] == info['size_bytes'] and cached['modified_ns'] == info['modified_ns']:
+            entries[key] = cached
+        else:
+            stale.append(key)
+    
+    # 文件被重写但内容相同（哈希一致）时同样复用，只更新指纹
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(stale, executor.map(
+            lambda key: read_if_changed(dm, key, cache.get(key, {}).get('hash')), stale)))
+    changed = []
+    for key in stale:
+        content_hash, data, is_changed = results[key]
+        if is_changed:
+            entries[key] = analyze_entry(data, infos[key], content_hash)
+            changed.append(key)
+        else:
+            entries[key] = dict(cache[key], size_bytes=infos[key]['size_bytes'], modified_ns=infos[key]['modified_ns'])
     
     report = {
         "analysis_time": datetime.now().isoformat(),
-        "total_data_files": len(all_keys),
-        "data_summary": {},
-        "recommendations": []
+        "total_data_files": len(infos),
+        "data_summary": {key: entry["summary"] for key, entry in entries.items() if entry["summary"]},
+        "recommendations": build_recommendations(entries),
+        "reanalyzed_keys": changed
     }
     
-    # 分析每个数据文件
-    for key in all_keys:
-        data = dm.load_shared_data(key)
-        info = dm.get_data_info(key)
-        
-        if data and info:
-            report["data_summary"][key] = {
-                "type": type(data).__name__,
-                "size_bytes": info.get('size_bytes', 0),
-                "has_content": bool(data)
-            }
-            
-            # 根据数据类型添加更多信息
-            if isinstance(data, list):
-                report["data_summary"][key]["item_count"] = len(data)
-            elif isinstance(data, dict):
-                report["data_summary"][key]["key_count"] = len(data.keys())
-    
-    # 生成建议
-    if "excel_processing_result" in all_keys:
-        excel_result = load_data("excel_processing_result")
-        if excel_result and excel_result.get('status') == 'success':
-            report["recommendations"].append("Excel数据处理成功，可以进行进一步分析")
-        else:
-            report["recommendations"].append("Excel数据处理失败，需要检查文件路径和格式")
-    
-    if "users" in all_keys and "projects" in all_keys:
-        report["recommendations"].append("用户和项目数据完整，可以进行关联分析")
-    
-    # 保存分析报告
+    # 保存分析报告和逐键结果（已删除的键不再保留）
     dm.save_shared_data("analysis_report", report)
+    dm.save_shared_data(ANALYSIS_CACHE_KEY, entries)
     
-    print(f"📊 共分析 {len(all_keys)} 个数据文件")
+    print(f"📊 共分析 {len(infos)} 个数据文件，重新分析 {len(changed)} 个")
     print(f"📋 报告已保存为 'analysis_report'")
     
     return report
 
+def analyze_users_projects(users_key: str = "users", projects_key: str = "projects"):
+    """用户×项目关联分析：各部门的项目数和平均进度、各状态的项目数和平均进度。
+    
+    项目按 owner_id 与用户 id 做哈希连接（见 relational），没有负责人的项目归入空部门。
+    键同时有JSON和JSON Lines文件时读取较新的一个，使用的格式记录在 sources 字段。
+    结果保存为 'relational_analysis'。
+    """
+    print("\n=== 用户×项目关联分析 ===")
+    
+    sources = {users_key: shared_records_format(users_key), projects_key: shared_records_format(projects_key)}
+    try:
+        users = Relation.from_shared_key(users_key, fmt=sources[users_key])
+        projects = Relation.from_shared_key(projects_key, fmt=sources[projects_key])
+    except (KeyError, ValueError) as e:
+        print(f"❌ 无法进行关联分析: {e}")
+        return None
+    
+    aggregations = {"project_count": ("id", "count"), "avg_progress": ("progress", "mean")}
+    by_status = projects.group_by("status", aggregations)
+    result = {
+        "analysis_time": datetime.now().isoformat(),
+        "sources": sources,
+        "projects_by_department": None,
+        "progress_by_status": df_to_records(by_status)
+    }
+    
+    project_columns = projects.first_chunk()
+    if project_columns is not None and "owner_id" in project_columns:
+        joined = projects.join(users, left_on="owner_id", right_on="id", how="left", suffixes=("", "_owner"))
+        by_department = joined.group_by("department", aggregations)
+        result["projects_by_department"] = df_to_records(by_department)
+        print("🏢 各部门项目:")
+        for row in result["projects_by_department"]:
+            print(f"  {row['department'] or '无负责人'}: {row['project_count']} 个项目, 平均进度 {row['avg_progress'] or 0:.1f}%")
+    else:
+        print("⚠️ 项目数据没有 owner_id 列，跳过部门分析")
+    
+    print("📈 各状态平均进度:")
+    for row in result["progress_by_status"]:
+        print(f"  {row['status']}: {row['project_count']} 个项目, 平均进度 {row['avg_progress'] or 0:.1f}%")
+    
+    get_data_manager().save_shared_data("relational_analysis", result)
+    return result
+
+def consume_record_stream(channel_address: str) -> dict:
+    """从流通道逐批读取记录并增量统计，处理完一批才会接收下一批。
+    
+    Args:
+        channel_address: 通道地址，见 record_channel
+    
+    Raises:
+        ChannelAbortedError: 生产者出错中止；此时不保存 "stream_analysis"，阶段以非零返回码退出
+    """
+    print("\n=== 流式消费记录 ===")
+    
+    summary = {
+        "channel": channel_address,
+        "row_count": 0,
+        "batch_count": 0,
+        "columns": {},
+        "start_time": datetime.now().isoformat()
+    }
+    
+    with ChannelReader(channel_address) as reader:
+        for records in reader:
+            summary["batch_count"] += 1
+            summary["row_count"] += len(records)
+            for record in records:
+                for column, value in record.items():
+                    stats = summary["columns"].setdefault(column, {"non_null": 0, "numeric_sum": 0})
+                    if value is not None:
+                        stats["non_null"] += 1
+                        if isinstance(value, (int, float)) and not isinstance(value, bool):
+                            stats["numeric_sum"] += value
+    
+    summary["end_time"] = datetime.now().isoformat()
+    get_data_manager().save_shared_data("stream_analysis", summary)
+    print(f"✅ 流式处理 {summary['row_count']} 条记录 ({summary['batch_count']} 批)")
+    return summary
+
 def wait_for_data(key: str, timeout: int = 30, check_interval: int = 2):
-    """等待特定数据变为可用。
+    """等待特定数据变为可用（共享数据或记录集）。
     
     Args:
         key: 要等待的数据键名
@@ -193,7 +360,7 @@ def wait_for_data(key: str, timeout: int = 30, check_interval: int = 2):
     start_time = time.time()
     
     while time.time() - start_time < timeout:
-        data = load_data(key)
+        data = get_data_manager().load_shared_data_or_records(key)
         if data is not None:
             print(f"✅ 数据 '{key}' 已可用！")
             return data
@@ -204,7 +371,159 @@ def wait_for_data(key: str, timeout: int = 30, check_interval: int = 2):
     print(f"❌ 等待超时，数据 '{key}' 仍不可用")
     return None
 
+class ConsumerDaemon:
+    """常驻的消费者：监视共享数据，输入变化时只重新运行受影响的分析。
+    
+    - 变化检测：扫描数据目录，比较JSON数据和JSON Lines记录集的文件大小和修改时间；
+      安装了watchdog时由文件系统事件立即唤醒
+    - 去抖：检测到变化后等到 debounce 秒内没有新的写入再运行，连续写入最多等待 max_delay 秒
+    - 增量：analysis_report 本身也只重新分析变化的键（见 analyze_shared_data）
+    """
+    
+    def __init__(self, poll_interval: float = 0.02, debounce: float = 0.05, max_delay: float = 1.0):
+        """初始化守护进程。
+        
+        Args:
+            poll_interval: 检查变化的间隔（秒）
+            debounce: 最后一次写入后的静默时间（秒）
+            max_delay: 从第一次变化到运行分析的最长等待（秒）
+        """
+        self.dm = get_data_manager()
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.run_count = 0
+        # 分析名称 -> (输入键集合，None表示任意键; 分析函数)
+        self.analyses = {
+            "analysis_report": (None, analyze_shared_data),
+            "relational_analysis": ({"users", "projects"}, analyze_users_projects),
+        }
+        # 守护进程自己写入的键，不作为触发条件
+        self.output_keys = set(self.analyses) | CONSUMER_OUTPUT_KEYS
+        self._states = self._scan()
+        self._wake = threading.Event()
+        self._observer = None
+    
+    def _scan(self) -> dict:
+        """(键名, 后缀) -> (大小, 修改时间)，包含JSON数据和JSON Lines记录集。"""
+        return {
+            (key, suffix): (info['size_bytes'], info['modified_ns'])
+            for suffix in (".json", ".jsonl")
+            for key, info in self.dm.scan_shared_data_info(suffix).items() if key not in self.output_keys
+        }
+    
+    def _keys(self) -> set:
+        return {key for key, _ in self._states}
+    
+    def _changed_keys(self) -> set:
+        """返回内容有变化的键名；同一个键的JSON和JSON Lines文件都对应这个键。"""
+        states = self._scan()
+        changed = {key for key, suffix in states.keys() | self._states.keys()
+                   if states.get((key, suffix)) != self._states.get((key, suffix))}
+        self._states = states
+        return changed
+    
+    def _wait_quiet(self, changed: set) -> set:
+        """去抖：持续收集变化，直到静默 debounce 秒或累计等待 max_delay 秒。"""
+        first_change = time.monotonic()
+        last_change = first_change
+        while True:
+            now = time.monotonic()
+            if now - last_change >= self.debounce or now - first_change >= self.max_delay:
+                return changed
+            time.sleep(min(self.poll_interval, self.debounce))
+            more = self._changed_keys()
+            if more:
+                changed |= more
+                last_change = time.monotonic()
+    
+    def affected_analyses(self, changed: set) -> list:
+        return [name for name, (inputs, _) in self.analyses.items() if inputs is None or inputs & changed]
+    
+    def handle_changes(self, changed: set) -> list:
+        """运行受影响的分析并发布 consumer_status，返回运行了的分析。"""
+        start = time.perf_counter()
+        names = self.affected_analyses(changed)
+        for name in names:
+            try:
+                self.analyses[name][1]()
+            except Exception as e:
+                print(f"❌ 分析失败: {name}, 错误: {e}")
+        self.run_count += 1
+        
+        self.dm.save_shared_data("consumer_status", {
+            "consumer_file": "file_b_consumer.py",
+            "execution_time": datetime.now().isoformat(),
+            "data_processed": len(self._keys()),
+            "status": "running",
+            "mode": "daemon",
+            "run_count": self.run_count,
+            "changed_keys": sorted(changed),
+            "analyses": names,
+            "analysis_ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+        return names
+    
+    def tick(self) -> bool:
+        """检查一次变化，需要时运行分析。返回是否运行了分析。"""
+        self._wake.clear()
+        changed = self._changed_keys()
+        if not changed:
+            return False
+        self.handle_changes(self._wait_quiet(changed))
+        return True
+    
+    def _start_observer(self):
+        if not WATCHDOG_AVAILABLE:
+            return
+        wake = self._wake
+        
+        class WakeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+        
+        self._observer = Observer()
+        self._observer.schedule(WakeHandler(), str(self.dm.data_dir), recursive=False)
+        self._observer.start()
+    
+    def run_forever(self, max_runs: int = None, initial_run: bool = True):
+        """持续监视，直到达到 max_runs 或被 Ctrl+C 中断。
+        
+        Args:
+            max_runs: 最多运行分析的次数（含启动时的一次）
+            initial_run: 启动时先对所有数据运行一次全部分析
+        """
+        self._start_observer()
+        # 有文件系统事件时轮询只是兜底
+        interval = max(self.poll_interval, 1.0) if self._observer else self.poll_interval
+        print(f"👁️ 消费者守护进程启动: 数据目录={self.dm.data_dir} "
+              f"{'文件系统事件' if self._observer else f'轮询间隔={self.poll_interval}s'} 去抖={self.debounce}s")
+        try:
+            if initial_run:
+                self.handle_changes(self._keys())
+            while max_runs is None or self.run_count < max_runs:
+                if not self.tick():
+                    self._wake.wait(interval)
+        except KeyboardInterrupt:
+            print("\n👁️ 消费者守护进程已停止")
+        finally:
+            if self._observer:
+                self._observer.stop()
+                self._observer.join()
+            self.dm.update_shared_data("consumer_status", {"status": "stopped",
+                                                           "execution_time": datetime.now().isoformat()})
+
 if __name__ == "__main__":
+    # 流式模式: python file_b_consumer.py --stream <通道地址>
+    if "--stream" in sys.argv:
+        consume_record_stream(sys.argv[sys.argv.index("--stream") + 1])
+        sys.exit(0)
+    
+    # 守护模式: python file_b_consumer.py --daemon，常驻并在输入变化时更新分析
+    if "--daemon" in sys.argv:
+        ConsumerDaemon().run_forever()
+        sys.exit(0)
+    
     print("启动文件B - 数据消费者")
     
     # 检查数据可用性
@@ -229,6 +548,10 @@ if __name__ == "__main__":
     # 生成分析报告
     report = analyze_shared_data()
     
+    # 用户和项目数据（JSON或JSON Lines）都存在时进行关联分析
+    if shared_records_format("users") and shared_records_format("projects"):
+        analyze_users_projects()
+    
     print("\n=== 数据消费完成 ===")
     print("文件B已成功读取并分析所有共享数据！")
     
@@ -0,0 +1,93 @@
+"""分区并行阶段 - 把一个逻辑阶段拆成多个分区并行执行，再合并结果
+分区可以是Excel工作表、文件或行范围；map函数在进程池中处理单个分区，
+reduce函数把所有分区结果合并为一个值。
+
+map/reduce函数需要定义在模块顶层，以便在进程间传递。
+"""
+
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def sheet_partitions(excel_path: str) -> List[Dict]:
+    """每个工作表一个分区。只读模式打开，只读取工作表名称而不解析单元格。"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_path, read_only=True)
+    try:
+        return [{"path": str(excel_path), "sheet_name": name} for name in workbook.sheetnames]
+    finally:
+        workbook.close()
+
+
+def file_partitions(pattern: str, **extra) -> List[Dict]:
+    """每个匹配的文件一个分区。
+
+    Args:
+        pattern: glob模式，例如 "data/input/*.xlsx"
+        extra: 附加到每个分区上的字段（例如 sheet_name）
+    """
+    return [dict(extra, path=path) for path in sorted(glob.glob(pattern, recursive=True))]
+
+
+def excel_row_count(excel_path: str, sheet_name: str) -> int:
+    """快速获取工作表的数据行数（不含表头），不解析单元格内容。"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_path, read_only=True)
+    try:
+        return max(workbook[sheet_name].max_row - 1, 0)
+    finally:
+        workbook.close()
+
+
+def row_range_partitions(total_rows: int, chunk_rows: int, **extra) -> List[Dict]:
+    """按行范围切分，每个分区包含 [start, stop) 范围的数据行。"""
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows 必须大于0")
+    return [
+        dict(extra, start=start, stop=min(start + chunk_rows, total_rows))
+        for start in range(0, total_rows, chunk_rows)
+    ]
+
+
+def _timed_call(map_func: Callable, partition: Dict) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = map_func(partition)
+    return result, time.perf_counter() - start
+
+
+def fan_out_fan_in(partitions: List[Dict], map_func: Callable[[Dict], Any],
+                   reduce_func: Callable[[List[Any]], Any],
+                   max_workers: Optional[int] = None) -> Tuple[Any, List[Dict]]:
+    """在进程池中并行执行map，并按分区原顺序调用reduce。
+
+    Args:
+        partitions: 分区列表
+        map_func: 处理单个分区的函数
+        reduce_func: 接收按分区顺序排列的结果列表，返回合并结果
+        max_workers: 进程数量，默认为CPU核数
+
+    Returns:
+        (合并结果, 每个分区的执行信息列表)
+    """
+    results: List[Any] = [None] * len(partitions)
+    timings: List[Dict] = [{} for _ in partitions]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_timed_call, map_func, partition): index
+            for index, partition in enumerate(partitions)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            result, seconds = future.result()
+            results[index] = result
+            timings[index] = {
+                "partition": partitions[index],
+                "wall_time_seconds": round(seconds, 6)
+            }
+
+    return reduce_func(results), timings
@@ -0,0 +1,194 @@
+"""流水线阶段性能分析 - 采集每个阶段的资源消耗
+记录墙钟时间、CPU时间、峰值内存（RSS）、读写字节数，并可选生成cProfile输出。
+"""
+
+import contextlib
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from stage_watchdog import StageWatchdog, classify_termination, make_rlimit_preexec
+
+# resource 模块只在类Unix系统上可用
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+
+def read_process_io(pid="self") -> Optional[Dict[str, int]]:
+    """读取 /proc/<pid>/io 中的I/O计数（仅Linux）。
+
+    Returns:
+        包含 rchar、wchar、read_bytes、write_bytes 等字段的字典，不可用时返回None
+    """
+    try:
+        with open(f"/proc/{pid}/io", "r") as f:
+            return {name: int(value) for name, value in
+                    (line.split(":", 1) for line in f if ":" in line)}
+    except (OSError, ValueError):
+        return None
+
+
+def _maxrss_to_bytes(maxrss: int) -> int:
+    """ru_maxrss 在Linux上以KB为单位，在macOS上以字节为单位。"""
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _io_delta(before: Optional[Dict], after: Optional[Dict], field: str) -> Optional[int]:
+    if before is None or after is None:
+        return None
+    return after.get(field, 0) - before.get(field, 0)
+
+
+class StageMeter:
+    """在当前进程内测量一段代码的资源消耗。"""
+
+    def start(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._io = read_process_io()
+        return self
+
+    def stop(self) -> Dict:
+        """结束测量并返回指标字典。"""
+        io_after = read_process_io()
+        metrics = {
+            "wall_time_seconds": round(time.perf_counter() - self._wall, 6),
+            "cpu_time_seconds": round(time.process_time() - self._cpu, 6),
+            "peak_rss_bytes": None,
+            # 进程内执行时只能拿到整个进程生命周期内的峰值内存
+            "rss_scope": "process",
+            "bytes_read": _io_delta(self._io, io_after, "rchar"),
+            "bytes_written": _io_delta(self._io, io_after, "wchar"),
+        }
+        if RESOURCE_AVAILABLE:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            metrics["peak_rss_bytes"] = _maxrss_to_bytes(usage.ru_maxrss)
+        return metrics
+
+
+def _exit_code_from_status(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _reap(pid: int, watchdog: Optional[StageWatchdog], options: int = 0):
+    """用wait4回收子进程；有看门狗时持有它的锁，回收后看门狗不再向该PID发信号。
+
+    Returns:
+        (status, rusage)；options 含 WNOHANG 且子进程尚未退出时为 (None, None)
+    """
+    lock = watchdog.reap_lock if watchdog else contextlib.nullcontext()
+    with lock:
+        reaped_pid, status, usage = os.wait4(pid, options)
+        if not reaped_pid:
+            return None, None
+        if watchdog:
+            watchdog.reaped = True
+    return status, usage
+
+
+def _poll_reap(pid: int, watchdog: Optional[StageWatchdog], interval: float = 0.05):
+    """没有waitid的平台上轮询回收：阻塞的wait4会一直持有锁，使看门狗无法终止子进程。"""
+    while True:
+        status, usage = _reap(pid, watchdog, os.WNOHANG)
+        if status is not None:
+            return status, usage
+        time.sleep(interval)
+
+
+def run_profiled_subprocess(cmd: List[str], cwd: Optional[str] = None,
+                            limits: Optional[Dict] = None) -> Dict:
+    """运行子进程并采集该子进程自身的资源消耗。
+
+    在Linux上先用 waitid(WNOWAIT) 等待退出但不回收，读取 /proc/<pid>/io，
+    再用 wait4 回收并获得子进程的 rusage；其他平台只记录墙钟时间。
+
+    Args:
+        cmd: 命令行
+        cwd: 工作目录
+        limits: 资源限制和看门狗配置，见 stage_watchdog
+
+    Returns:
+        包含 returncode、stdout、stderr、metrics、pid、termination_reason 的字典
+    """
+    limits = limits or {}
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        wall_start = time.perf_counter()
+        process = subprocess.Popen(cmd, cwd=cwd, stdout=out, stderr=err,
+                                   preexec_fn=make_rlimit_preexec(limits))
+
+        watchdog = None
+        if limits.get("timeout") or limits.get("stall_timeout") or limits.get("max_rss_mb"):
+            watchdog = StageWatchdog(process, limits, [out, err])
+            watchdog.start()
+
+        metrics = {
+            "wall_time_seconds": None,
+            "cpu_time_seconds": None,
+            "peak_rss_bytes": None,
+            "rss_scope": "stage",
+            "bytes_read": None,
+            "bytes_written": None,
+        }
+
+        if hasattr(os, "wait4"):
+            io_counters = None
+            if hasattr(os, "waitid"):
+                os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+                io_counters = read_process_io(process.pid)
+                status, usage = _reap(process.pid, watchdog)
+            else:
+                status, usage = _poll_reap(process.pid, watchdog)
+            process.returncode = _exit_code_from_status(status)
+            metrics.update({
+                "cpu_time_seconds": round(usage.ru_utime + usage.ru_stime, 6),
+                "peak_rss_bytes": _maxrss_to_bytes(usage.ru_maxrss),
+            })
+            if io_counters:
+                metrics["bytes_read"] = io_counters.get("rchar")
+                metrics["bytes_written"] = io_counters.get("wchar")
+        else:
+            process.wait()
+
+        if watchdog:
+            watchdog.stop()
+        metrics["wall_time_seconds"] = round(time.perf_counter() - wall_start, 6)
+
+        out.seek(0)
+        err.seek(0)
+        stderr = err.read().decode("utf-8", errors="replace")
+        return {
+            "returncode": process.returncode,
+            "stdout": out.read().decode("utf-8", errors="replace"),
+            "stderr": stderr,
+            "metrics": metrics,
+            "pid": process.pid,
+            "termination_reason": classify_termination(
+                process.returncode, stderr, watchdog.reason if watchdog else None, limits),
+        }
+
+
+def summarize_cprofile(profile_path: str, limit: int = 10) -> List[Dict]:
+    """把cProfile输出汇总为按累计时间排序的前N个函数。"""
+    if not Path(profile_path).exists():
+        return []
+
+    stats = pstats.Stats(str(profile_path))
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{Path(filename).name}:{line}({func})",
+            "ncalls": ncalls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        })
+    rows.sort(key=lambda row: row["cumtime"], reverse=True)
+    return rows[:limit]
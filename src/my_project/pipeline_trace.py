@@ -0,0 +1,91 @@
+"""流水线时间线 - 导出Chrome/Perfetto trace-event格式的JSON
+生成的文件可以在 chrome://tracing 或 https://ui.perfetto.dev 中打开，
+用于查看阶段、等待数据、子进程生命周期和数据写入在时间轴上的分布。
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 协调器进程内的轨道
+TRACK_PIPELINE = 1
+TRACK_DATA_WAIT = 2
+TRACK_DATA_WRITES = 3
+
+
+class TraceRecorder:
+    """收集trace事件，时间戳统一使用相对于记录开始时刻的微秒数。"""
+
+    def __init__(self, process_name: str = "DataCoordinator"):
+        self.origin = time.time()
+        self.pid = os.getpid()
+        self.events: List[Dict] = []
+        self._named_processes = set()
+        self.name_process(self.pid, process_name)
+        self._name_thread(self.pid, TRACK_PIPELINE, "pipeline")
+        self._name_thread(self.pid, TRACK_DATA_WAIT, "data_wait")
+        self._name_thread(self.pid, TRACK_DATA_WRITES, "data_writes")
+
+    def _ts(self, epoch_seconds: float) -> float:
+        return round((epoch_seconds - self.origin) * 1_000_000, 3)
+
+    def _name_thread(self, pid: int, tid: int, name: str):
+        self.events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                            "args": {"name": name}})
+
+    def name_process(self, pid: int, name: str):
+        """为进程轨道设置显示名称（每个进程只设置一次）。"""
+        if pid in self._named_processes:
+            return
+        self._named_processes.add(pid)
+        self.events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                            "args": {"name": name}})
+
+    def add_complete(self, name: str, start: float, end: float, category: str,
+                     tid: int = TRACK_PIPELINE, pid: Optional[int] = None,
+                     args: Optional[Dict] = None):
+        """添加一个时间段（ph=X），start/end 为 time.time() 时间戳。"""
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self._ts(start),
+            "dur": round(max(end - start, 0) * 1_000_000, 3),
+            "pid": self.pid if pid is None else pid,
+            "tid": tid,
+            "args": args or {}
+        })
+
+    def add_instant(self, name: str, at: float, category: str,
+                    tid: int = TRACK_DATA_WRITES, args: Optional[Dict] = None):
+        """添加一个瞬时事件（ph=i）。"""
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": self._ts(at),
+            "pid": self.pid,
+            "tid": tid,
+            "args": args or {}
+        })
+
+    @contextmanager
+    def span(self, name: str, category: str, tid: int = TRACK_PIPELINE, args: Optional[Dict] = None):
+        """以上下文管理器的方式记录一个时间段。"""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_complete(name, start, time.time(), category, tid, args=args)
+
+    def save(self, path: Path) -> Path:
+        """写出trace文件。"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return path
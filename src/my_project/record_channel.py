@@ -0,0 +1,216 @@
+"""记录流通道 - 生产者和消费者之间的有界流式通道
+生产者按批发送记录，消费者边收边处理，两个阶段可以重叠执行。
+
+- 传输: Unix域套接字（地址为文件路径），或TCP（地址形如 "tcp://127.0.0.1:9000"）
+- 背压: 基于信用的流控，消费者每处理完一批回复一次确认，
+  生产者最多只能有 capacity 批未确认的数据，超过时阻塞等待，内存占用因此有上限
+- 帧格式: 4字节大端长度 + UTF-8 JSON
+- 结束: 正常结束发送 end 帧；写入端因异常退出时发送 abort 帧，读取端据此抛出 ChannelAbortedError，
+  而不是把不完整的数据当作完整结果
+"""
+
+import json
+import os
+import socket
+import struct
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+_HEADER = struct.Struct(">I")
+_ACK = b"\x06"
+# 发送中止帧后等待读取端关闭连接的时间（秒）
+ABORT_DRAIN_TIMEOUT = 5.0
+
+
+class ChannelAbortedError(RuntimeError):
+    """写入端在发送完所有记录之前中止。"""
+
+
+def _parse_address(address: str) -> Tuple[int, Any]:
+    if address.startswith("tcp://"):
+        host, port = address[len("tcp://"):].rsplit(":", 1)
+        return socket.AF_INET, (host, int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError("当前平台不支持Unix域套接字，请使用 tcp://host:port 地址")
+    return socket.AF_UNIX, str(address)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_message(sock: socket.socket, message: dict):
+    payload = json.dumps(message, ensure_ascii=False, default=str).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_message(sock: socket.socket) -> Optional[dict]:
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    payload = _recv_exact(sock, _HEADER.unpack(header)[0])
+    if payload is None:
+        raise ConnectionError("通道在消息中途被关闭")
+    return json.loads(payload.decode("utf-8"))
+
+
+class ChannelWriter:
+    """通道写入端（生产者），负责监听地址并等待一个读取端连接。"""
+
+    def __init__(self, address: str, capacity: int = 8, accept_timeout: float = 60):
+        """初始化写入端。
+
+        Args:
+            address: 通道地址（Unix套接字路径或 tcp://host:port）
+            capacity: 允许未确认的最大批次数
+            accept_timeout: 等待读取端连接的超时时间（秒）
+        """
+        self.address = address
+        self.capacity = capacity
+        self.in_flight = 0
+        self.batches_sent = 0
+        self.records_sent = 0
+        self.blocked_seconds = 0.0
+
+        family, addr = _parse_address(address)
+        if family == socket.AF_INET:
+            self._server = socket.socket(family, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        else:
+            if os.path.exists(addr):
+                os.unlink(addr)
+            self._server = socket.socket(family, socket.SOCK_STREAM)
+        self._server.bind(addr)
+        self._server.listen(1)
+        self._server.settimeout(accept_timeout)
+        self._conn = None
+
+    def _ensure_connected(self):
+        if self._conn is None:
+            self._conn, _ = self._server.accept()
+            self._conn.settimeout(None)
+
+    def _wait_for_ack(self):
+        start = time.perf_counter()
+        if _recv_exact(self._conn, 1) is None:
+            raise ConnectionError("读取端已断开")
+        self.in_flight -= 1
+        self.blocked_seconds += time.perf_counter() - start
+
+    def send_batch(self, records: List[Any]):
+        """发送一批记录；未确认批次达到上限时阻塞（背压）。"""
+        self._ensure_connected()
+        while self.in_flight >= self.capacity:
+            self._wait_for_ack()
+        _send_message(self._conn, {"type": "batch", "records": records})
+        self.in_flight += 1
+        self.batches_sent += 1
+        self.records_sent += len(records)
+
+    def close(self, error: Optional[str] = None):
+        """发送结束标记，等待所有批次被确认后关闭。
+
+        Args:
+            error: 写入端出错时的错误信息；提供时发送中止帧而不是结束标记，不再等待确认
+        """
+        try:
+            try:
+                self._ensure_connected()
+            except socket.timeout:
+                # 没有读取端连接，直接关闭
+                pass
+            if self._conn is not None:
+                if error is None:
+                    _send_message(self._conn, {"type": "end"})
+                    while self.in_flight > 0:
+                        self._wait_for_ack()
+                else:
+                    self._abort(error)
+                self._conn.close()
+        finally:
+            self._server.close()
+            family, addr = _parse_address(self.address)
+            if family != socket.AF_INET and os.path.exists(addr):
+                os.unlink(addr)
+
+    def _abort(self, error: str):
+        try:
+            _send_message(self._conn, {"type": "abort", "error": error})
+            self._conn.shutdown(socket.SHUT_WR)
+            # 读取端收到中止帧后关闭连接；读完它的确认再关闭，避免连接被重置导致中止帧丢失
+            self._conn.settimeout(ABORT_DRAIN_TIMEOUT)
+            while self._conn.recv(4096):
+                pass
+        except OSError:
+            # 读取端已经断开，无需通知
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(None if exc_type is None else f"{exc_type.__name__}: {exc}")
+
+
+class ChannelReader:
+    """通道读取端（消费者），迭代得到记录批次。"""
+
+    def __init__(self, address: str, connect_timeout: float = 60, retry_interval: float = 0.05):
+        """连接到写入端；写入端尚未启动时会重试直到超时。"""
+        family, addr = _parse_address(address)
+        deadline = time.time() + connect_timeout
+        while True:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            try:
+                sock.connect(addr)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.time() > deadline:
+                    raise TimeoutError(f"连接通道超时: {address}")
+                time.sleep(retry_interval)
+        self._sock = sock
+        self._pending_ack = False
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        """逐批返回记录。取下一批时才确认上一批，保证处理完成后才释放信用。
+
+        Raises:
+            ChannelAbortedError: 写入端出错中止
+            ConnectionError: 写入端未发送结束标记就断开（例如进程被杀死）
+        """
+        while True:
+            if self._pending_ack:
+                self._sock.sendall(_ACK)
+                self._pending_ack = False
+
+            message = _recv_message(self._sock)
+            if message is None:
+                raise ConnectionError("写入端未发送结束标记就断开，数据不完整")
+            if message["type"] == "end":
+                return
+            if message["type"] == "abort":
+                raise ChannelAbortedError(f"写入端中止: {message.get('error')}")
+            self._pending_ack = True
+            yield message["records"]
+
+    def close(self):
+        if self._pending_ack:
+            try:
+                self._sock.sendall(_ACK)
+            except OSError:
+                pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,392 @@
+"""关联分析引擎 - 在共享存储的记录集上做哈希连接和分组聚合
+数据以DataFrame分块流式处理，连接和聚合都使用pandas的向量化实现；
+构建侧或分组状态超过内存上限时，按键的哈希值分区写入磁盘（Grace哈希连接），
+再逐个分区处理，峰值内存由上限决定，而不是输入的总行数。
+
+用法:
+    python relational.py benchmark --rows 10000000 --users 100000
+"""
+
+import json
+import pickle
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+# 默认每个分块的行数
+DEFAULT_CHUNK_ROWS = 100_000
+# 哈希连接构建侧在内存中允许的最大行数，超过时分区写盘
+DEFAULT_MEMORY_ROWS = 2_000_000
+# 分组聚合在内存中允许的最大分组数，超过时分区写盘
+DEFAULT_MAX_GROUPS = 1_000_000
+# 写盘时的分区数
+DEFAULT_PARTITIONS = 16
+
+# 支持的聚合函数；mean拆成sum和count两个可合并的部分
+AGGREGATIONS = ("count", "size", "sum", "mean", "min", "max")
+
+
+def _chunked(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _partition_ids(df: pd.DataFrame, columns: List[str], partitions: int) -> np.ndarray:
+    """按列值的哈希计算分区号；数值列统一转为float64，保证两侧dtype不同（int/float）时分区一致。"""
+    keys = pd.DataFrame({
+        column: df[column].astype("float64")
+        if ptypes.is_numeric_dtype(df[column]) and not ptypes.is_bool_dtype(df[column])
+        else df[column].astype(object)
+        for column in columns
+    })
+    return (pd.util.hash_pandas_object(keys, index=False).to_numpy() % partitions).astype(np.int64)
+
+
+class _SpillPartitions:
+    """按哈希分区追加写入磁盘的DataFrame集合，每个分区一个文件。"""
+
+    def __init__(self, directory: Path, columns: List[str], partitions: int, prefix: str):
+        self.columns = columns
+        self.partitions = partitions
+        self.paths = [directory / f"{prefix}_{index}.pkl" for index in range(partitions)]
+        self._files = [open(path, "wb") for path in self.paths]
+        self.rows = 0
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        ids = _partition_ids(df, self.columns, self.partitions)
+        for index, positions in pd.Series(ids).groupby(ids).indices.items():
+            pickle.dump(df.iloc[positions], self._files[index], protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows += len(df)
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+    def read(self, index: int) -> Iterator[pd.DataFrame]:
+        """逐块读取一个分区。"""
+        with open(self.paths[index], "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+
+@contextmanager
+def _spill_directory(spill_dir: Optional[str]):
+    """临时的写盘目录，用完即删；默认位于数据目录下的 relational_spill。"""
+    if spill_dir is None:
+        from data_manager import get_data_manager
+        spill_dir = get_data_manager().data_dir / "relational_spill"
+    Path(spill_dir).mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=spill_dir) as directory:
+        yield Path(directory)
+
+
+def shared_records_format(key: str) -> Optional[str]:
+    """共享数据以哪种格式保存："json"、"jsonl"，不存在时返回None。
+
+    两种文件都存在时（例如先用 append_shared_records 写过，又用 save_shared_data 覆盖），
+    返回修改时间较新的一个，与最后一次写入保持一致。
+    """
+    from data_manager import get_data_manager
+
+    data_dir = get_data_manager().data_dir
+    mtimes = {}
+    for fmt in ("json", "jsonl"):
+        try:
+            mtimes[fmt] = (data_dir / f"{key}.{fmt}").stat().st_mtime_ns
+        except OSError:
+            pass
+    return max(mtimes, key=mtimes.get) if mtimes else None
+
+
+class Relation:
+    """可重复遍历的DataFrame分块流，作为连接和聚合的输入。"""
+
+    def __init__(self, chunks: Callable[[], Iterable[pd.DataFrame]], name: Optional[str] = None):
+        """初始化关系。
+
+        Args:
+            chunks: 每次调用返回一个新的分块迭代器
+            name: 关系名称，用于日志
+        """
+        self._chunks = chunks
+        self.name = name
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                   name: Optional[str] = None) -> "Relation":
+        return cls(lambda: _chunked(df, chunk_rows), name)
+
+    @classmethod
+    def from_shared_key(cls, key: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        fmt: Optional[str] = None) -> "Relation":
+        """读取共享存储中的记录集：JSON列表（save_shared_data）或JSON Lines记录集（append_shared_records，逐块读取）。
+
+        Args:
+            key: 数据键名
+            chunk_rows: 每个分块的行数
+            fmt: "json" 或 "jsonl"；为None时两种文件都存在则使用较新的一个（见 shared_records_format）
+
+        Raises:
+            KeyError: 指定格式（或任一格式）的文件不存在
+            ValueError: JSON文件的内容不是记录列表
+        """
+        from data_manager import get_data_manager
+
+        data_dir = get_data_manager().data_dir
+        fmt = fmt or shared_records_format(key)
+        path = data_dir / f"{key}.{fmt}" if fmt else None
+        if path is None or not path.exists():
+            raise KeyError(f"共享数据不存在: {key}" + (f" ({fmt})" if fmt else ""))
+
+        if fmt == "jsonl":
+            def chunks():
+                with open(path, "r", encoding="utf-8") as f:
+                    buffer = []
+                    for line in f:
+                        if line.strip():
+                            buffer.append(json.loads(line))
+                        if len(buffer) >= chunk_rows:
+                            yield pd.DataFrame.from_records(buffer)
+                            buffer = []
+                    if buffer:
+                        yield pd.DataFrame.from_records(buffer)
+            return cls(chunks, key)
+
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            raise ValueError(f"共享数据 '{key}' 不是记录列表")
+        return cls.from_frame(pd.DataFrame.from_records(records), chunk_rows, key)
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        yield from self._chunks()
+
+    def first_chunk(self) -> Optional[pd.DataFrame]:
+        """返回第一个分块，没有数据时返回None；读取后立即关闭分块迭代器及其打开的文件。"""
+        with closing(self.chunks()) as chunks:
+            return next(chunks, None)
+
+    def to_frame(self) -> pd.DataFrame:
+        frames = list(self.chunks())
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def join(self, other: "Relation", left_on: Union[str, List[str]], right_on: Union[str, List[str], None] = None,
+             how: str = "inner", suffixes: Tuple[str, str] = ("", "_right"),
+             memory_rows: int = DEFAULT_MEMORY_ROWS, partitions: int = DEFAULT_PARTITIONS,
+             spill_dir: Optional[str] = None) -> "Relation":
+        """哈希连接，self为探测侧（可以很大），other为构建侧（通常较小）。
+
+        构建侧不超过 memory_rows 行时整体放在内存中，探测侧逐块连接；
+        否则两侧都按连接键分区写盘，再逐个分区连接。键为空的行不参与匹配。
+
+        Args:
+            other: 构建侧关系
+            left_on: 本关系的连接列
+            right_on: other的连接列，默认与left_on相同
+            how: "inner" 或 "left"
+            suffixes: 重名列的后缀
+            memory_rows: 构建侧在内存中的最大行数
+            partitions: 写盘时的分区数
+            spill_dir: 写盘目录
+
+        Returns:
+            惰性的连接结果，遍历时才执行
+        """
+        if how not in ("inner", "left"):
+            raise ValueError(f"不支持的连接方式: {how}")
+        left_on = [left_on] if isinstance(left_on, str) else list(left_on)
+        right_on = left_on if right_on is None else [right_on] if isinstance(right_on, str) else list(right_on)
+
+        def merge(probe: pd.DataFrame, build: pd.DataFrame) -> pd.DataFrame:
+            return probe.merge(build, how=how, left_on=left_on, right_on=right_on, suffixes=suffixes)
+
+        def build_frame(chunks: Iterable[pd.DataFrame], empty: pd.DataFrame) -> pd.DataFrame:
+            # 某个分区没有构建侧的行时，用空表保持结果的列和dtype一致
+            frames = [chunk.dropna(subset=right_on) for chunk in chunks]
+            return pd.concat(frames, ignore_index=True) if frames else empty
+
+        def chunks():
+            # 先尝试在内存中构建；超过上限后剩余部分直接分区写盘
+            build_chunks, build_rows = [], 0
+            build_iter = iter(other.chunks())
+            for chunk in build_iter:
+                build_chunks.append(chunk)
+                build_rows += len(chunk)
+                if build_rows > memory_rows:
+                    break
+            else:
+                build = build_frame(build_chunks, pd.DataFrame(columns=right_on))
+                for probe in self.chunks():
+                    yield merge(probe, build)
+                return
+
+            empty = build_chunks[0].iloc[:0]
+            with _spill_directory(spill_dir) as directory:
+                build_spill = _SpillPartitions(directory, right_on, partitions, "build")
+                for chunk in build_chunks:
+                    build_spill.write(chunk.dropna(subset=right_on))
+                del build_chunks
+                for chunk in build_iter:
+                    build_spill.write(chunk.dropna(subset=right_on))
+                build_spill.close()
+
+                probe_spill = _SpillPartitions(directory, left_on, partitions, "probe")
+                for probe in self.chunks():
+                    probe_spill.write(probe)
+                probe_spill.close()
+
+                for index in range(partitions):
+                    build = build_frame(build_spill.read(index), empty)
+                    for probe in probe_spill.read(index):
+                        yield merge(probe, build)
+
+        return Relation(chunks, f"{self.name}⋈{other.name}")
+
+    def group_by(self, by: Union[str, List[str]], aggregations: Dict[str, Tuple[Optional[str], str]],
+                 max_groups: int = DEFAULT_MAX_GROUPS, partitions: int = DEFAULT_PARTITIONS,
+                 spill_dir: Optional[str] = None) -> pd.DataFrame:
+        """分组聚合。每个分块先做向量化的部分聚合，再合并部分结果；
+        分组数超过 max_groups 时部分结果按分组键分区写盘，逐个分区合并。空值作为单独的分组。
+
+        Args:
+            by: 分组列
+            aggregations: {输出列: (输入列, 函数)}，函数见 AGGREGATIONS；size不需要输入列
+            max_groups: 内存中的最大分组数
+            partitions: 写盘时的分区数
+            spill_dir: 写盘目录
+
+        Returns:
+            每个分组一行的DataFrame，按分组键排序
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        for output, (column, func) in aggregations.items():
+            if func not in AGGREGATIONS:
+                raise ValueError(f"不支持的聚合函数: {output} -> {func}")
+
+        # 部分聚合列及其合并方式
+        partial_specs, combine_specs = {}, {}
+        for output, (column, func) in aggregations.items():
+            parts = {"mean": ("sum", "count"), "size": ("size",)}.get(func, (func,))
+            for part in parts:
+                name = f"{output}__{part}"
+                partial_specs[name] = (by[0] if part == "size" else column, part)
+                combine_specs[name] = (name, "sum" if part in ("count", "size", "sum") else part)
+
+        def partial(chunk: pd.DataFrame) -> pd.DataFrame:
+            return chunk.groupby(by, dropna=False, sort=False).agg(**partial_specs).reset_index()
+
+        def combine(frames: List[pd.DataFrame]) -> pd.DataFrame:
+            return pd.concat(frames, ignore_index=True).groupby(by, dropna=False, sort=False) \
+                .agg(**combine_specs).reset_index()
+
+        def finish(state: pd.DataFrame) -> pd.DataFrame:
+            result = state[by].copy()
+            for output, (column, func) in aggregations.items():
+                if func == "mean":
+                    count = state[f"{output}__count"]
+                    result[output] = state[f"{output}__sum"] / count.where(count > 0)
+                else:
+                    result[output] = state[f"{output}__{func}"]
+            return result.sort_values(by, na_position="last", ignore_index=True)
+
+        state, spill = None, None
+        with ExitStack() as stack:
+            for chunk in self.chunks():
+                if chunk.empty:
+                    continue
+                part = partial(chunk)
+                if spill is not None:
+                    spill.write(part)
+                    continue
+                state = part if state is None else combine([state, part])
+                if len(state) > max_groups:
+                    directory = stack.enter_context(_spill_directory(spill_dir))
+                    spill = _SpillPartitions(directory, by, partitions, "groups")
+                    spill.write(state)
+                    state = None
+
+            if spill is not None:
+                spill.close()
+                finished = [finish(combine(frames)) for frames in
+                            (list(spill.read(index)) for index in range(partitions)) if frames]
+                return pd.concat(finished, ignore_index=True).sort_values(by, na_position="last", ignore_index=True)
+
+        if state is None:
+            return pd.DataFrame(columns=by + list(aggregations))
+        return finish(state)
+
+
+def run_relational_benchmark(rows: int = 10_000_000, user_count: int = 100_000, seed: int = 0,
+                             memory_rows: Sequence[int] = (DEFAULT_MEMORY_ROWS, 10_000)) -> Dict:
+    """连接+分组聚合的基准测试。
+
+    用 SyntheticDataGenerator 流式生成 rows 个项目和 user_count 个用户，
+    分别在构建侧放入内存和强制写盘两种设置下执行
+    "各部门项目数和平均进度"（项目⋈用户后按部门分组）和"各状态平均进度"（直接分组），
+    记录耗时和吞吐量，结果保存到共享数据 "relational_benchmark"。
+    """
+    from data_manager import get_data_manager
+    from synthetic_data import SyntheticDataGenerator
+
+    users = SyntheticDataGenerator(seed).users(user_count)
+    users = Relation.from_frame(pd.concat(list(users), ignore_index=True), name="users")
+    aggregations = {"project_count": ("id", "count"), "avg_progress": ("progress", "mean")}
+
+    results = []
+    for limit in memory_rows:
+        projects = Relation(lambda: SyntheticDataGenerator(seed).projects(rows, user_count), "projects")
+
+        start = time.perf_counter()
+        per_department = projects.join(users, left_on="owner_id", right_on="id", how="left",
+                                       suffixes=("", "_owner"), memory_rows=limit) \
+            .group_by("department", aggregations)
+        join_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        projects.group_by("status", aggregations)
+        group_seconds = time.perf_counter() - start
+
+        results.append({
+            "rows": rows,
+            "user_count": user_count,
+            "memory_rows": limit,
+            "spilled": user_count > limit,
+            "joined_rows": int(per_department["project_count"].sum()),
+            "join_group_seconds": round(join_seconds, 4),
+            "group_seconds": round(group_seconds, 4),
+            "join_rows_per_second": round(rows / join_seconds, 2) if join_seconds > 0 else None,
+            "group_rows_per_second": round(rows / group_seconds, 2) if group_seconds > 0 else None,
+        })
+
+    benchmark = {"seed": seed, "run_time": datetime.now().isoformat(), "results": results}
+    get_data_manager().save_shared_data("relational_benchmark", benchmark)
+
+    print("\n=== 关联分析基准测试 ===")
+    print(f"{'行数':>10} {'写盘':>6} {'连接+分组(秒)':>14} {'分组(秒)':>10} {'连接吞吐(行/秒)':>16}")
+    for r in results:
+        print(f"{r['rows']:>10} {str(r['spilled']):>6} {r['join_group_seconds']:>14} "
+              f"{r['group_seconds']:>10} {r['join_rows_per_second']:>16}")
+    return benchmark
+
+
+def _arg(name: str, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        run_relational_benchmark(int(_arg("--rows", 10_000_000)), int(_arg("--users", 100_000)),
+                                 int(_arg("--seed", 0)))
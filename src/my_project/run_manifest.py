@@ -0,0 +1,96 @@
+"""流水线运行清单 - 记录每次运行中各阶段的完成情况
+清单保存在数据目录下的子目录中，不会被 clear_shared_data 清理，
+失败的运行可以据此从检查点恢复。
+"""
+
+import json
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class RunManifestStore:
+    """运行清单存储，每次运行一个JSON文件。"""
+
+    def __init__(self, dm, runs_dir_name: str = "runs"):
+        """初始化运行清单存储。
+
+        Args:
+            dm: 数据管理器实例
+            runs_dir_name: 清单子目录名称
+        """
+        self.dm = dm
+        self.runs_dir = dm.data_dir / runs_dir_name
+        self.runs_dir.mkdir(exist_ok=True)
+
+    def create(self, stages: List[Dict]) -> Dict:
+        """为一次新的运行创建清单。"""
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        manifest = {
+            "run_id": run_id,
+            "created_time": datetime.now().isoformat(),
+            "status": "running",
+            "resume_count": 0,
+            "stages": {
+                stage["name"]: {"status": "pending", "outputs": {}} for stage in stages
+            }
+        }
+        self.save(manifest)
+        return manifest
+
+    def save(self, manifest: Dict):
+        manifest["updated_time"] = datetime.now().isoformat()
+        path = self.runs_dir / f"{manifest['run_id']}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    def load(self, run_id: str) -> Optional[Dict]:
+        """加载指定运行的清单，不存在时返回None。"""
+        path = self.runs_dir / f"{run_id}.json"
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_runs(self) -> List[str]:
+        """按时间顺序列出所有运行ID。"""
+        return sorted(p.stem for p in self.runs_dir.glob("*.json"))
+
+    def latest_failed_run(self) -> Optional[str]:
+        """返回最近一次失败的运行ID。"""
+        for run_id in reversed(self.list_runs()):
+            manifest = self.load(run_id)
+            if manifest and manifest.get("status") == "failed":
+                return run_id
+        return None
+
+    def mark_stage(self, manifest: Dict, stage: Dict, success: bool):
+        """记录阶段结果；成功时同时记录其输出数据的版本（内容哈希）。"""
+        record = manifest["stages"].setdefault(stage["name"], {})
+        record["status"] = "completed" if success else "failed"
+        record["finished_time"] = datetime.now().isoformat()
+        record["outputs"] = {}
+        if success:
+            for key in stage.get("outputs", []):
+                output_hash = self.dm.get_data_hash(key)
+                if output_hash is not None:
+                    record["outputs"][key] = output_hash
+        self.save(manifest)
+
+    def first_stage_to_rerun(self, manifest: Dict, stages: List[Dict]) -> Optional[int]:
+        """找到需要重新执行的第一个阶段的下标。
+
+        阶段未完成，或者它产出的数据版本已经被修改/删除，都需要重新执行；
+        其后的所有阶段都属于下游，需要一并重新执行。
+
+        Returns:
+            阶段下标，所有阶段都已完成且输出未变化时返回None
+        """
+        for index, stage in enumerate(stages):
+            record = manifest["stages"].get(stage["name"], {})
+            if record.get("status") != "completed":
+                return index
+            for key, output_hash in record.get("outputs", {}).items():
+                if self.dm.get_data_hash(key) != output_hash:
+                    return index
+        return None
@@ -0,0 +1,147 @@
+"""流式抽样 - 在分块读取的数据上做蓄水池抽样，可按列分层
+无论数据有多少行，只保留固定数量的样本，每一行被选中的概率相同，
+因此样本能代表整个数据集，而不是只代表开头的几行。
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from utils import df_to_records
+
+
+class _Reservoir:
+    """单个蓄水池（Algorithm R 的向量化实现）。"""
+
+    def __init__(self, capacity: int, rng: np.random.Generator):
+        self.capacity = capacity
+        self.rng = rng
+        self.seen = 0
+        self.rows: List[Optional[Dict]] = [None] * capacity
+        self.positions: List[int] = [0] * capacity
+
+    def offer(self, chunk: pd.DataFrame, positions: np.ndarray):
+        """提交一批行，positions 为这些行在整个数据集中的行号。"""
+        count = len(chunk)
+        if count == 0 or self.capacity == 0:
+            self.seen += count
+            return
+
+        # 第 i 个到达的行以 capacity/(i+1) 的概率替换随机槽位；蓄水池未满时直接放入
+        arrival = self.seen + np.arange(count)
+        slots = np.where(arrival < self.capacity, arrival,
+                         self.rng.integers(0, arrival + 1))
+        accepted = np.flatnonzero(slots < self.capacity)
+        if len(accepted):
+            # 同一槽位在本批中被多次替换时，只有最后一次有效
+            slot_series = pd.Series(slots[accepted], index=accepted)
+            winners = slot_series[~slot_series.duplicated(keep="last")]
+            records = df_to_records(chunk.iloc[winners.index])
+            for slot, record, position in zip(winners.to_numpy(), records, positions[winners.index]):
+                self.rows[slot] = record
+                self.positions[slot] = int(position)
+        self.seen += count
+
+    def merge(self, other: "_Reservoir", position_offset: int = 0):
+        """合并另一个蓄水池，结果是两者全部行上的均匀样本，可以继续 offer。
+
+        从两边各取多少行服从超几何分布，再在各自的蓄水池中均匀抽取。
+        """
+        size = min(self.capacity, self.seen + other.seen)
+        from_other = int(self.rng.hypergeometric(other.seen, self.seen, size)) if size else 0
+        mine = [(self.positions[slot], self.rows[slot]) for slot in self.subsample(size - from_other)]
+        theirs = [(other.positions[slot] + position_offset, other.rows[slot])
+                  for slot in other.subsample(from_other)]
+        kept = mine + theirs
+        self.rows = [row for _, row in kept] + [None] * (self.capacity - len(kept))
+        self.positions = [position for position, _ in kept] + [0] * (self.capacity - len(kept))
+        self.seen += other.seen
+
+    @property
+    def filled(self) -> int:
+        return min(self.seen, self.capacity)
+
+    def subsample(self, size: int) -> List[int]:
+        """从蓄水池中再均匀抽取 size 个，返回槽位列表。"""
+        if size >= self.filled:
+            return list(range(self.filled))
+        return sorted(self.rng.choice(self.filled, size=size, replace=False).tolist())
+
+
+class ReservoirSampler:
+    """对逐块到达的数据做等概率抽样，内存只与样本大小（和分层数）有关。"""
+
+    def __init__(self, sample_size: int = 3, stratify_by: Optional[str] = None, seed: Optional[int] = None):
+        """初始化抽样器。
+
+        Args:
+            sample_size: 样本总行数
+            stratify_by: 分层列；设置后每层单独抽样，最终按各层行数比例分配样本（每层至少一行），
+                内存随层数线性增长，适合低基数的列
+            seed: 随机种子，便于复现
+        """
+        self.sample_size = sample_size
+        self.stratify_by = stratify_by
+        self.rng = np.random.default_rng(seed)
+        self.row_count = 0
+        self._reservoirs: Dict = {}
+
+    def _reservoir(self, stratum) -> _Reservoir:
+        if stratum not in self._reservoirs:
+            self._reservoirs[stratum] = _Reservoir(self.sample_size, self.rng)
+        return self._reservoirs[stratum]
+
+    def update(self, chunk: pd.DataFrame) -> "ReservoirSampler":
+        positions = self.row_count + np.arange(len(chunk))
+        if self.stratify_by is None:
+            self._reservoir(None).offer(chunk, positions)
+        else:
+            strata = chunk[self.stratify_by].astype(object).where(chunk[self.stratify_by].notna(), None)
+            for stratum, indices in strata.groupby(strata, dropna=False, sort=False).indices.items():
+                key = None if pd.isna(stratum) else stratum
+                self._reservoir(key).offer(chunk.iloc[indices], positions[indices])
+        self.row_count += len(chunk)
+        return self
+
+    def merge(self, other: "ReservoirSampler") -> "ReservoirSampler":
+        """合并另一个抽样器（例如另一个分区）的样本，等价于在两者的数据依次拼接后抽样。
+
+        other 的行号排在本抽样器已处理的行之后；两者的 sample_size 和 stratify_by 应相同。
+        """
+        for stratum, reservoir in other._reservoirs.items():
+            self._reservoir(stratum).merge(reservoir, self.row_count)
+        self.row_count += other.row_count
+        return self
+
+    def _allocation(self) -> Dict:
+        """按各层行数比例分配样本数（最大余数法），每个非空层至少一行，
+        总数恰好等于 min(sample_size, 总行数)。"""
+        seen = {stratum: reservoir.seen for stratum, reservoir in self._reservoirs.items() if reservoir.seen}
+        total = sum(seen.values())
+        if total == 0:
+            return {}
+        if len(seen) >= self.sample_size:
+            # 层数不少于样本数时，从行数最多的层中各取一行
+            largest = sorted(seen, key=seen.get, reverse=True)[:self.sample_size]
+            return {stratum: 1 for stratum in largest}
+
+        size = min(self.sample_size, total)
+        quotas = {stratum: size * count / total for stratum, count in seen.items()}
+        allocation = {stratum: max(1, int(quota)) for stratum, quota in quotas.items()}
+        remaining = size - sum(allocation.values())
+        for stratum in sorted(quotas, key=lambda s: quotas[s] - int(quotas[s]), reverse=True)[:max(remaining, 0)]:
+            allocation[stratum] += 1
+        # 小层保底的一行使总数超出时，从超出比例最多的层收回（层数少于样本数，总能收回）
+        while remaining < 0:
+            stratum = max((s for s in allocation if allocation[s] > 1), key=lambda s: allocation[s] - quotas[s])
+            allocation[stratum] -= 1
+            remaining += 1
+        return allocation
+
+    def sample(self) -> List[Dict]:
+        """返回样本记录，按原始行号排序。"""
+        chosen = []
+        for stratum, size in self._allocation().items():
+            reservoir = self._reservoirs[stratum]
+            chosen.extend((reservoir.positions[slot], reservoir.rows[slot]) for slot in reservoir.subsample(size))
+        return [record for _, record in sorted(chosen, key=lambda item: item[0])]
@@ -0,0 +1,228 @@
+"""流水线阶段缓存 - 基于内容哈希的阶段记忆化
+对阶段的源文件、输入数据和参数计算指纹，指纹未变化时直接复用上次的输出，
+实现类似make的增量流水线运行。
+"""
+
+import ast
+import hashlib
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from utils import compute_file_hash
+
+
+class StageCache:
+    """阶段输出缓存，缓存文件保存在数据目录下的子目录中。"""
+
+    def __init__(self, dm, cache_dir_name: str = "stage_cache"):
+        """初始化阶段缓存。
+
+        Args:
+            dm: 数据管理器实例
+            cache_dir_name: 缓存子目录名称（不会出现在共享数据列表中）
+        """
+        self.dm = dm
+        self.cache_dir = dm.data_dir / cache_dir_name
+        self.cache_dir.mkdir(exist_ok=True)
+        self.index_path = self.cache_dir / "index.json"
+
+    def _load_index(self) -> Dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index: Dict):
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+    def fingerprint(self, stage: Dict) -> str:
+        """计算阶段指纹：源文件及其导入的同目录模块 + 输入数据的内容哈希 + 外部输入文件 + 参数。
+
+        Args:
+            stage: 阶段定义，包含 file、inputs、input_files、params 等字段；
+                deps 可额外声明静态分析找不到的依赖文件（例如动态导入的模块）
+
+        Returns:
+            十六进制指纹字符串
+        """
+        parts = {
+            "source": compute_file_hash(stage["file"]),
+            "modules": self._module_hashes(stage["file"]),
+            "deps": {str(p): compute_file_hash(p) for p in stage.get("deps", [])},
+            "inputs": {key: self.dm.get_data_hash(key) for key in stage.get("inputs", [])},
+            "input_files": {str(p): compute_file_hash(p) for p in stage.get("input_files", [])},
+            "params": stage.get("params", {}),
+        }
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _module_hashes(source_file) -> Dict[str, Optional[str]]:
+        """找出源文件（直接或间接）导入的同目录模块，返回 模块名 -> 内容哈希。
+
+        用ast分析 import 语句（包括函数内的延迟导入），只跟踪与阶段脚本位于同一目录的模块，
+        第三方库和标准库不计入指纹。
+        """
+        source_dir = Path(source_file).resolve().parent
+        hashes = {}
+        pending = [Path(source_file).resolve()]
+        while pending:
+            path = pending.pop()
+            try:
+                tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+            except (OSError, SyntaxError, ValueError):
+                continue
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    names = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    names = [node.module]
+                else:
+                    continue
+                for name in names:
+                    module = name.split(".")[0]
+                    module_path = source_dir / f"{module}.py"
+                    if module not in hashes and module_path.exists():
+                        hashes[module] = compute_file_hash(module_path)
+                        pending.append(module_path)
+        return hashes
+
+    def _output_path(self, key: str) -> Optional[Path]:
+        """输出键对应的文件：JSON文件，没有时为同名的记录集（.jsonl）。"""
+        for suffix in (".json", ".jsonl"):
+            path = self.dm.data_dir / f"{key}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def _snapshots(self, entry: Dict) -> List[Path]:
+        """缓存条目的全部快照路径（输出文件和输出目录）。"""
+        suffixes = entry.get("output_suffixes", {})
+        paths = [self.cache_dir / self._snapshot_name(entry["fingerprint"], key, suffixes.get(key, ".json"))
+                 for key in entry.get("outputs", {})]
+        paths += [self.cache_dir / self._snapshot_name(entry["fingerprint"], name, "")
+                  for name in entry.get("output_dirs", [])]
+        return paths
+
+    def lookup(self, stage: Dict, fingerprint: str) -> Optional[Dict]:
+        """查找指纹匹配且快照完整的缓存条目。"""
+        entry = self._load_index().get(stage["name"])
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+
+        if not all(path.exists() for path in self._snapshots(entry)):
+            return None
+        return entry
+
+    def restore(self, entry: Dict) -> List[str]:
+        """把缓存的输出恢复到共享数据目录，只复制内容已变化的键和文件。
+
+        Returns:
+            实际恢复的数据键和目录列表
+        """
+        restored = []
+        suffixes = entry.get("output_suffixes", {})
+        for key, output_hash in entry["outputs"].items():
+            suffix = suffixes.get(key, ".json")
+            current = self._output_path(key)
+            if current is not None and current.suffix == suffix and compute_file_hash(current) == output_hash:
+                continue
+            # 另一种格式的同名文件会遮住恢复的文件（JSON优先于记录集），一并删除
+            for path in (self.dm.data_dir / f"{key}.json", self.dm.data_dir / f"{key}.jsonl"):
+                path.unlink(missing_ok=True)
+            snapshot = self.cache_dir / self._snapshot_name(entry["fingerprint"], key, suffix)
+            shutil.copyfile(snapshot, self.dm.data_dir / f"{key}{suffix}")
+            restored.append(key)
+
+        for name in entry.get("output_dirs", []):
+            snapshot = self.cache_dir / self._snapshot_name(entry["fingerprint"], name, "")
+            if self._restore_dir(snapshot, self.dm.data_dir / name):
+                restored.append(name)
+        return restored
+
+    @staticmethod
+    def _restore_dir(snapshot: Path, target: Path) -> bool:
+        """把快照目录中缺失或内容不同的文件复制回目标目录，目标目录中的其他文件保留。"""
+        changed = False
+        for source in snapshot.rglob("*"):
+            if not source.is_file():
+                continue
+            dest = target / source.relative_to(snapshot)
+            if dest.exists() and compute_file_hash(dest) == compute_file_hash(source):
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, dest)
+            changed = True
+        return changed
+
+    def store(self, stage: Dict, fingerprint: str) -> Dict:
+        """阶段执行成功后，快照其输出（包括记录集和 output_dirs 中的目录）并记录指纹。
+
+        Returns:
+            新的缓存条目
+        """
+        outputs, suffixes = {}, {}
+        for key in stage.get("outputs", []):
+            path = self._output_path(key)
+            if path is None:
+                # 阶段没有产生这个输出（例如Excel处理失败时不写统计）
+                continue
+            shutil.copyfile(path, self.cache_dir / self._snapshot_name(fingerprint, key, path.suffix))
+            outputs[key] = compute_file_hash(path)
+            suffixes[key] = path.suffix
+
+        output_dirs = []
+        for name in stage.get("output_dirs", []):
+            source = self.dm.data_dir / name
+            if not source.is_dir():
+                continue
+            snapshot = self.cache_dir / self._snapshot_name(fingerprint, name, "")
+            shutil.rmtree(snapshot, ignore_errors=True)
+            shutil.copytree(source, snapshot)
+            output_dirs.append(name)
+
+        index = self._load_index()
+        old_entry = index.get(stage["name"])
+        entry = {
+            "fingerprint": fingerprint,
+            "outputs": outputs,
+            "output_suffixes": suffixes,
+            "output_dirs": output_dirs,
+            "created_time": datetime.now().isoformat()
+        }
+        index[stage["name"]] = entry
+        self._save_index(index)
+
+        # 每个阶段只保留最近一次的快照
+        if old_entry and old_entry.get("fingerprint") != fingerprint:
+            self._remove_snapshots(old_entry)
+
+        return entry
+
+    def invalidate(self, stage_name: Optional[str] = None):
+        """清除某个阶段（或全部阶段）的缓存。"""
+        if stage_name is None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.cache_dir.mkdir(exist_ok=True)
+            return
+
+        index = self._load_index()
+        entry = index.pop(stage_name, None)
+        if entry:
+            self._remove_snapshots(entry)
+            self._save_index(index)
+
+    def _remove_snapshots(self, entry: Dict):
+        for path in self._snapshots(entry):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _snapshot_name(fingerprint: str, key: str, suffix: str = ".json") -> str:
+        return f"{fingerprint[:16]}_{key}{suffix}"
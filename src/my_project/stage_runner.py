@@ -0,0 +1,190 @@
+"""流水线阶段执行器 - 在当前进程或预热的工作进程中运行阶段脚本
+避免每个阶段都启动新的Python解释器并重新导入pandas等重量级依赖。
+"""
+
+import cProfile
+import io
+import os
+import runpy
+import sys
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from pipeline_profiler import StageMeter
+
+# 工作进程启动时预先导入的模块
+DEFAULT_PRELOAD_MODULES = ["pandas", "data_manager"]
+
+# 已导入的项目模块（与阶段脚本同目录）首次出现时的源文件状态，用于发现运行期间被修改的模块
+_project_module_states: Dict[str, Optional[tuple]] = {}
+
+
+def _exit_code(code) -> int:
+    """把SystemExit的code转换为进程返回码。"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    # exit("message") 的行为与解释器一致：打印消息并返回1
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _source_state(file_path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(file_path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def _project_modules(project_dir: str) -> Dict[str, str]:
+    """sys.modules 中源文件位于 project_dir 的模块。"""
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        file_path = getattr(module, "__file__", None)
+        if file_path and os.path.dirname(os.path.abspath(file_path)) == project_dir:
+            modules[name] = file_path
+    return modules
+
+
+def purge_stale_project_modules(project_dir: str) -> List[str]:
+    """项目模块的源文件在导入后被修改时，从 sys.modules 中清除全部项目模块。
+
+    常驻进程（进程内执行、预热进程池、队列工作进程）共享已导入的模块，
+    不清除的话修改后的阶段仍会调用旧代码，结果还会以新代码的指纹写入阶段缓存。
+    模块之间互相 from-import，只重新导入修改过的模块不够，因此一并清除；
+    pandas 等第三方依赖不受影响，仍然保持预热。
+
+    Returns:
+        被清除的模块名，没有模块被修改时为空列表
+    """
+    project_dir = os.path.abspath(project_dir)
+    modules = _project_modules(project_dir)
+    stale = False
+    for name, file_path in modules.items():
+        state = _source_state(file_path)
+        if _project_module_states.setdefault(name, state) != state:
+            stale = True
+    if not stale:
+        return []
+    for name in modules:
+        sys.modules.pop(name, None)
+        _project_module_states.pop(name, None)
+    return sorted(modules)
+
+
+def run_stage_inprocess(file_path: str, argv: Optional[Sequence[str]] = None,
+                        cprofile_path: Optional[str] = None) -> Dict:
+    """在当前进程中以 __main__ 身份运行阶段脚本。
+
+    每次运行都使用全新的全局命名空间，但共享已导入的模块，
+    因此第二次及以后的运行不再承担解释器启动和导入的开销。
+    运行前检查已导入的项目模块，源文件被修改过时先清除它们（见 purge_stale_project_modules）。
+    
+    共享模块也意味着共享模块级状态：阶段脚本与调用方（以及同一进程中之前运行的阶段）
+    使用同一个 data_manager._global_data_manager 和 workbook_cache._global_workbook_cache，
+    阶段对它们的修改（例如更换 data_dir）会保留到之后的运行。需要隔离状态的阶段应使用subprocess模式。
+    sys.argv、sys.path 和当前目录在运行结束后（包括脚本抛出异常或调用 exit 时）恢复。
+
+    Args:
+        file_path: 阶段脚本路径
+        argv: 传给脚本的命令行参数
+        cprofile_path: 如果提供，在cProfile下运行并把结果写入该路径
+
+    Returns:
+        包含 returncode、stdout、stderr、metrics、pid 的字典；
+        清除过项目模块时还有 reloaded_modules
+    """
+    path = Path(file_path).resolve()
+    reloaded = purge_stale_project_modules(str(path.parent))
+    stdout, stderr = io.StringIO(), io.StringIO()
+    returncode = 0
+
+    old_argv, old_path, old_cwd = sys.argv[:], sys.path[:], os.getcwd()
+    profiler = cProfile.Profile() if cprofile_path else None
+    meter = StageMeter().start()
+
+    try:
+        sys.argv = [str(path)] + list(argv or [])
+        sys.path.insert(0, str(path.parent))
+        os.chdir(path.parent)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                if profiler:
+                    profiler.enable()
+                runpy.run_path(str(path), run_name="__main__")
+            except SystemExit as e:
+                returncode = _exit_code(e.code)
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+            finally:
+                if profiler:
+                    profiler.disable()
+    finally:
+        sys.argv, sys.path[:] = old_argv, old_path
+        os.chdir(old_cwd)
+        # 记录本次新导入的项目模块的源文件状态
+        purge_stale_project_modules(str(path.parent))
+
+    metrics = meter.stop()
+    if profiler:
+        profiler.dump_stats(cprofile_path)
+
+    result = {
+        "returncode": returncode,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "metrics": metrics,
+        "pid": os.getpid(),
+    }
+    if reloaded:
+        result["reloaded_modules"] = reloaded
+    return result
+
+
+def _warm_worker(stage_dir: str, preload_modules: List[str]) -> None:
+    """工作进程初始化函数：预先导入常用模块。"""
+    sys.path.insert(0, stage_dir)
+    for module_name in preload_modules:
+        try:
+            __import__(module_name)
+        except ImportError:
+            # 预加载只是优化，缺少的模块留给阶段脚本自己报错
+            pass
+
+
+class WarmWorkerPool:
+    """预热的工作进程池，阶段脚本在常驻进程中执行。"""
+
+    def __init__(self, max_workers: int = 2, preload_modules: Optional[List[str]] = None):
+        """初始化工作进程池。
+
+        Args:
+            max_workers: 工作进程数量
+            preload_modules: 工作进程启动时预先导入的模块
+        """
+        self.max_workers = max_workers
+        self.preload_modules = list(DEFAULT_PRELOAD_MODULES if preload_modules is None else preload_modules)
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_warm_worker,
+            initargs=(str(Path(__file__).parent), self.preload_modules),
+        )
+
+    def submit(self, file_path: str, argv: Optional[Sequence[str]] = None,
+               cprofile_path: Optional[str] = None) -> Future:
+        """提交阶段脚本，返回Future，结果格式同 run_stage_inprocess。"""
+        return self._executor.submit(run_stage_inprocess, str(file_path), list(argv or []), cprofile_path)
+
+    def run(self, file_path: str, argv: Optional[Sequence[str]] = None,
+            cprofile_path: Optional[str] = None) -> Dict:
+        """同步执行阶段脚本。"""
+        return self.submit(file_path, argv, cprofile_path).result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭工作进程池。"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,182 @@
+"""阶段看门狗 - 为阶段子进程设置资源上限并处理卡住的阶段
+支持的限制（均为可选）:
+    timeout:         墙钟超时（秒）
+    stall_timeout:   无进展超时（秒），CPU时间和输出长度都不再增长即视为卡住
+    max_memory_mb:   地址空间上限（RLIMIT_AS），超出时分配失败，阶段以MemoryError退出
+    max_rss_mb:      常驻内存上限，超出时由看门狗终止（仅Linux）
+    max_cpu_seconds: CPU时间上限（RLIMIT_CPU）
+    retries:         因超时或卡住被终止后的重试次数
+
+这些限制作用于阶段子进程，只在 DataCoordinator 的subprocess模式下生效（见 SUPPORTED_LIMITS）。
+"""
+
+import os
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# resource 模块只在类Unix系统上可用
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# 看门狗主动终止的原因，可以通过重试恢复
+RETRYABLE_REASONS = ("timeout", "stalled")
+
+# 各执行模式支持的限制：进程内执行和预热进程池中的阶段与其他阶段共享进程，无法单独限制或终止；
+# queue模式下 timeout 为等待任务完成的时间，超时后取消任务（见 task_queue）
+SUPPORTED_LIMITS = {
+    "subprocess": {"timeout", "stall_timeout", "max_memory_mb", "max_rss_mb", "max_cpu_seconds", "retries"},
+    "queue": {"timeout", "retries"},
+    "inprocess": {"retries"},
+    "pool": {"retries"},
+}
+
+
+def make_rlimit_preexec(limits: Dict) -> Optional[Callable[[], None]]:
+    """根据限制生成子进程的 preexec_fn，在子进程exec前调用setrlimit。"""
+    if not RESOURCE_AVAILABLE:
+        return None
+
+    max_memory_mb = limits.get("max_memory_mb")
+    max_cpu_seconds = limits.get("max_cpu_seconds")
+    if not max_memory_mb and not max_cpu_seconds:
+        return None
+
+    def apply_limits():
+        if max_memory_mb:
+            limit = int(max_memory_mb * 1024 * 1024)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if max_cpu_seconds:
+            # 软限制触发SIGXCPU，硬限制多留1秒作为兜底
+            seconds = int(max_cpu_seconds)
+            resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+
+    return apply_limits
+
+
+def _read_rss_bytes(pid: int) -> Optional[int]:
+    """读取 /proc/<pid>/statm 中的常驻内存（仅Linux）。"""
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _read_cpu_ticks(pid: int) -> Optional[int]:
+    """读取 /proc/<pid>/stat 中的 utime+stime（仅Linux）。"""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # 进程名可能包含空格，从最后一个')'之后开始解析
+            fields = f.read().rsplit(")", 1)[1].split()
+        return int(fields[11]) + int(fields[12])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class StageWatchdog(threading.Thread):
+    """监视一个子进程，超时、卡住或常驻内存超限时将其终止并记录原因。"""
+
+    def __init__(self, process, limits: Dict, output_files: List, check_interval: float = 0.5):
+        """初始化看门狗。
+
+        Args:
+            process: subprocess.Popen 对象
+            limits: 限制配置，见模块说明
+            output_files: 子进程的stdout/stderr临时文件，用于判断是否仍有输出
+            check_interval: 检查间隔（秒）
+        """
+        super().__init__(daemon=True)
+        self.process = process
+        self.timeout = limits.get("timeout")
+        self.stall_timeout = limits.get("stall_timeout")
+        max_rss_mb = limits.get("max_rss_mb")
+        self.max_rss_bytes = int(max_rss_mb * 1024 * 1024) if max_rss_mb else None
+        self.output_files = output_files
+        self.check_interval = check_interval
+        self.reason = None
+        self._stop_event = threading.Event()
+        # 回收子进程的一方持有 reap_lock 调用wait并设置 reaped；回收之后PID可能被其他进程复用，不能再发信号。
+        # 不用 process.poll()/kill() 判断：它们内部会调用waitpid，与 run_profiled_subprocess 中的 wait4 抢着回收
+        self.reap_lock = threading.Lock()
+        self.reaped = False
+
+    def _progress_marker(self):
+        sizes = []
+        for f in self.output_files:
+            try:
+                sizes.append(os.fstat(f.fileno()).st_size)
+            except OSError:
+                sizes.append(None)
+        return _read_cpu_ticks(self.process.pid), tuple(sizes)
+
+    def _kill(self, reason: str):
+        with self.reap_lock:
+            if self.reaped:
+                # 子进程已经自行退出并被回收
+                return
+            self.reason = reason
+            try:
+                # 未回收的子进程（包括已退出的僵尸进程）仍占用该PID，发信号是安全的
+                os.kill(self.process.pid, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+            except OSError:
+                pass
+
+    def run(self):
+        start = time.monotonic()
+        last_marker = self._progress_marker()
+        last_progress = start
+
+        while not self._stop_event.wait(self.check_interval):
+            now = time.monotonic()
+            if self.timeout and now - start > self.timeout:
+                self._kill("timeout")
+                return
+
+            if self.max_rss_bytes:
+                rss = _read_rss_bytes(self.process.pid)
+                if rss is not None and rss > self.max_rss_bytes:
+                    self._kill("memory_limit")
+                    return
+
+            if self.stall_timeout:
+                marker = self._progress_marker()
+                if marker != last_marker:
+                    last_marker, last_progress = marker, now
+                elif now - last_progress > self.stall_timeout:
+                    self._kill("stalled")
+                    return
+
+    def stop(self):
+        """子进程已结束，停止监视。"""
+        self._stop_event.set()
+
+
+def unsupported_limits(execution_mode: str, limits: Optional[Dict]) -> List[str]:
+    """返回在该执行模式下不会生效的限制名称。"""
+    return sorted(set(limits or {}) - SUPPORTED_LIMITS.get(execution_mode, set()))
+
+
+def classify_termination(returncode: int, stderr: str, watchdog_reason: Optional[str],
+                         limits: Optional[Dict] = None) -> Optional[str]:
+    """判断阶段失败的原因：看门狗终止、超出CPU/内存上限，或普通错误。
+
+    看门狗终止的原因（timeout、stalled、memory_limit）由看门狗记录；
+    没有记录原因的SIGKILL来自外部（例如系统OOM killer或手动kill），归为 killed。
+    MemoryError 只有在设置了 max_memory_mb（RLIMIT_AS）时才归为 memory_limit，否则是阶段自身的错误。
+    """
+    if watchdog_reason:
+        return watchdog_reason
+    if returncode == 0:
+        return None
+    if hasattr(signal, "SIGXCPU") and returncode == -signal.SIGXCPU:
+        return "cpu_limit"
+    if (limits or {}).get("max_memory_mb") and "MemoryError" in (stderr or ""):
+        return "memory_limit"
+    if hasattr(signal, "SIGKILL") and returncode == -signal.SIGKILL:
+        return "killed"
+    return "error"
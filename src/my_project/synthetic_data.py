@@ -0,0 +1,289 @@
+"""合成数据生成器 - 为流水线压测生成大规模的用户、项目和工作簿数据
+数据按批向量化生成（相同的种子生成相同的数据），可以直接写入共享存储，
+或流式写入xlsx/CSV文件作为生产者的输入；run_pipeline_benchmark 以此为数据源
+测量生产者→消费者流水线在不同数据规模下的吞吐量。
+
+用法:
+    python synthetic_data.py generate --users 1000000 --projects 50000 [--rows 1000000 --out data/benchmark/rows.csv] [--seed 0]
+    python synthetic_data.py benchmark [--rows 10000,100000] [--formats csv,xlsx]
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from utils import df_to_records
+
+DEFAULT_BATCH_SIZE = 100_000
+
+DEFAULT_DEPARTMENTS = {"技术部": 0.4, "销售部": 0.25, "市场部": 0.15, "运营部": 0.12, "财务部": 0.08}
+DEFAULT_PROJECT_STATUSES = {"进行中": 0.5, "已完成": 0.3, "计划中": 0.2}
+DEFAULT_CATEGORIES = {"办公用品": 0.35, "差旅": 0.25, "设备采购": 0.2, "培训": 0.1, "其他": 0.1}
+
+_SURNAMES = list("王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗")
+_GIVEN_CHARS = list("伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉萍红")
+_PROJECT_PREFIXES = ["数据", "网站", "移动", "客户", "供应链", "财务", "营销", "智能"]
+_PROJECT_SUFFIXES = ["分析项目", "优化", "应用开发", "平台升级", "系统迁移", "自动化"]
+
+
+def _weighted(rng: np.random.Generator, weights: Dict[str, float], size: int) -> np.ndarray:
+    names = list(weights)
+    probabilities = np.array([weights[name] for name in names], dtype=float)
+    return np.array(names, dtype=object)[rng.choice(len(names), size=size, p=probabilities / probabilities.sum())]
+
+
+def _batches(count: int, batch_size: int) -> Iterator[tuple]:
+    for start in range(0, count, batch_size):
+        yield start, min(batch_size, count - start)
+
+
+class SyntheticDataGenerator:
+    """按配置的分布生成用户、项目和工作簿行。"""
+
+    def __init__(self, seed: Optional[int] = None, departments: Optional[Dict[str, float]] = None,
+                 project_statuses: Optional[Dict[str, float]] = None,
+                 categories: Optional[Dict[str, float]] = None,
+                 age_mean: float = 32, age_std: float = 8, amount_median: float = 500,
+                 amount_sigma: float = 1.0, owner_skew: float = 1.3, null_ratio: float = 0.02):
+        """初始化生成器。
+
+        Args:
+            seed: 随机种子
+            departments: 部门及其权重
+            project_statuses: 项目状态及其权重
+            categories: 工作簿行的类别及其权重
+            age_mean: 年龄均值（正态分布，截断到18~65）
+            age_std: 年龄标准差
+            amount_median: 金额中位数（对数正态分布）
+            amount_sigma: 金额对数的标准差，越大长尾越明显
+            owner_skew: 项目负责人和工作簿行所属用户的Zipf偏斜度，少数用户占大部分记录
+            null_ratio: 工作簿中可选列（备注）的空值比例
+        """
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.departments = departments or DEFAULT_DEPARTMENTS
+        self.project_statuses = project_statuses or DEFAULT_PROJECT_STATUSES
+        self.categories = categories or DEFAULT_CATEGORIES
+        self.age_mean = age_mean
+        self.age_std = age_std
+        self.amount_median = amount_median
+        self.amount_sigma = amount_sigma
+        self.owner_skew = owner_skew
+        self.null_ratio = null_ratio
+
+    def _names(self, size: int) -> np.ndarray:
+        surnames = np.array(_SURNAMES, dtype=object)[self.rng.integers(0, len(_SURNAMES), size)]
+        given = np.array(_GIVEN_CHARS, dtype=object)[self.rng.integers(0, len(_GIVEN_CHARS), size)]
+        second = np.array(_GIVEN_CHARS + [""] * len(_GIVEN_CHARS), dtype=object)[
+            self.rng.integers(0, 2 * len(_GIVEN_CHARS), size)]
+        return surnames + given + second
+
+    def _skewed_ids(self, size: int, id_count: int, first_id: int) -> np.ndarray:
+        """Zipf分布的ID：编号越小被引用得越多。"""
+        ranks = self.rng.zipf(self.owner_skew, size) - 1
+        return first_id + np.where(ranks < id_count, ranks, self.rng.integers(0, id_count, size))
+
+    def users(self, count: int, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """逐批生成用户（与 generate_sample_data 的字段一致，另加薪资和入职日期）。"""
+        for start, size in _batches(count, batch_size):
+            yield pd.DataFrame({
+                "id": np.arange(start + 1, start + size + 1),
+                "name": self._names(size),
+                "age": np.clip(np.rint(self.rng.normal(self.age_mean, self.age_std, size)), 18, 65).astype(int),
+                "department": _weighted(self.rng, self.departments, size),
+                "salary": np.round(self.rng.lognormal(np.log(12000), 0.4, size), -2),
+                "join_date": pd.Timestamp("2015-01-01") + pd.to_timedelta(self.rng.integers(0, 3650, size), "D"),
+            })
+
+    def projects(self, count: int, user_count: int, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """逐批生成项目，进度与状态保持一致。"""
+        for start, size in _batches(count, batch_size):
+            status = _weighted(self.rng, self.project_statuses, size)
+            progress = np.where(status == "已完成", 100,
+                                np.where(status == "计划中", self.rng.integers(0, 21, size),
+                                         self.rng.integers(10, 100, size)))
+            prefixes = np.array(_PROJECT_PREFIXES, dtype=object)[self.rng.integers(0, len(_PROJECT_PREFIXES), size)]
+            suffixes = np.array(_PROJECT_SUFFIXES, dtype=object)[self.rng.integers(0, len(_PROJECT_SUFFIXES), size)]
+            ids = np.arange(start + 101, start + size + 101)
+            yield pd.DataFrame({
+                "id": ids,
+                "name": prefixes + suffixes + ids.astype(str).astype(object),
+                "status": status,
+                "progress": progress,
+                "owner_id": self._skewed_ids(size, user_count, 1),
+            })
+
+    def workbook_rows(self, count: int, user_count: int = 10_000, project_count: int = 1_000,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """逐批生成工作簿行（类似费用明细），作为生产者的Excel/CSV输入。"""
+        for start, size in _batches(count, batch_size):
+            remarks = np.where(self.rng.random(size) < self.null_ratio, None,
+                               _weighted(self.rng, {"已审核": 0.6, "待审核": 0.3, "退回": 0.1}, size))
+            yield pd.DataFrame({
+                "row_id": np.arange(start + 1, start + size + 1),
+                "user_id": self._skewed_ids(size, user_count, 1),
+                "project_id": self._skewed_ids(size, project_count, 101),
+                "category": _weighted(self.rng, self.categories, size),
+                "amount": np.round(self.rng.lognormal(np.log(self.amount_median), self.amount_sigma, size), 2),
+                "quantity": self.rng.poisson(3, size) + 1,
+                # 每行间隔一分钟左右且严格递增，可作为增量摄取的高水位列
+                "created_time": pd.Timestamp("2024-01-01") + pd.to_timedelta(
+                    np.arange(start, start + size) * 60 + self.rng.integers(0, 60, size), "s"),
+                "remark": remarks,
+            })
+
+    def save_to_shared_store(self, user_count: int, project_count: int,
+                             records_threshold: int = DEFAULT_BATCH_SIZE) -> Dict:
+        """生成用户和项目并保存到共享存储。
+
+        数量不超过 records_threshold 时以 generate_sample_data 的格式保存为共享数据（整体序列化为JSON）；
+        超过时按批流式写入JSON Lines记录集（见 write_shared_records），内存只保留一个批次，
+        之后需要用 load_shared_records 或 Relation.from_shared_key 读取。
+        """
+        from data_manager import get_data_manager
+
+        dm = get_data_manager()
+        formats = {}
+        for key, count, batches in (("users", user_count, lambda: self.users(user_count)),
+                                    ("projects", project_count, lambda: self.projects(project_count, user_count))):
+            if count > records_threshold:
+                # 先删除旧的JSON文件，避免读取方拿到过期数据（删除同时清掉旧记录集，之后整体重写）
+                dm.delete_shared_data(key)
+                write_shared_records(batches(), key)
+                formats[key] = "jsonl"
+            else:
+                dm.save_shared_data(key, [record for batch in batches() for record in df_to_records(batch)])
+                formats[key] = "json"
+        metadata = {
+            "data_version": "1.0",
+            "created_by": "synthetic_data.py",
+            "created_time": datetime.now().isoformat(),
+            "description": f"合成数据: {user_count} 个用户, {project_count} 个项目 (seed={self.seed})",
+            "formats": formats
+        }
+        dm.save_shared_data("metadata", metadata)
+        return metadata
+
+
+def write_shared_records(batches: Iterator[pd.DataFrame], key: str) -> int:
+    """把批次流式追加到共享记录集（JSON Lines），返回行数。"""
+    from data_manager import get_data_manager
+
+    dm = get_data_manager()
+    dm.append_shared_records(key, [], reset=True)
+    rows = 0
+    for batch in batches:
+        dm.append_shared_records(key, df_to_records(batch))
+        rows += len(batch)
+    return rows
+
+
+def write_csv(batches: Iterator[pd.DataFrame], path: str) -> int:
+    """把批次流式写入CSV文件，返回行数。"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    for index, batch in enumerate(batches):
+        batch.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        rows += len(batch)
+    return rows
+
+
+def write_xlsx(batches: Iterator[pd.DataFrame], path: str, sheet_name: str = "Sheet1") -> int:
+    """用openpyxl的只写模式把批次流式写入xlsx文件，内存不随行数增长，返回行数。"""
+    from openpyxl import Workbook
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    rows = 0
+    for index, batch in enumerate(batches):
+        if index == 0:
+            worksheet.append(list(batch.columns))
+        # 时间戳转为datetime，空值写成空单元格
+        for row in batch.astype(object).where(batch.notna(), None).itertuples(index=False):
+            worksheet.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row])
+        rows += len(batch)
+    workbook.save(path)
+    return rows
+
+
+def run_pipeline_benchmark(row_counts: Sequence[int] = (10_000, 100_000), formats: Sequence[str] = ("csv", "xlsx"),
+                           seed: int = 0, workdir: Optional[str] = None) -> Dict:
+    """生产者→消费者流水线的基准测试。
+
+    对每种数据规模和文件格式：生成工作簿行文件，运行生产者 process_excel_data（不使用解析缓存），
+    再运行消费者 analyze_shared_data，记录耗时和吞吐量，结果保存到共享数据 "pipeline_benchmark"。
+    """
+    from data_manager import get_data_manager
+    from file_a_producer import process_excel_data
+    from file_b_consumer import analyze_shared_data
+
+    dm = get_data_manager()
+    workdir = Path(workdir) if workdir else dm.data_dir / "benchmark"
+    results = []
+    for rows in row_counts:
+        for fmt in formats:
+            path = workdir / f"rows_{rows}.{fmt}"
+            generator = SyntheticDataGenerator(seed)
+            start = time.perf_counter()
+            writer = write_csv if fmt == "csv" else write_xlsx
+            writer(generator.workbook_rows(rows), str(path))
+            generate_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            produced = process_excel_data(str(path), "Sheet1", use_cache=False)
+            produce_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            analyze_shared_data()
+            consume_seconds = time.perf_counter() - start
+
+            results.append({
+                "rows": rows,
+                "format": fmt,
+                "file_size_bytes": path.stat().st_size,
+                "status": produced.get("status"),
+                "generate_seconds": round(generate_seconds, 4),
+                "produce_seconds": round(produce_seconds, 4),
+                "consume_seconds": round(consume_seconds, 4),
+                "produce_rows_per_second": round(rows / produce_seconds, 2) if produce_seconds > 0 else None,
+            })
+
+    benchmark = {"seed": seed, "run_time": datetime.now().isoformat(), "results": results}
+    dm.save_shared_data("pipeline_benchmark", benchmark)
+
+    print("\n=== 流水线基准测试 ===")
+    print(f"{'行数':>10} {'格式':>6} {'生成(秒)':>10} {'生产(秒)':>10} {'消费(秒)':>10} {'生产吞吐(行/秒)':>16}")
+    for r in results:
+        print(f"{r['rows']:>10} {r['format']:>6} {r['generate_seconds']:>10} {r['produce_seconds']:>10} "
+              f"{r['consume_seconds']:>10} {r['produce_rows_per_second']:>16}")
+    return benchmark
+
+
+def _arg(name: str, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "generate"
+    seed = int(_arg("--seed", 0))
+
+    if command == "benchmark":
+        row_counts = [int(n) for n in _arg("--rows", "10000,100000").split(",")]
+        run_pipeline_benchmark(row_counts, _arg("--formats", "csv,xlsx").split(","), seed)
+    else:
+        generator = SyntheticDataGenerator(seed)
+        user_count = int(_arg("--users", 1000))
+        project_count = int(_arg("--projects", 100))
+        generator.save_to_shared_store(user_count, project_count)
+        print(f"✅ 已生成 {user_count} 个用户和 {project_count} 个项目")
+
+        if "--rows" in sys.argv:
+            out = _arg("--out", "data/benchmark/rows.csv")
+            batches = generator.workbook_rows(int(_arg("--rows")), user_count, project_count)
+            rows = write_xlsx(batches, out) if out.endswith(".xlsx") else write_csv(batches, out)
+            print(f"✅ 已写入 {rows} 行工作簿数据: {out}")
@@ -0,0 +1,328 @@
+"""阶段任务队列 - 基于SQLite的本地多工作进程任务队列
+协调器把阶段放入队列，工作进程主动拉取执行。阶段的输入输出通过共享数据目录传递，
+只要工作进程能访问同一个数据目录和队列文件（例如共享文件系统），也可以运行在其他机器上。
+
+任务状态: pending -> running -> done/failed；取消执行中的任务时先标记为 cancelling，
+执行它的工作进程在下一次心跳时发现并终止阶段，确认后任务才变为 failed。
+
+启动工作进程:
+    python task_queue.py worker [队列文件路径]
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 任务被领取后的租约时间（秒），超时未完成的任务可被其他工作进程重新领取
+DEFAULT_LEASE_SECONDS = 3600
+# 工作进程执行任务时的心跳间隔（秒），每次心跳续租并检查任务是否被取消
+HEARTBEAT_INTERVAL = 0.5
+# 工作进程因任务被取消而终止阶段时的退出码
+CANCELLED_EXIT_CODE = 75
+
+
+class SQLiteTaskQueue:
+    """SQLite实现的任务队列，支持多个进程并发领取任务。"""
+
+    def __init__(self, db_path: str):
+        """初始化任务队列。
+
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        self.db_path = str(db_path)
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    stage_file TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker_id TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    enqueued_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    lease_expires REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue(self, stage_file: str, payload: Optional[Dict] = None) -> int:
+        """放入一个阶段任务，返回任务ID。"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO tasks (stage_file, payload, enqueued_at) VALUES (?, ?, ?)",
+                (str(stage_file), json.dumps(payload or {}, ensure_ascii=False), time.time())
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict]:
+        """原子地领取最早的待执行任务（或租约已过期的任务）。
+
+        Returns:
+            任务字典，没有可领取的任务时返回None
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT id, stage_file, payload, attempts FROM tasks "
+                "WHERE status = 'pending' OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            task_id, stage_file, payload, attempts = row
+            conn.execute(
+                "UPDATE tasks SET status = 'running', worker_id = ?, attempts = ?, "
+                "started_at = ?, lease_expires = ? WHERE id = ?",
+                (worker_id, attempts + 1, now, now + lease_seconds, task_id)
+            )
+            conn.execute("COMMIT")
+            return {
+                "id": task_id,
+                "stage_file": stage_file,
+                "payload": json.loads(payload),
+                "attempts": attempts + 1
+            }
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def complete(self, task_id: int, result: Dict, worker_id: str) -> bool:
+        """记录任务结果，returncode为0视为成功。
+
+        只有仍持有该任务的工作进程能写入结果：任务已被取消，或租约过期后被其他进程领取时，
+        迟到的结果被丢弃。
+
+        Returns:
+            结果被记录返回True，被丢弃返回False
+        """
+        status = "done" if result.get("returncode") == 0 else "failed"
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, finished_at = ?, lease_expires = NULL "
+                "WHERE id = ? AND status = 'running' AND worker_id = ?",
+                (status, json.dumps(result, ensure_ascii=False), time.time(), task_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def heartbeat(self, task_id: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """执行中的工作进程续租。
+
+        Returns:
+            仍持有该任务返回True；任务已被取消或被其他工作进程领取时返回False，应停止执行
+        """
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND status = 'running' AND worker_id = ?",
+                (time.time() + lease_seconds, task_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def confirm_cancelled(self, task_id: int, worker_id: Optional[str] = None) -> bool:
+        """确认被取消的任务已经停止执行，任务变为 failed。
+
+        Args:
+            worker_id: 执行该任务的工作进程，为None时不检查（例如协调器已经杀死了该进程）
+        """
+        query = "UPDATE tasks SET status = 'failed', finished_at = ? WHERE id = ? AND status = 'cancelling'"
+        params = [time.time(), task_id]
+        if worker_id is not None:
+            query += " AND worker_id = ?"
+            params.append(worker_id)
+        with closing(self._connect()) as conn:
+            return conn.execute(query, params).rowcount > 0
+
+    def get(self, task_id: int) -> Optional[Dict]:
+        """查询任务状态和结果。"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, stage_file, status, worker_id, attempts, result, enqueued_at, "
+                "started_at, finished_at FROM tasks WHERE id = ?",
+                (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ["id", "stage_file", "status", "worker_id", "attempts", "result",
+                "enqueued_at", "started_at", "finished_at"]
+        task = dict(zip(keys, row))
+        task["result"] = json.loads(task["result"]) if task["result"] else None
+        return task
+
+    def wait(self, task_id: int, timeout: Optional[float] = None, poll_interval: float = 0.05) -> Optional[Dict]:
+        """等待任务结束，返回任务字典；超时返回None。"""
+        deadline = None if timeout is None else time.time() + timeout
+        while deadline is None or time.time() < deadline:
+            task = self.get(task_id)
+            if task and task["status"] in ("done", "failed"):
+                # cancelling 不算结束：阶段可能仍在写共享数据
+                return task
+            time.sleep(poll_interval)
+        return None
+
+    def requeue_worker_tasks(self, worker_ids: List[str]) -> int:
+        """把指定工作进程正在执行的任务放回队列（例如这些进程已经退出），不必等待租约过期。
+
+        Returns:
+            放回队列的任务数量
+        """
+        if not worker_ids:
+            return 0
+        placeholders = ", ".join("?" * len(worker_ids))
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires = NULL "
+                f"WHERE status = 'running' AND worker_id IN ({placeholders})",
+                list(worker_ids)
+            )
+            return cursor.rowcount
+
+    def cancel(self, task_id: int, reason: str) -> bool:
+        """取消未结束的任务，之后不会再被领取，也不能再写入结果。
+
+        待执行的任务直接变为 failed；执行中的任务变为 cancelling，
+        等执行它的工作进程终止阶段后由 confirm_cancelled 变为 failed（见 wait）。
+
+        Returns:
+            任务被取消返回True，已经结束返回False
+        """
+        result = json.dumps({"returncode": 1, "stdout": "", "stderr": reason, "metrics": {}}, ensure_ascii=False)
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = CASE status WHEN 'running' THEN 'cancelling' ELSE 'failed' END, "
+                "result = ?, finished_at = ?, lease_expires = NULL "
+                "WHERE id = ? AND status IN ('pending', 'running')",
+                (result, time.time(), task_id)
+            )
+            return cursor.rowcount > 0
+
+    def stats(self) -> Dict[str, int]:
+        """按状态统计任务数量。"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def local_worker_id(pid: int) -> str:
+    """本机工作进程的默认标识。"""
+    return f"{socket.gethostname()}:{pid}"
+
+
+def run_worker(db_path: str, worker_id: Optional[str] = None, poll_interval: float = 0.1,
+               max_tasks: Optional[int] = None, idle_timeout: Optional[float] = None) -> int:
+    """工作进程主循环：不断领取并执行阶段任务。
+
+    阶段在本进程内执行（见 stage_runner.run_stage_inprocess），
+    因此已导入的模块在任务之间保持预热。执行期间后台线程定期心跳续租；
+    发现任务被取消或被其他工作进程领取时，确认取消并立即退出进程（退出码 CANCELLED_EXIT_CODE），
+    以终止仍在运行的阶段。
+
+    Args:
+        db_path: 队列数据库文件路径
+        worker_id: 工作进程标识，默认使用 主机名:PID
+        poll_interval: 队列为空时的轮询间隔（秒）
+        max_tasks: 执行多少个任务后退出，None表示不限制
+        idle_timeout: 连续空闲多久后退出（秒），None表示一直运行
+
+    Returns:
+        执行的任务数量
+    """
+    from stage_runner import run_stage_inprocess
+
+    queue = SQLiteTaskQueue(db_path)
+    worker_id = worker_id or local_worker_id(os.getpid())
+    processed = 0
+    idle_since = time.time()
+
+    print(f"👷 工作进程 {worker_id} 启动，队列: {db_path}")
+    while max_tasks is None or processed < max_tasks:
+        task = queue.claim(worker_id)
+        if task is None:
+            if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        payload = task["payload"]
+        finished = threading.Event()
+        watcher = threading.Thread(target=_watch_task, args=(queue, task["id"], worker_id, finished), daemon=True)
+        watcher.start()
+        try:
+            result = run_stage_inprocess(task["stage_file"], payload.get("argv"),
+                                         payload.get("cprofile_path"))
+        except Exception as e:
+            result = {"returncode": 1, "stdout": "", "stderr": str(e), "metrics": {}}
+        finally:
+            finished.set()
+            watcher.join()
+        result["worker_id"] = worker_id
+        if not queue.complete(task["id"], result, worker_id):
+            print(f"👷 [{worker_id}] 任务 {task['id']} 已被取消或重新分配，结果已丢弃")
+
+        processed += 1
+        idle_since = time.time()
+        print(f"👷 [{worker_id}] 任务 {task['id']} ({Path(task['stage_file']).name}) "
+              f"returncode={result['returncode']}")
+
+    print(f"👷 工作进程 {worker_id} 退出，共执行 {processed} 个任务")
+    return processed
+
+
+def _watch_task(queue: SQLiteTaskQueue, task_id: int, worker_id: str, finished: threading.Event):
+    """任务执行期间的心跳线程：不再持有任务时终止整个工作进程（阶段在本进程内运行，无法单独停止）。"""
+    while not finished.wait(HEARTBEAT_INTERVAL):
+        try:
+            if queue.heartbeat(task_id, worker_id):
+                continue
+            queue.confirm_cancelled(task_id, worker_id)
+        except sqlite3.Error:
+            # 数据库暂时不可用时下次再试
+            continue
+        print(f"👷 [{worker_id}] 任务 {task_id} 已被取消，终止阶段并退出", flush=True)
+        os._exit(CANCELLED_EXIT_CODE)
+
+
+def spawn_local_workers(db_path: str, count: int) -> List[subprocess.Popen]:
+    """在本机启动若干个工作进程。"""
+    return [
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "worker", str(db_path)],
+            cwd=str(Path(__file__).parent),
+            stdout=subprocess.DEVNULL
+        )
+        for _ in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "worker":
+        if len(sys.argv) >= 3:
+            queue_path = sys.argv[2]
+        else:
+            from data_manager import get_data_manager
+            queue_path = str(get_data_manager().data_dir / "task_queue.db")
+        run_worker(queue_path)
+    else:
+        print("用法: python task_queue.py worker [队列文件路径]")
@@ -1,9 +1,12 @@
 import os
 import pandas as pd
+from workbook_cache import read_excel_cached
+from change_detection import detect_workbook_changes
 
 def cg_in_time(road_of_xslx,sheet_name):
     try:
-        cg=pd.read_excel(road_of_xslx,sheet_name)
+        # 同一文件未变化时直接从解析缓存加载
+        cg=read_excel_cached(road_of_xslx,sheet_name)
         
         # 数据探索
         print(f"数据形状: {cg.shape}")
@@ -15,6 +18,20 @@ def cg_in_time(road_of_xslx,sheet_name):
         print(f"错误: {e}")
         return 'defeat'
 
+def cg_changes(road_of_xslx,sheet_name,key_column=None):
+    # 只输出与上一版本相比新增、修改、删除的行（主键默认为第一列）
+    try:
+        changes=detect_workbook_changes(road_of_xslx,sheet_name,key_column)
+        counts=changes["counts"]
+        print(f"新增: {counts['inserted']} 行, 修改: {counts['updated']} 行, 删除: {counts['deleted']} 行")
+        for row in changes["updated"]:
+            print(f"修改: {row}")
+        print(f"删除的主键: {changes['deleted']}")
+        return changes
+    except Exception as e:
+        print(f"错误: {e}")
+        return None
+
 # 提示用户输入文件路径和sheet名称进行测试(先固定路径和sheet名称，后期更改input为固定值)
 road_of_xslx = "C:/Users/唐朝/Desktop/12345.xlsx"
 sheet_name = "Sheet1"
@@ -28,4 +45,6 @@ print(f"工作表: {sheet_name}")
 print("-" * 50)
 
 result = cg_in_time(road_of_xslx, sheet_name)
-print(f"\n处理结果: {result}")# 利用现有的pandas + openpyxl
+print(f"\n处理结果: {result}")
+print("-" * 50)
+cg_changes(road_of_xslx, sheet_name)# 利用现有的pandas + openpyxl
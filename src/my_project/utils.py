@@ -1,7 +1,9 @@
 """工具函数模块，提供通用功能。"""
 
+import hashlib
+import json
 import os
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from pathlib import Path
 
 # 尝试导入dotenv，如果安装了的话
@@ -11,6 +13,9 @@ try:
 except ImportError:
     DOTENV_AVAILABLE = False
 
+# 流水线默认读取的Excel文件，可用环境变量 EXCEL_INPUT_PATH 覆盖
+DEFAULT_EXCEL_PATH = "C:/Users/唐朝/Desktop/12345.xlsx"
+
 
 def load_environment_variables() -> Dict[str, str]:
     """加载环境变量，优先从.env文件加载。
@@ -44,6 +49,11 @@ def load_environment_variables() -> Dict[str, str]:
     return env_vars
 
 
+def get_excel_input_path() -> str:
+    """返回流水线读取的Excel文件路径：环境变量 EXCEL_INPUT_PATH，未设置时为 DEFAULT_EXCEL_PATH。"""
+    return os.environ.get("EXCEL_INPUT_PATH") or DEFAULT_EXCEL_PATH
+
+
 def find_project_root() -> Optional[Path]:
     """查找项目根目录，通过向上查找pyproject.toml文件。
 
@@ -66,6 +76,36 @@ def find_project_root() -> Optional[Path]:
     return None
 
 
+def compute_file_hash(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> Optional[str]:
+    """分块计算文件内容的SHA-256哈希值。
+
+    Args:
+        file_path: 文件路径
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        十六进制哈希字符串，文件不存在时返回None
+    """
+    path = Path(file_path)
+    if not path.is_file():
+        return None
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def df_to_records(df) -> List[Dict]:
+    """把DataFrame转为可JSON序列化的记录列表。
+
+    通过JSON往返把NaN/NaT转为None、时间戳转为ISO字符串、numpy标量转为Python类型，
+    结果可以直接保存到共享存储或发送到记录通道。
+    """
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
 def get_api_key(key_name: str = "OPENAI_API_KEY") -> Optional[str]:
     """获取指定的API密钥。
 
@@ -0,0 +1,189 @@
+"""工作簿解析缓存 - 把解析后的工作表保存为二进制格式，避免重复解析xlsx
+缓存以 文件路径 + 工作表 为键，并用 文件大小、修改时间、内容哈希 判断是否失效：
+大小和修改时间都未变化时直接命中；修改时间变了但内容哈希相同（例如文件被复制）也算命中。
+
+安装了pyarrow时使用Parquet列式格式，否则退回pandas的pickle格式。
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+from utils import compute_file_hash
+
+# 尝试导入pyarrow，如果安装了的话
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+class WorkbookCache:
+    """工作表级别的解析结果缓存。"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """初始化缓存。
+
+        Args:
+            cache_dir: 缓存目录，默认为共享数据目录下的 workbook_cache
+        """
+        if cache_dir is None:
+            from data_manager import get_data_manager
+            cache_dir = get_data_manager().data_dir / "workbook_cache"
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_stem(self, excel_path: str, sheet_name, variant: str = "") -> str:
+        key = f"{Path(excel_path).resolve()}::{sheet_name}"
+        if variant:
+            key += f"::{variant}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _meta_path(self, stem: str) -> Path:
+        return self.cache_dir / f"{stem}.meta.json"
+
+    def _load_meta(self, stem: str) -> Optional[Dict]:
+        try:
+            with open(self._meta_path(stem), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_meta(self, stem: str, meta: Dict):
+        with open(self._meta_path(stem), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def get(self, excel_path: str, sheet_name, variant: str = "") -> Optional[pd.DataFrame]:
+        """读取缓存，缓存不存在或已失效时返回None。"""
+        df, _ = self._get_entry(excel_path, sheet_name, variant)
+        return df
+
+    def _get_entry(self, excel_path: str, sheet_name, variant: str = "") -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+        """读取缓存的数据和元数据，缓存不存在或已失效时返回 (None, None)。"""
+        stem = self._entry_stem(excel_path, sheet_name, variant)
+        meta = self._load_meta(stem)
+        data_path = self.cache_dir / meta["data_file"] if meta else None
+        if meta is None or not data_path.exists():
+            return None, None
+
+        stat = Path(excel_path).stat()
+        if (stat.st_size, stat.st_mtime_ns) != (meta["size"], meta["mtime_ns"]):
+            # 元数据变了，再比较内容哈希
+            if stat.st_size != meta["size"] or compute_file_hash(excel_path) != meta["sha256"]:
+                return None, None
+            meta["mtime_ns"] = stat.st_mtime_ns
+            self._save_meta(stem, meta)
+
+        if meta["format"] == "parquet":
+            return pd.read_parquet(data_path), meta
+        return pd.read_pickle(data_path), meta
+
+    def put(self, excel_path: str, sheet_name, df: pd.DataFrame, variant: str = "",
+            extra_meta: Optional[Dict] = None) -> Dict:
+        """写入缓存，返回缓存条目的元数据。
+
+        Args:
+            variant: 同一工作表的不同版本（例如压缩了dtype的版本）分开缓存
+            extra_meta: 随条目保存的附加信息
+        """
+        stem = self._entry_stem(excel_path, sheet_name, variant)
+        stat = Path(excel_path).stat()
+
+        fmt = "pickle"
+        data_path = self.cache_dir / f"{stem}.pkl"
+        if PYARROW_AVAILABLE:
+            try:
+                data_path = self.cache_dir / f"{stem}.parquet"
+                df.to_parquet(data_path, index=False)
+                fmt = "parquet"
+            except Exception:
+                # 混合类型的object列无法写成Parquet，退回pickle
+                data_path.unlink(missing_ok=True)
+                data_path = self.cache_dir / f"{stem}.pkl"
+        if fmt == "pickle":
+            df.to_pickle(data_path)
+
+        meta = {
+            "excel_path": str(Path(excel_path).resolve()),
+            "sheet_name": sheet_name,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": compute_file_hash(excel_path),
+            "format": fmt,
+            "data_file": data_path.name,
+            "rows": len(df),
+            "created_time": time.time()
+        }
+        if extra_meta:
+            meta.update(extra_meta)
+        self._save_meta(stem, meta)
+        return meta
+
+    def read_excel(self, excel_path: str, sheet_name, **read_kwargs) -> pd.DataFrame:
+        """带缓存的 pd.read_excel：命中时从缓存加载，否则解析后写入缓存。"""
+        df = self.get(excel_path, sheet_name) if not read_kwargs else None
+        if df is not None:
+            self.hits += 1
+            return df
+
+        self.misses += 1
+        df = pd.read_excel(excel_path, sheet_name=sheet_name, **read_kwargs)
+        if not read_kwargs:
+            self.put(excel_path, sheet_name, df)
+        return df
+
+    def read_excel_optimized(self, excel_path: str, sheet_name,
+                             dtype_schema: Optional[Dict[str, str]] = None) -> Tuple[pd.DataFrame, Dict]:
+        """读取工作表并压缩dtype（见 dtype_optimizer），缓存压缩后的DataFrame。
+
+        命中时直接加载压缩后的数据，不再推断和转换，报告取自写入缓存时的记录。
+        压缩版本与 read_excel 的缓存条目分开保存，不改变其他调用者得到的dtype。
+        条目记录写入时请求的schema：这次请求的schema与它或与实际使用的schema都不同时，
+        缓存的dtype可能与这次请求的结果不一致，视为未命中并重新生成。
+
+        Returns:
+            (压缩后的DataFrame, optimize_dtypes 的报告)
+        """
+        from dtype_optimizer import optimize_dtypes
+
+        df, meta = self._get_entry(excel_path, sheet_name, "optimized")
+        if df is not None and dtype_schema not in (meta.get("requested_schema"), meta["dtype_report"]["schema"]):
+            df = None
+        if df is not None:
+            self.hits += 1
+            report = dict(meta["dtype_report"])
+            report["schema_reused"] = dtype_schema is not None and dtype_schema == report["schema"]
+            return df, report
+
+        self.misses += 1
+        df = pd.read_excel(excel_path, sheet_name=sheet_name)
+        df, report = optimize_dtypes(df, dtype_schema)
+        self.put(excel_path, sheet_name, df, "optimized",
+                 {"dtype_report": report, "requested_schema": dtype_schema})
+        return df, report
+
+
+# 全局缓存实例
+_global_workbook_cache = None
+
+def _get_global_cache() -> WorkbookCache:
+    global _global_workbook_cache
+    if _global_workbook_cache is None:
+        _global_workbook_cache = WorkbookCache()
+    return _global_workbook_cache
+
+def read_excel_cached(excel_path: str, sheet_name, **read_kwargs) -> pd.DataFrame:
+    """使用全局工作簿缓存读取工作表的便捷函数。"""
+    return _get_global_cache().read_excel(excel_path, sheet_name, **read_kwargs)
+
+
+def read_excel_optimized_cached(excel_path: str, sheet_name,
+                                dtype_schema: Optional[Dict[str, str]] = None) -> Tuple[pd.DataFrame, Dict]:
+    """使用全局工作簿缓存读取并压缩工作表的便捷函数。"""
+    return _get_global_cache().read_excel_optimized(excel_path, sheet_name, dtype_schema)
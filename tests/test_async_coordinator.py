@@ -0,0 +1,103 @@
+"""测试异步协调器对子进程输出的流式处理。"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from async_coordinator import STREAM_LIMIT, AsyncDataCoordinator
+
+
+class TestPumpStream(unittest.TestCase):
+    """测试AsyncDataCoordinator._pump_stream。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.lines = []
+        self.coordinator = AsyncDataCoordinator(
+            on_output=lambda file_name, stream_name, text: self.lines.append(text))
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _pump(self, payload: bytes) -> deque:
+        tail = deque(maxlen=10)
+
+        async def run():
+            stream = asyncio.StreamReader(limit=STREAM_LIMIT)
+            stream.feed_data(payload)
+            stream.feed_eof()
+            await self.coordinator._pump_stream(stream, "stage.py", "stdout", tail)
+
+        asyncio.run(run())
+        return tail
+
+    def test_lines_split_on_newline(self):
+        """按换行符切分，空行保留，末尾没有换行符的行也会输出。"""
+        tail = self._pump(b"first\n\nsecond\nlast")
+        self.assertEqual(self.lines, ["first", "", "second", "last"])
+        self.assertEqual(list(tail), self.lines)
+
+    def test_overlong_line_is_chunked_not_lost(self):
+        """超过STREAM_LIMIT的行按块输出，内容完整，后续行不受影响。"""
+        long_line = "数" * STREAM_LIMIT  # 每个字符3字节，切分处落在多字节字符中间
+        self._pump(b"before\n" + long_line.encode("utf-8") + b"\nafter\n")
+        self.assertEqual(self.lines[0], "before")
+        self.assertEqual(self.lines[-1], "after")
+        self.assertGreater(len(self.lines), 3)
+        self.assertEqual("".join(self.lines[1:-1]), long_line)
+
+    def test_subprocess_with_overlong_line(self):
+        """子进程输出超长的一行时阶段正常完成，尾部保留了之后的输出。"""
+        stage = self.tmp_dir / "stage.py"
+        stage.write_text(f"print('x' * {STREAM_LIMIT * 2 + 10})\nprint('done')\n", encoding="utf-8")
+        self.assertTrue(asyncio.run(self.coordinator.run_python_file_async(str(stage), timeout=60)))
+        self.assertEqual(self.lines[-1], "done")
+        self.assertEqual(sum(len(line) for line in self.lines[:-1]), STREAM_LIMIT * 2 + 10)
+
+    def test_timeout_covers_process_exit(self):
+        """关闭输出后继续运行的子进程同样按超时终止。"""
+        stage = self.tmp_dir / "stage.py"
+        stage.write_text("import os, time\nprint('closing', flush=True)\nos.close(1)\nos.close(2)\n"
+                         "time.sleep(60)\n", encoding="utf-8")
+        start = time.time()
+        self.assertFalse(asyncio.run(self.coordinator.run_python_file_async(str(stage), timeout=1)))
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(self.coordinator.execution_log[-1]["event_type"], "file_execution_timeout")
+
+    def test_execution_log_saved_off_loop(self):
+        """事件循环中记录的事件不同步写文件，运行结束前全部保存。"""
+        saved = []
+        original = self.coordinator.dm.save_shared_data
+
+        def save(key, data):
+            saved.append((key, threading.current_thread() is threading.main_thread()))
+            return original(key, data)
+
+        self.coordinator.dm.save_shared_data = save
+        stage = self.tmp_dir / "stage.py"
+        stage.write_text("print('ok')\n", encoding="utf-8")
+        self.assertTrue(asyncio.run(self.coordinator.run_python_file_async(str(stage), timeout=60)))
+        log = self.coordinator.dm.load_shared_data("execution_log")
+        self.assertEqual(log[-1]["event_type"], "file_execution_success")
+        self.assertEqual(len(log), len(self.coordinator.execution_log))
+        log_saves = [on_main for key, on_main in saved if key == "execution_log"]
+        self.assertTrue(log_saves)
+        self.assertNotIn(True, log_saves)
+
+
+if __name__ == "__main__":
+    unittest.main()
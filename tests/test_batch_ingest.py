@@ -0,0 +1,82 @@
+"""测试批量摄取多个工作簿和工作表。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+import workbook_cache
+from dtype_optimizer import load_schemas, schema_source_key
+from file_a_producer import ingest_excel_batch
+
+
+class TestIngestExcelBatch(unittest.TestCase):
+    """测试ingest_excel_batch。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager, self._old_cache = data_manager._global_data_manager, workbook_cache._global_workbook_cache
+        data_manager._global_data_manager, workbook_cache._global_workbook_cache = dm, None
+        self.dm = dm
+
+        self.input_dir = self.tmp_dir / "input"
+        self.input_dir.mkdir()
+        self.workbook = self.input_dir / "a.xlsx"
+        with pd.ExcelWriter(self.workbook) as writer:
+            pd.DataFrame({"id": [1, 2, 3]}).to_excel(writer, sheet_name="S1", index=False)
+            pd.DataFrame({"name": ["x", "y"]}).to_excel(writer, sheet_name="S2", index=False)
+        self.csv = self.input_dir / "b.csv"
+        pd.DataFrame({"id": range(4), "value": [0.5, 1.5, 2.5, 3.5]}).to_csv(self.csv, index=False)
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        workbook_cache._global_workbook_cache = self._old_cache
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_all_sheets_and_files(self):
+        """每个工作表和CSV文件各为一个分区，结果、统计和schema保存到共享数据。"""
+        result = ingest_excel_batch(str(self.input_dir / "*"), max_workers=2)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual((result["workbook_count"], result["sheet_count"], result["total_rows"]), (2, 3, 9))
+        self.assertEqual(set(result["sheets"]),
+                         {f"{self.workbook}::S1", f"{self.workbook}::S2", f"{self.csv}::None"})
+
+        stats = self.dm.load_shared_data("excel_batch_stats")
+        self.assertEqual(stats["total_rows"], 9)
+        self.assertEqual(stats["sheets"][f"{self.workbook}::S1"]["total_rows"], 3)
+        self.assertEqual(self.dm.load_shared_data("excel_batch_result")["sheet_count"], 3)
+        schemas = load_schemas()
+        self.assertIn(schema_source_key(str(self.workbook), "S1"), schemas)
+        self.assertIn(schema_source_key(str(self.csv), None), schemas)
+
+    def test_sheet_filter(self):
+        """sheet_names 只筛选工作簿中的工作表，CSV文件仍然处理。"""
+        result = ingest_excel_batch(str(self.input_dir / "*"), sheet_names=["S1"], max_workers=1)
+        self.assertEqual(set(result["sheets"]), {f"{self.workbook}::S1", f"{self.csv}::None"})
+
+    def test_broken_workbook_is_partial(self):
+        """无法打开的工作簿记录为错误，其他文件照常处理。"""
+        broken = self.input_dir / "c.xlsx"
+        broken.write_bytes(b"not a workbook")
+        result = ingest_excel_batch(str(self.input_dir / "*"), max_workers=2)
+        self.assertEqual(result["status"], "partial")
+        self.assertEqual(list(result["errors"]), [str(broken)])
+        self.assertEqual(result["total_rows"], 9)
+
+    def test_no_match(self):
+        """没有匹配的文件时返回错误，不写共享数据。"""
+        result = ingest_excel_batch(str(self.input_dir / "*.parquet"))
+        self.assertEqual(result["status"], "error")
+        self.assertIsNone(self.dm.load_shared_data("excel_batch_result"))
+
+
+if __name__ == "__main__":
+    unittest.main()
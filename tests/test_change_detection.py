@@ -0,0 +1,108 @@
+"""测试基于行哈希的变更检测。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from change_detection import ChangeDetector, row_hashes
+
+
+class TestRowHashes(unittest.TestCase):
+    """测试row_hashes。"""
+
+    def test_dtype_only_change_keeps_hash(self):
+        """整数列因其他行出现空值变为浮点时，未修改的行哈希不变。"""
+        before = pd.DataFrame({"id": [1, 2], "qty": [3, 4]})
+        after = pd.DataFrame({"id": [1, 2, 3], "qty": [3, 4, np.nan]})
+        self.assertEqual(before["qty"].dtype, np.int64)
+        pd.testing.assert_series_equal(row_hashes(after, "id").loc[[1, 2]], row_hashes(before, "id"))
+
+    def test_large_integers_distinct(self):
+        """超过 2**53 的整数不会因转换为浮点而哈希相同；整数列变为浮点后哈希仍一致。"""
+        big = 2 ** 53
+        before = pd.DataFrame({"id": [1, 2], "ref": [big, big + 1]})
+        hashes = row_hashes(before, "id")
+        self.assertNotEqual(hashes.loc[1], hashes.loc[2])
+
+        after = pd.DataFrame({"id": [1, 2, 3], "ref": [float(big), float(big + 2), np.nan]})
+        self.assertEqual(row_hashes(after, "id").loc[1], hashes.loc[1])
+
+        unsigned = pd.DataFrame({"id": [1, 2], "ref": np.array([2 ** 64 - 1, 2 ** 64 - 2], dtype=np.uint64)})
+        unsigned_hashes = row_hashes(unsigned, "id")
+        self.assertNotEqual(unsigned_hashes.loc[1], unsigned_hashes.loc[2])
+
+    def test_fractional_values_elsewhere_keep_hash(self):
+        """其他行出现小数时，整数值的行哈希不变；小数值按浮点比较。"""
+        before = pd.DataFrame({"id": [1, 2], "amount": [10.0, 20.0]})
+        after = pd.DataFrame({"id": [1, 2, 3], "amount": [10.0, 20.5, 0.25]})
+        before_hashes, after_hashes = row_hashes(before, "id"), row_hashes(after, "id")
+        self.assertEqual(after_hashes.loc[1], before_hashes.loc[1])
+        self.assertNotEqual(after_hashes.loc[2], before_hashes.loc[2])
+        self.assertNotEqual(after_hashes.loc[2], after_hashes.loc[3])
+
+    def test_invalid_keys(self):
+        """主键列不存在、有空值或重复时抛出ValueError。"""
+        df = pd.DataFrame({"id": [1, 1, None], "value": ["a", "b", "c"]})
+        for frame, key in ((df, "missing"), (df.iloc[:2], "id"), (df.iloc[1:], "id")):
+            with self.assertRaises(ValueError):
+                row_hashes(frame, key)
+
+
+class TestChangeDetector(unittest.TestCase):
+    """测试ChangeDetector.detect。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.detector = ChangeDetector(SimpleNamespace(data_dir=self.tmp_dir))
+        self.v1 = pd.DataFrame({
+            "id": [1, 2, 3, 4],
+            "name": ["a", "b", "c", "d"],
+            "amount": [10.0, 20.0, 30.0, 40.0],
+            "updated": pd.to_datetime(["2024-01-01"] * 4),
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_baseline(self):
+        """第一次检测时所有行都算新增。"""
+        changes = self.detector.detect(self.v1, "src", "id")
+        self.assertTrue(changes["baseline"])
+        self.assertEqual(changes["counts"], {"inserted": 4, "updated": 0, "deleted": 0, "unchanged": 0})
+
+    def test_inserted_updated_deleted(self):
+        """与上一版本比较，只输出新增、修改和删除的行，记录可JSON序列化。"""
+        self.detector.detect(self.v1, "src", "id")
+        v2 = self.v1[self.v1["id"] != 2].copy()
+        v2.loc[v2["id"] == 3, "amount"] = 31.0
+        v2.loc[v2["id"] == 4, "updated"] = pd.Timestamp("2024-02-01")
+        v2 = pd.concat([v2, pd.DataFrame({"id": [5], "name": ["e"], "amount": [np.nan],
+                                          "updated": [pd.NaT]})], ignore_index=True)
+
+        changes = self.detector.detect(v2, "src", "id")
+        self.assertFalse(changes["baseline"])
+        self.assertEqual(changes["counts"], {"inserted": 1, "updated": 2, "deleted": 1, "unchanged": 1})
+        self.assertEqual(changes["deleted"], [2])
+        self.assertEqual(sorted(record["id"] for record in changes["updated"]), [3, 4])
+        self.assertEqual(changes["inserted"], [{"id": 5, "name": "e", "amount": None, "updated": None}])
+
+    def test_commit_false_keeps_snapshot(self):
+        """commit=False 时不更新快照，再次检测得到相同的结果。"""
+        self.detector.detect(self.v1, "src", "id")
+        v2 = self.v1.assign(amount=self.v1["amount"] + 1)
+        first = self.detector.detect(v2, "src", "id", commit=False)
+        second = self.detector.detect(v2, "src", "id")
+        self.assertEqual(first["counts"], second["counts"])
+        self.assertEqual(self.detector.detect(v2, "src", "id")["counts"]["unchanged"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""测试列画像草图的误差界和合并。"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from column_profile import HyperLogLog, QuantileSketch, TableProfile, TopKSketch
+
+
+def _hashes(values) -> np.ndarray:
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+class TestSketchErrorBounds(unittest.TestCase):
+    """草图估计值在文档给出的误差范围内。"""
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_hyperloglog_relative_error(self):
+        """大基数的相对误差在 3×1.04/sqrt(2^p) 以内，小基数（线性计数）接近精确。"""
+        for distinct in (200_000, 1_000_000):
+            hll = HyperLogLog(p=12).update_hashes(_hashes(np.arange(distinct)))
+            self.assertLess(abs(hll.count() - distinct) / distinct, 3 * 1.04 / np.sqrt(1 << 12))
+        small = HyperLogLog(p=12).update_hashes(_hashes(np.repeat(np.arange(100), 5)))
+        self.assertLessEqual(abs(small.count() - 100), 2)
+
+    def test_hyperloglog_merge_equals_single_pass(self):
+        """分区各自计数后合并，与整体计数完全一致。"""
+        values = self.rng.integers(0, 50_000, 200_000)
+        whole = HyperLogLog().update_hashes(_hashes(values))
+        merged = HyperLogLog()
+        for part in np.array_split(values, 7):
+            merged.merge(HyperLogLog().update_hashes(_hashes(part)))
+        np.testing.assert_array_equal(merged.registers, whole.registers)
+
+    def test_quantile_rank_error(self):
+        """分块更新并合并后，各分位数的秩误差不超过1%。"""
+        values = self.rng.normal(100, 15, 300_000)
+        sketch = QuantileSketch(k=200)
+        for part in np.array_split(values, 5):
+            partition = QuantileSketch(k=200)
+            for chunk in np.array_split(part, 6):
+                partition.update(chunk)
+            sketch.merge(partition)
+
+        ordered = np.sort(values)
+        for q, estimate in sketch.quantiles((0.01, 0.25, 0.5, 0.75, 0.99)).items():
+            rank = np.searchsorted(ordered, estimate) / len(values)
+            self.assertLess(abs(rank - float(q)), 0.01, q)
+
+    def test_topk_counts_are_bounded_lower_estimates(self):
+        """高频值计数是下界，误差不超过 总数/(capacity+1)，真正的高频值不会丢失。"""
+        values = pd.Series(self.rng.zipf(1.5, 100_000) % 1000)
+        capacity = 20
+        sketch = TopKSketch(capacity)
+        for start in range(0, len(values), 10_000):
+            sketch.update(values.iloc[start:start + 10_000])
+
+        true_counts = values.value_counts()
+        bound = len(values) / (capacity + 1)
+        for value, count in sketch.counts.items():
+            self.assertLessEqual(count, true_counts[value])
+            self.assertGreaterEqual(count, true_counts[value] - bound)
+        for value in true_counts[true_counts > bound].index:
+            self.assertIn(value, sketch.counts)
+
+
+class TestTableProfile(unittest.TestCase):
+    """测试TableProfile的合并。"""
+
+    def test_merged_moments_match_numpy(self):
+        """分块合并后的计数、空值、最值、均值和标准差与整体计算一致。"""
+        rng = np.random.default_rng(1)
+        amounts = rng.lognormal(5, 1, 10_000)
+        amounts[::50] = np.nan
+        df = pd.DataFrame({"amount": amounts})
+
+        profile = TableProfile()
+        for chunk in np.array_split(np.arange(len(df)), 9):
+            profile.merge(TableProfile().update(df.iloc[chunk]))
+        result = profile.to_dict()["amount"]
+
+        values = df["amount"].dropna()
+        self.assertEqual((result["count"], result["null_count"]), (len(df), df["amount"].isna().sum()))
+        self.assertEqual((result["min"], result["max"]), (values.min(), values.max()))
+        self.assertAlmostEqual(result["mean"], values.mean(), places=4)
+        self.assertAlmostEqual(result["std"], values.std(), places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
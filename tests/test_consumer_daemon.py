@@ -0,0 +1,97 @@
+"""测试常驻消费者的变化检测、去抖和按输入触发分析。"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from file_b_consumer import ConsumerDaemon
+
+
+class TestConsumerDaemon(unittest.TestCase):
+    """测试ConsumerDaemon。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.dm = dm
+        self.dm.save_shared_data("users", [{"id": 1}])
+        self.dm.save_shared_data("metadata", {"version": 1})
+
+        self.calls = []
+        self.daemon = ConsumerDaemon(poll_interval=0.01, debounce=0.2, max_delay=2.0)
+        # 用记录调用的函数代替实际分析，只验证触发了哪些分析
+        self.daemon.analyses = {
+            name: (inputs, lambda name=name: self.calls.append(name))
+            for name, (inputs, _) in self.daemon.analyses.items()
+        }
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_no_change_no_run(self):
+        """数据未变化时不运行分析。"""
+        self.assertFalse(self.daemon.tick())
+        self.assertEqual(self.calls, [])
+
+    def test_only_affected_analyses_run(self):
+        """只运行输入发生变化的分析，并发布 consumer_status。"""
+        self.dm.save_shared_data("metadata", {"version": 2, "note": "updated"})
+        self.assertTrue(self.daemon.tick())
+        self.assertEqual(self.calls, ["analysis_report"])
+
+        self.dm.save_shared_data("users", [{"id": 1}, {"id": 2}])
+        self.assertTrue(self.daemon.tick())
+        self.assertEqual(self.calls[1:], ["analysis_report", "relational_analysis"])
+        status = self.dm.load_shared_data("consumer_status")
+        self.assertEqual((status["run_count"], status["changed_keys"]), (2, ["users"]))
+
+    def test_own_outputs_do_not_trigger(self):
+        """守护进程自己写入的键不会再次触发分析。"""
+        self.daemon.handle_changes({"metadata"})
+        self.dm.save_shared_data("analysis_report", {})
+        self.assertFalse(self.daemon.tick())
+
+    def test_record_sets_trigger(self):
+        """JSON Lines记录集的追加同样触发依赖该键的分析。"""
+        self.dm.append_shared_records("projects", [{"id": 101}])
+        self.assertTrue(self.daemon.tick())
+        self.assertEqual(self.calls, ["analysis_report", "relational_analysis"])
+
+    def test_debounce_merges_burst(self):
+        """静默期内的连续写入合并为一次分析。"""
+        def write_later():
+            time.sleep(0.05)
+            self.dm.save_shared_data("projects", [{"id": 101}])
+
+        self.dm.save_shared_data("metadata", {"version": 2, "note": "updated"})
+        writer = threading.Thread(target=write_later)
+        writer.start()
+        self.assertTrue(self.daemon.tick())
+        writer.join()
+        self.assertEqual(self.daemon.run_count, 1)
+        self.assertEqual(self.dm.load_shared_data("consumer_status")["changed_keys"], ["metadata", "projects"])
+
+    def test_run_forever_stops_after_max_runs(self):
+        """达到 max_runs 后退出，consumer_status 标记为stopped。"""
+        timer = threading.Timer(0.3, self.dm.save_shared_data, ("metadata", {"version": 3}))
+        timer.start()
+        self.daemon.run_forever(max_runs=2)
+        timer.join()
+        self.assertEqual(self.daemon.run_count, 2)
+        self.assertEqual(self.calls, ["analysis_report", "relational_analysis", "analysis_report"])
+        self.assertEqual(self.dm.load_shared_data("consumer_status")["status"], "stopped")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""测试共享数据目录的批量扫描和读取。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from data_manager import DataManager
+
+
+class TestBatchAccess(unittest.TestCase):
+    """测试scan_shared_data_info和load_shared_data_batch。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.dm = DataManager()
+        self.dm.data_dir = self.tmp_dir
+        self.dm.save_shared_data("users", [{"id": 1}])
+        self.dm.save_shared_data("metadata", {"version": 1})
+        self.dm.append_shared_records("events", [{"n": 1}], reset=True)
+        (self.tmp_dir / "broken.json").write_text("{not json", encoding="utf-8")
+        (self.tmp_dir / "workbook_cache").mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_scan_matches_get_data_info(self):
+        """一次遍历得到的文件信息与逐个 get_data_info 一致，按后缀区分共享数据和记录集，跳过目录。"""
+        infos = self.dm.scan_shared_data_info()
+        self.assertEqual(set(infos), {"users", "metadata", "broken"})
+        for key, info in infos.items():
+            single = self.dm.get_data_info(key)
+            self.assertEqual({field: info[field] for field in single}, single)
+            self.assertIsInstance(info["modified_ns"], int)
+        self.assertEqual(set(self.dm.scan_shared_data_info(".jsonl")), {"events"})
+
+    def test_load_batch(self):
+        """并发读取多个键，无法解析或不存在的键为None。"""
+        values = self.dm.load_shared_data_batch(["users", "metadata", "broken", "missing"], max_workers=2)
+        self.assertEqual(values, {"users": [{"id": 1}], "metadata": {"version": 1},
+                                  "broken": None, "missing": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""测试dtype压缩、schema的保存和复用。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+import workbook_cache
+from dtype_optimizer import (SCHEMA_STORE_KEY, apply_schema, infer_column_dtype, load_schemas,
+                             optimize_dtypes, save_schemas)
+
+
+class TestInferColumnDtype(unittest.TestCase):
+    """测试单列dtype推断。"""
+
+    def test_integers_downcast(self):
+        """整数列降为能容纳取值范围的最小类型。"""
+        self.assertEqual(infer_column_dtype(pd.Series([0, 200])), "uint8")
+        self.assertEqual(infer_column_dtype(pd.Series([-1, 300])), "int16")
+        self.assertEqual(infer_column_dtype(pd.Series([0, 2 ** 40])), "uint64")
+
+    def test_integral_floats_with_nulls(self):
+        """只含整数和空值的浮点列转为可空整数。"""
+        self.assertEqual(infer_column_dtype(pd.Series([1.0, None, 3.0])), "UInt8")
+        self.assertEqual(infer_column_dtype(pd.Series([-1.0, None])), "Int8")
+
+    def test_floats(self):
+        """能无损表示为float32的浮点列转为float32，否则保持不变。"""
+        self.assertEqual(infer_column_dtype(pd.Series([0.5, 1.25])), "float32")
+        self.assertEqual(infer_column_dtype(pd.Series([0.1, 1.25])), "float64")
+
+    def test_strings_and_booleans(self):
+        """低基数字符串转为category，布尔值和空值转为boolean，高基数字符串不变。"""
+        self.assertEqual(infer_column_dtype(pd.Series(["a", "b", "a", "a"], dtype=object)), "category")
+        self.assertEqual(infer_column_dtype(pd.Series([True, None, False], dtype=object)), "boolean")
+        unique = pd.Series(["a", "b", "c"], dtype=object)
+        self.assertEqual(infer_column_dtype(unique), str(unique.dtype))
+
+    def test_empty_and_datetime_unchanged(self):
+        """全部为空的列和日期列保持原dtype。"""
+        self.assertEqual(infer_column_dtype(pd.Series([None, None], dtype=float)), "float64")
+        dates = pd.Series(pd.to_datetime(["2024-01-01", "2024-01-02"]))
+        self.assertEqual(infer_column_dtype(dates), str(dates.dtype))
+
+
+class TestApplySchema(unittest.TestCase):
+    """测试按已保存的schema转换。"""
+
+    def test_optimize_report(self):
+        """报告内存变化和实际使用的schema，值不变。"""
+        df = pd.DataFrame({"id": np.arange(1000), "group": ["x", "y"] * 500})
+        optimized, report = optimize_dtypes(df)
+        self.assertEqual(report["schema"], {"id": "uint16", "group": "category"})
+        self.assertLess(report["memory_after_bytes"], report["memory_before_bytes"])
+        self.assertFalse(report["schema_reused"])
+        pd.testing.assert_frame_equal(optimized.astype(df.dtypes.to_dict()), df)
+
+        _, reused = optimize_dtypes(df, report["schema"])
+        self.assertTrue(reused["schema_reused"])
+
+    def test_unsafe_column_reinferred(self):
+        """数据超出保存的类型范围时只重新推断该列，不会溢出。"""
+        df = pd.DataFrame({"id": [1, 70000], "flag": [0, 1]})
+        optimized, applied = apply_schema(df, {"id": "uint8", "flag": "uint8"})
+        self.assertEqual(applied, {"id": "uint32", "flag": "uint8"})
+        self.assertEqual(optimized["id"].tolist(), [1, 70000])
+
+    def test_nulls_need_nullable_int(self):
+        """出现空值时numpy整数类型不安全，改为可空整数。"""
+        df = pd.DataFrame({"n": [1.0, None]})
+        optimized, applied = apply_schema(df, {"n": "uint8"})
+        self.assertEqual(applied, {"n": "UInt8"})
+        self.assertTrue(optimized["n"].isna().iloc[1])
+
+
+class TestSchemaStore(unittest.TestCase):
+    """测试schema的保存、清理时保留，以及压缩版本解析缓存的失效。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.dm = dm
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_save_and_load(self):
+        """多次保存合并到同一个共享数据键。"""
+        save_schemas({"a.xlsx::Sheet1": {"id": "uint8"}})
+        save_schemas({"b.csv::None": {"x": "float32"}})
+        self.assertEqual(load_schemas(), {"a.xlsx::Sheet1": {"id": "uint8"}, "b.csv::None": {"x": "float32"}})
+
+    def test_clear_shared_data_keeps_schemas(self):
+        """清理共享数据时保留schema、高水位和分析缓存。"""
+        from data_coordinator import DataCoordinator
+        save_schemas({"a.xlsx::Sheet1": {"id": "uint8"}})
+        self.dm.save_shared_data("ingest_watermarks", {"a": {"rows": 1}})
+        self.dm.save_shared_data("analysis_cache", {})
+        self.dm.save_shared_data("users", [])
+        coordinator = DataCoordinator()
+        self.addCleanup(coordinator.shutdown)
+        coordinator.clear_shared_data()
+        self.assertEqual(sorted(self.dm.list_shared_data()),
+                         ["analysis_cache", SCHEMA_STORE_KEY, "execution_log", "ingest_watermarks"])
+
+    def test_optimized_cache_checks_schema(self):
+        """压缩版本的缓存条目只在请求的schema一致时命中。"""
+        excel_path = self.tmp_dir / "input.xlsx"
+        pd.DataFrame({"id": [1, 2, 3], "score": [1.0, 2.0, None]}).to_excel(excel_path, index=False)
+        cache = workbook_cache.WorkbookCache(self.tmp_dir / "workbook_cache")
+
+        df, report = cache.read_excel_optimized(str(excel_path), 0)
+        self.assertEqual(report["schema"], {"id": "uint8", "score": "UInt8"})
+        # 与实际使用的schema相同：命中
+        _, reused = cache.read_excel_optimized(str(excel_path), 0, report["schema"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertTrue(reused["schema_reused"])
+
+        # 不同的schema：重新生成，结果符合这次的schema
+        widened = {"id": "int64", "score": "float64"}
+        df, report = cache.read_excel_optimized(str(excel_path), 0, widened)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(str(df["id"].dtype), "int64")
+        cache.read_excel_optimized(str(excel_path), 0, widened)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
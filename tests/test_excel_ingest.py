@@ -0,0 +1,57 @@
+"""测试分块读取工作表时的增量统计。"""
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from excel_ingest import IncrementalStats
+
+
+class TestIncrementalStats(unittest.TestCase):
+    """测试IncrementalStats类。"""
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "id": [1, 2, 3, 4],
+            "amount": [1.5, np.nan, 3.0, 4.5],
+            "created_time": pd.to_datetime(["2024-01-01", "2024-01-02", None, "2024-01-04"]),
+            "name": ["a", None, "c", "d"],
+        })
+
+    def test_chunked_matches_whole(self):
+        """分块累积的行数和列类型与整表一次处理相同。"""
+        whole = IncrementalStats().update(self.df).summary()
+        chunked = IncrementalStats()
+        for start in range(0, len(self.df), 3):
+            chunked.update(self.df.iloc[start:start + 3])
+        chunked = chunked.summary()
+        for field in ("columns", "row_count", "column_types", "numeric_columns", "text_columns"):
+            self.assertEqual(chunked[field], whole[field])
+
+    def test_sample_is_json_serializable(self):
+        """样本要保存到共享存储：时间戳转为ISO字符串，NaN/NaT转为None。"""
+        sample = IncrementalStats(sample_size=4, sample_seed=0).update(self.df).summary()["sample_data"]
+        json.dumps(sample, allow_nan=False)
+        by_id = {record["id"]: record for record in sample}
+        self.assertIsNone(by_id[2]["amount"])
+        self.assertIsNone(by_id[3]["created_time"])
+        self.assertTrue(by_id[1]["created_time"].startswith("2024-01-01T"))
+
+    def test_non_string_headers(self):
+        """数字或日期表头的汇总仍可保存为JSON，列名转为字符串。"""
+        df = pd.DataFrame({2023: [1, 2], pd.Timestamp("2024-01-01"): ["a", "b"], "name": ["x", "y"]})
+        summary = IncrementalStats(profile=True).update(df).summary()
+        json.loads(json.dumps(summary, allow_nan=False))
+        self.assertEqual(summary["columns"], ["2023", "2024-01-01 00:00:00", "name"])
+        self.assertEqual(summary["column_types"]["2023"], "number")
+        self.assertEqual(list(summary["column_profiles"]), summary["columns"])
+
+
+if __name__ == "__main__":
+    unittest.main()
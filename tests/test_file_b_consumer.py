@@ -0,0 +1,76 @@
+"""测试消费者的增量数据分析。"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from file_b_consumer import analyze_shared_data, read_if_changed
+from utils import compute_file_hash
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+    """测试analyze_shared_data只重新分析内容变化的键。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.dm = dm
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_read_if_changed(self):
+        """哈希与文件哈希一致；相同时不解析，不同时解析同一份内容。"""
+        self.dm.save_shared_data("users", [{"id": 1}])
+        expected = compute_file_hash(self.tmp_dir / "users.json")
+        self.assertEqual(read_if_changed(self.dm, "users", expected), (expected, None, False))
+        self.assertEqual(read_if_changed(self.dm, "users", "old"), (expected, [{"id": 1}], True))
+        self.assertEqual(read_if_changed(self.dm, "missing"), (None, None, True))
+
+    def test_only_changed_keys_reanalyzed(self):
+        """重写但内容不变的键复用结果，内容变化的键重新分析。"""
+        self.dm.save_shared_data("users", [{"id": 1}])
+        self.dm.save_shared_data("metadata", {"version": 1})
+        self.assertEqual(sorted(analyze_shared_data()["reanalyzed_keys"]), ["metadata", "users"])
+
+        self.dm.save_shared_data("users", [{"id": 1}])
+        self.dm.save_shared_data("metadata", {"version": 2})
+        # 确保修改时间变化，两个键都要重新读取比较哈希
+        for key in ("users", "metadata"):
+            path = self.tmp_dir / f"{key}.json"
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(analyze_shared_data()["reanalyzed_keys"], ["metadata"])
+        self.assertEqual(analyze_shared_data()["reanalyzed_keys"], [])
+
+
+    def test_report_contents(self):
+        """报告包含各键的摘要和建议，不分析消费者自己的输出。"""
+        self.dm.save_shared_data("excel_processing_result", {"status": "success", "row_count": 3})
+        self.dm.save_shared_data("users", [{"id": 1}, {"id": 2}])
+        self.dm.save_shared_data("projects", [])
+        self.dm.save_shared_data("consumer_status", {"status": "running"})
+        report = analyze_shared_data()
+
+        self.assertEqual(report["total_data_files"], 3)
+        self.assertEqual(report["data_summary"]["users"]["item_count"], 2)
+        self.assertEqual(report["data_summary"]["excel_processing_result"]["key_count"], 2)
+        # 空数据没有摘要
+        self.assertNotIn("projects", report["data_summary"])
+        self.assertEqual(report["recommendations"],
+                         ["Excel数据处理成功，可以进行进一步分析", "用户和项目数据完整，可以进行关联分析"])
+        self.assertEqual(self.dm.load_shared_data("analysis_report"), report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""测试增量摄取的高水位和中断恢复。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from file_a_producer import ingest_new_rows
+
+
+class TestIngestNewRows(unittest.TestCase):
+    """测试ingest_new_rows。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.dm = data_manager.DataManager()
+        self.dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = self.dm
+        self.source = self.tmp_dir / "events.csv"
+        self.source.write_text("id,value\n1,a\n2,b\n", encoding="utf-8")
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _append_rows(self, *rows):
+        with open(self.source, "a", encoding="utf-8") as f:
+            f.writelines(f"{row_id},{value}\n" for row_id, value in rows)
+
+    def _ids(self):
+        return [record["id"] for record in self.dm.load_shared_records("events_rows")]
+
+    def test_only_new_rows_are_appended(self):
+        """第二次运行只追加新增的行。"""
+        self.assertEqual(ingest_new_rows(str(self.source))["new_rows"], 2)
+        self._append_rows((3, "c"))
+        result = ingest_new_rows(str(self.source))
+        self.assertEqual((result["new_rows"], result["full_reload"]), (1, False))
+        self.assertEqual(self._ids(), [1, 2, 3])
+
+    def test_crash_before_watermark_save_does_not_duplicate(self):
+        """追加后、保存高水位前中断，下次运行截断未确认的记录，不产生重复。"""
+        ingest_new_rows(str(self.source))
+        self._append_rows((3, "c"), (4, "d"))
+
+        original_save = self.dm.save_shared_data
+
+        def crash_on_watermarks(key, data):
+            if key == "ingest_watermarks":
+                raise KeyboardInterrupt("模拟中断")
+            return original_save(key, data)
+
+        with mock.patch.object(self.dm, "save_shared_data", side_effect=crash_on_watermarks):
+            with self.assertRaises(KeyboardInterrupt):
+                ingest_new_rows(str(self.source))
+        self.assertEqual(self._ids(), [1, 2, 3, 4])
+
+        result = ingest_new_rows(str(self.source))
+        self.assertEqual(result["new_rows"], 2)
+        self.assertEqual(self._ids(), [1, 2, 3, 4])
+
+    def test_watermark_column(self):
+        """按列模式只摄取该列大于上次最大值的行。"""
+        ingest_new_rows(str(self.source), watermark_column="id")
+        self._append_rows((3, "c"))
+        result = ingest_new_rows(str(self.source), watermark_column="id")
+        self.assertEqual((result["new_rows"], result["watermark"]), (1, 3))
+        self.assertEqual(self._ids(), [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
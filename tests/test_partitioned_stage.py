@@ -0,0 +1,77 @@
+"""测试分区并行阶段：分区辅助函数和协调器的 run_partitioned_stage。"""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from partitioned_stage import row_range_partitions
+
+
+def _unserializable_reduce(results):
+    return {"value": object()}
+
+
+class TestRunPartitionedStage(unittest.TestCase):
+    """测试按行范围分区读取工作表并合并结果。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.dm = data_manager.DataManager()
+        self.dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = self.dm
+        self.excel_path = self.tmp_dir / "input.xlsx"
+        pd.DataFrame({
+            "id": range(40),
+            "created": pd.date_range("2024-01-01", periods=40, freq="D"),
+            "name": [f"n{i}" for i in range(40)],
+        }).to_excel(self.excel_path, sheet_name="Sheet1", index=False)
+
+        from data_coordinator import DataCoordinator
+        self.coordinator = DataCoordinator()
+        self.partitions = row_range_partitions(40, 15, path=str(self.excel_path), sheet_name="Sheet1")
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_row_range_partitions(self):
+        """行范围覆盖全部数据行且互不重叠。"""
+        self.assertEqual([(p["start"], p["stop"]) for p in self.partitions], [(0, 15), (15, 30), (30, 40)])
+        with self.assertRaises(ValueError):
+            row_range_partitions(10, 0)
+
+    def test_merged_result_with_datetime_column_is_saved(self):
+        """含日期列的工作表合并结果可以保存，样本来自全部分区且可JSON序列化。"""
+        from file_a_producer import merge_excel_partitions, read_excel_partition
+        merged = self.coordinator.run_partitioned_stage(
+            "excel", self.partitions, read_excel_partition, merge_excel_partitions, "merged", max_workers=2)
+        self.assertIsNotNone(merged)
+        with open(self.tmp_dir / "merged.json", encoding="utf-8") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["row_count"], 40)
+        self.assertEqual(saved["partition_count"], 3)
+        self.assertEqual(len(saved["sample_data"]), 3)
+        for record in saved["sample_data"]:
+            self.assertEqual(record["created"][:10], str(pd.Timestamp("2024-01-01") + pd.Timedelta(days=record["id"]))[:10])
+
+    def test_save_failure_is_reported(self):
+        """合并结果无法保存时返回None，不留下半截文件。"""
+        from file_a_producer import read_excel_partition
+        merged = self.coordinator.run_partitioned_stage(
+            "excel", self.partitions, read_excel_partition, _unserializable_reduce, "merged", max_workers=2)
+        self.assertIsNone(merged)
+        self.assertFalse((self.tmp_dir / "merged.json").exists())
+        self.assertEqual(self.coordinator.execution_log[-1]["event_type"], "partitioned_stage_error")
+
+
+if __name__ == "__main__":
+    unittest.main()
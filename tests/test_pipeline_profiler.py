@@ -0,0 +1,75 @@
+"""测试阶段资源消耗的采集。"""
+
+import cProfile
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from pipeline_profiler import StageMeter, run_profiled_subprocess, summarize_cprofile
+
+
+class TestRunProfiledSubprocess(unittest.TestCase):
+    """测试run_profiled_subprocess。"""
+
+    def test_output_and_returncode(self):
+        """捕获子进程的输出和返回码，正常退出没有终止原因。"""
+        result = run_profiled_subprocess([sys.executable, "-c", "print('out'); import sys; sys.exit(0)"])
+        self.assertEqual((result["returncode"], result["stdout"].strip()), (0, "out"))
+        self.assertIsNone(result["termination_reason"])
+
+        result = run_profiled_subprocess([sys.executable, "-c", "import sys; sys.exit(2)"])
+        self.assertEqual((result["returncode"], result["termination_reason"]), (2, "error"))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "需要 wait4 和 /proc")
+    def test_stage_metrics(self):
+        """记录的是子进程自身的CPU时间、峰值内存和读写字节数。"""
+        code = "data = bytearray(64 * 1024 * 1024)\nsum(range(2000000))\nprint('x' * 10000)\n"
+        metrics = run_profiled_subprocess([sys.executable, "-c", code])["metrics"]
+        self.assertEqual(metrics["rss_scope"], "stage")
+        self.assertGreater(metrics["cpu_time_seconds"], 0)
+        self.assertGreaterEqual(metrics["peak_rss_bytes"], 64 * 1024 * 1024)
+        self.assertGreaterEqual(metrics["bytes_written"], 10000)
+
+
+class TestStageMeter(unittest.TestCase):
+    """测试进程内的StageMeter。"""
+
+    def test_in_process_metrics(self):
+        """墙钟和CPU时间为测量区间内的消耗，峰值内存的范围为整个进程。"""
+        meter = StageMeter().start()
+        sum(range(200000))
+        metrics = meter.stop()
+        self.assertEqual(metrics["rss_scope"], "process")
+        self.assertGreaterEqual(metrics["wall_time_seconds"], 0)
+        self.assertGreaterEqual(metrics["cpu_time_seconds"], 0)
+
+
+class TestSummarizeCprofile(unittest.TestCase):
+    """测试summarize_cprofile。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_sorted_by_cumulative_time(self):
+        """按累计时间排序并限制行数，文件不存在时返回空列表。"""
+        profile_path = self.tmp_dir / "stage.prof"
+        profiler = cProfile.Profile()
+        profiler.runcall(sorted, list(range(10000)), key=str)
+        profiler.dump_stats(str(profile_path))
+
+        rows = summarize_cprofile(str(profile_path), limit=2)
+        self.assertLessEqual(len(rows), 2)
+        self.assertEqual(rows, sorted(rows, key=lambda row: row["cumtime"], reverse=True))
+        self.assertEqual(set(rows[0]), {"function", "ncalls", "tottime", "cumtime"})
+        self.assertEqual(summarize_cprofile(str(self.tmp_dir / "missing.prof")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""测试协调器导出的流水线时间线。"""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+
+
+class TestTracePerRun(unittest.TestCase):
+    """每次运行导出的trace只包含本次运行的事件。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_trace_is_reset_between_runs(self):
+        """同一个协调器连续运行两次，第二次的trace不包含第一次的事件。"""
+        from data_coordinator import DataCoordinator
+        coordinator = DataCoordinator()
+        event_counts = []
+        for _ in range(2):
+            manifest = coordinator.run_manifests.create([])
+            coordinator.current_run_id = manifest["run_id"]
+            self.assertTrue(coordinator._execute_stages(manifest, [], use_cache=False))
+            trace_path = self.tmp_dir / "traces" / f"{manifest['run_id']}.json"
+            with open(trace_path, encoding="utf-8") as f:
+                trace = json.load(f)
+            events = trace["traceEvents"] if isinstance(trace, dict) else trace
+            self.assertEqual(sum(event["name"] == "generate_final_report" for event in events), 1)
+            event_counts.append(len(events))
+        self.assertEqual(event_counts[0], event_counts[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
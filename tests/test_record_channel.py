@@ -0,0 +1,87 @@
+"""测试记录流通道的结束和中止。"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from record_channel import ChannelAbortedError, ChannelReader, ChannelWriter
+
+
+class TestRecordChannel(unittest.TestCase):
+    """测试ChannelWriter和ChannelReader。"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.address = str(Path(self.tmp_dir) / "channel.sock")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _read_all(self, outcome):
+        batches = []
+        try:
+            with ChannelReader(self.address, connect_timeout=10) as reader:
+                for records in reader:
+                    batches.append(records)
+        except Exception as e:
+            outcome["error"] = e
+        outcome["batches"] = batches
+
+    def _run(self, produce):
+        outcome = {}
+        reader = threading.Thread(target=self._read_all, args=(outcome,))
+        reader.start()
+        try:
+            produce()
+        finally:
+            reader.join(timeout=30)
+        return outcome
+
+    def test_all_batches_delivered(self):
+        """正常结束时读取端收到全部批次，背压限制未确认的批次数。"""
+        def produce():
+            with ChannelWriter(self.address, capacity=2, accept_timeout=10) as writer:
+                for i in range(10):
+                    writer.send_batch([{"i": i}])
+
+        outcome = self._run(produce)
+        self.assertNotIn("error", outcome)
+        self.assertEqual([batch[0]["i"] for batch in outcome["batches"]], list(range(10)))
+
+    def test_writer_exception_aborts_reader(self):
+        """写入端异常退出时读取端抛出ChannelAbortedError，而不是正常结束。"""
+        def produce():
+            with ChannelWriter(self.address, accept_timeout=10) as writer:
+                writer.send_batch([{"i": 0}])
+                raise ValueError("bad sheet")
+
+        outcome = {}
+        reader = threading.Thread(target=self._read_all, args=(outcome,))
+        reader.start()
+        with self.assertRaises(ValueError):
+            produce()
+        reader.join(timeout=30)
+        self.assertIsInstance(outcome["error"], ChannelAbortedError)
+        self.assertIn("ValueError: bad sheet", str(outcome["error"]))
+        self.assertEqual(outcome["batches"], [[{"i": 0}]])
+
+    def test_disconnect_without_end(self):
+        """写入端未发送结束标记就断开时读取端报错。"""
+        outcome = {}
+        reader = threading.Thread(target=self._read_all, args=(outcome,))
+        reader.start()
+        writer = ChannelWriter(self.address, accept_timeout=10)
+        writer.send_batch([{"i": 0}])
+        writer._conn.close()
+        writer._server.close()
+        reader.join(timeout=30)
+        self.assertIsInstance(outcome["error"], ConnectionError)
+
+
+if __name__ == "__main__":
+    unittest.main()
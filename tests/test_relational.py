@@ -0,0 +1,105 @@
+"""测试分块关系运算：哈希连接和分组聚合，包括写盘路径。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from relational import Relation
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(list(df.columns), na_position="last", ignore_index=True)
+
+
+class TestRelational(unittest.TestCase):
+    """测试Relation.join和Relation.group_by。"""
+
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.users = pd.DataFrame({
+            "id": np.append(np.arange(1, 41, dtype=float), np.nan),
+            "department": rng.choice(["技术部", "销售部", "市场部"], 41),
+        })
+        owner_ids = rng.integers(1, 60, 500).astype(float)
+        owner_ids[::25] = np.nan
+        self.projects = pd.DataFrame({
+            "project_id": np.arange(500),
+            "owner_id": owner_ids,
+            "progress": rng.integers(0, 101, 500),
+        })
+        # 探测侧和构建侧都分成多个小块
+        self.probe = Relation.from_frame(self.projects, chunk_rows=64, name="projects")
+        self.build = Relation.from_frame(self.users, chunk_rows=7, name="users")
+
+    def tearDown(self):
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def _join(self, how: str, memory_rows: int) -> pd.DataFrame:
+        return self.probe.join(self.build, left_on="owner_id", right_on="id", how=how,
+                               memory_rows=memory_rows, partitions=4, spill_dir=self.spill_dir).to_frame()
+
+    def test_spilled_join_matches_in_memory(self):
+        """memory_rows=0 时两侧分区写盘，结果与内存连接相同。"""
+        for how in ("inner", "left"):
+            with self.subTest(how=how):
+                in_memory = self._join(how, memory_rows=10_000)
+                spilled = self._join(how, memory_rows=0)
+                pd.testing.assert_frame_equal(_sorted(spilled), _sorted(in_memory), check_dtype=False)
+
+    def test_join_matches_pandas_and_skips_nan_keys(self):
+        """空键不匹配：inner丢弃空键行，left保留探测侧的空键行且右侧列为空。"""
+        for memory_rows in (10_000, 0):
+            inner = self._join("inner", memory_rows)
+            expected = self.projects.dropna(subset=["owner_id"]).merge(
+                self.users.dropna(subset=["id"]), left_on="owner_id", right_on="id")
+            pd.testing.assert_frame_equal(_sorted(inner), _sorted(expected), check_dtype=False)
+            self.assertFalse(inner["owner_id"].isna().any())
+
+            left = self._join("left", memory_rows)
+            self.assertEqual(len(left), len(self.projects))
+            null_keys = left[left["owner_id"].isna()]
+            self.assertEqual(len(null_keys), self.projects["owner_id"].isna().sum())
+            self.assertTrue(null_keys["department"].isna().all())
+
+    def test_group_by_spill_matches_in_memory(self):
+        """max_groups=0 时部分结果写盘，结果与内存聚合和pandas相同，空键作为单独的分组。"""
+        aggregations = {"projects": (None, "size"), "avg_progress": ("progress", "mean"),
+                        "max_progress": ("progress", "max"), "owners": ("owner_id", "count")}
+        in_memory = self.probe.group_by("owner_id", aggregations, spill_dir=self.spill_dir)
+        spilled = self.probe.group_by("owner_id", aggregations, max_groups=0, partitions=4,
+                                      spill_dir=self.spill_dir)
+        pd.testing.assert_frame_equal(spilled, in_memory, check_dtype=False)
+
+        expected = self.projects.groupby("owner_id", dropna=False).agg(
+            projects=("owner_id", "size"), avg_progress=("progress", "mean"),
+            max_progress=("progress", "max"), owners=("owner_id", "count")).reset_index()
+        pd.testing.assert_frame_equal(_sorted(spilled), _sorted(expected), check_dtype=False)
+        self.assertEqual(spilled["owner_id"].isna().sum(), 1)
+
+    def test_first_chunk_closes_iterator(self):
+        """first_chunk 只读取第一个分块，随即关闭分块迭代器（释放打开的文件）。"""
+        closed = []
+
+        def chunks():
+            try:
+                yield self.projects.iloc[:10]
+                yield self.projects.iloc[10:]
+            finally:
+                closed.append(True)
+
+        first = Relation(chunks, "projects").first_chunk()
+        self.assertEqual(len(first), 10)
+        self.assertEqual(closed, [True])
+        self.assertIsNone(Relation.from_frame(self.projects.iloc[:0]).first_chunk())
+
+
+if __name__ == "__main__":
+    unittest.main()
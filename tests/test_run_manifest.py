@@ -0,0 +1,120 @@
+"""测试运行清单和从检查点恢复流水线。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from run_manifest import RunManifestStore
+
+STAGE_TEMPLATE = """from pathlib import Path
+from data_manager import get_data_manager
+log = Path({log!r})
+log.write_text(log.read_text() + {name!r} + "\\n" if log.exists() else {name!r} + "\\n")
+if {fail_marker!r} and Path({fail_marker!r}).exists():
+    raise SystemExit(1)
+get_data_manager().save_shared_data({name!r}, {{"stage": {name!r}}})
+"""
+
+
+class IsolatedDataTestCase(unittest.TestCase):
+    """使用临时数据目录的测试基类。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.dm = dm
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class TestRunManifestStore(IsolatedDataTestCase):
+    """测试RunManifestStore。"""
+
+    def setUp(self):
+        super().setUp()
+        self.store = RunManifestStore(self.dm)
+        self.stages = [{"name": "a", "outputs": ["a"]}, {"name": "b", "outputs": ["b"]}]
+
+    def test_create_and_mark(self):
+        """新清单的阶段都是pending；成功的阶段记录输出的内容哈希。"""
+        manifest = self.store.create(self.stages)
+        self.assertEqual({s["status"] for s in manifest["stages"].values()}, {"pending"})
+        self.dm.save_shared_data("a", {"x": 1})
+        self.store.mark_stage(manifest, self.stages[0], True)
+        loaded = self.store.load(manifest["run_id"])
+        self.assertEqual(loaded["stages"]["a"]["status"], "completed")
+        self.assertEqual(loaded["stages"]["a"]["outputs"], {"a": self.dm.get_data_hash("a")})
+        self.assertIsNone(self.store.load("missing"))
+
+    def test_first_stage_to_rerun(self):
+        """从第一个未完成或输出已被修改的阶段开始重跑。"""
+        manifest = self.store.create(self.stages)
+        self.assertEqual(self.store.first_stage_to_rerun(manifest, self.stages), 0)
+        self.dm.save_shared_data("a", {"x": 1})
+        self.store.mark_stage(manifest, self.stages[0], True)
+        self.store.mark_stage(manifest, self.stages[1], False)
+        self.assertEqual(self.store.first_stage_to_rerun(manifest, self.stages), 1)
+
+        self.dm.save_shared_data("b", {"y": 1})
+        self.store.mark_stage(manifest, self.stages[1], True)
+        self.assertIsNone(self.store.first_stage_to_rerun(manifest, self.stages))
+        # 上游输出被修改：从上游阶段开始重跑
+        self.dm.save_shared_data("a", {"x": 2})
+        self.assertEqual(self.store.first_stage_to_rerun(manifest, self.stages), 0)
+
+    def test_latest_failed_run(self):
+        """返回最近一次失败的运行。"""
+        self.assertIsNone(self.store.latest_failed_run())
+        first = self.store.create(self.stages)
+        first["status"] = "failed"
+        self.store.save(first)
+        second = self.store.create(self.stages)
+        second["status"] = "completed"
+        self.store.save(second)
+        self.assertEqual(self.store.latest_failed_run(), first["run_id"])
+
+
+class TestResume(IsolatedDataTestCase):
+    """测试协调器从检查点恢复。"""
+
+    def _stage(self, name: str, fail_marker: str = "") -> dict:
+        path = self.tmp_dir / f"{name}.py"
+        path.write_text(STAGE_TEMPLATE.format(log=str(self.tmp_dir / "runs.log"), name=name,
+                                              fail_marker=fail_marker), encoding="utf-8")
+        return {"name": name, "title": name, "file": str(path), "outputs": [name], "params": {}}
+
+    def test_resume_reruns_failed_stage_only(self):
+        """恢复时跳过已完成的阶段，只重新执行失败的阶段及其下游。"""
+        from data_coordinator import DataCoordinator
+        marker = self.tmp_dir / "fail_b"
+        marker.touch()
+        coordinator = DataCoordinator(execution_mode="inprocess")
+        self.addCleanup(coordinator.shutdown)
+        coordinator.pipeline_stages = [self._stage("a"), self._stage("b", str(marker)), self._stage("c")]
+
+        self.assertFalse(coordinator.orchestrate_data_pipeline())
+        run_id = coordinator.current_run_id
+        self.assertEqual(coordinator.run_manifests.latest_failed_run(), run_id)
+
+        marker.unlink()
+        self.assertTrue(coordinator.resume())
+        self.assertEqual((self.tmp_dir / "runs.log").read_text().split(), ["a", "b", "b", "c"])
+        manifest = coordinator.run_manifests.load(run_id)
+        self.assertEqual(manifest["status"], "completed")
+        self.assertEqual(manifest["resume_count"], 1)
+        self.assertTrue(coordinator.resume(run_id))
+        self.assertEqual((self.tmp_dir / "runs.log").read_text().split(), ["a", "b", "b", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""测试流式抽样模块。"""
+
+import sys
+import unittest
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from sampling import ReservoirSampler
+
+
+def _feed(sampler, df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        sampler.update(df.iloc[start:start + chunk_rows])
+    return sampler
+
+
+class TestReservoirSampler(unittest.TestCase):
+    """测试ReservoirSampler类。"""
+
+    def test_sample_size_without_strata(self):
+        """样本数等于 sample_size，行数不足时返回全部行。"""
+        df = pd.DataFrame({"x": range(1000)})
+        self.assertEqual(len(_feed(ReservoirSampler(7, seed=1), df, 64).sample()), 7)
+        self.assertEqual(len(_feed(ReservoirSampler(7, seed=1), df.head(4), 3).sample()), 4)
+
+    def test_samples_sorted_by_position(self):
+        """样本按原始行号排序。"""
+        df = pd.DataFrame({"x": range(500)})
+        values = [row["x"] for row in _feed(ReservoirSampler(10, seed=2), df, 33).sample()]
+        self.assertEqual(values, sorted(values))
+
+    def test_stratified_sample_size_with_small_strata(self):
+        """小层各保留一行时总数仍等于 sample_size。"""
+        df = pd.DataFrame({"s": ["a"] * 1000 + ["b", "c", "d"], "x": range(1003)})
+        sample = _feed(ReservoirSampler(5, "s", seed=3), df, 100).sample()
+        self.assertEqual(len(sample), 5)
+        self.assertEqual(Counter(row["s"] for row in sample), {"a": 2, "b": 1, "c": 1, "d": 1})
+
+    def test_stratified_sample_size_with_singleton_strata(self):
+        """多个单行层时总数等于 sample_size。"""
+        df = pd.DataFrame({"s": ["big"] * 100 + [f"s{i}" for i in range(7)], "x": range(107)})
+        sample = _feed(ReservoirSampler(10, "s", seed=4), df, 16).sample()
+        self.assertEqual(len(sample), 10)
+        self.assertEqual(Counter(row["s"] for row in sample)["big"], 3)
+
+    def test_stratified_proportional_allocation(self):
+        """各层样本数按行数比例分配。"""
+        df = pd.DataFrame({"s": ["a"] * 600 + ["b"] * 300 + ["c"] * 100, "x": range(1000)})
+        sample = _feed(ReservoirSampler(10, "s", seed=5), df.sample(frac=1, random_state=0), 128).sample()
+        self.assertEqual(Counter(row["s"] for row in sample), {"a": 6, "b": 3, "c": 1})
+
+    def test_more_strata_than_sample_size(self):
+        """层数多于样本数时从最大的层中各取一行。"""
+        df = pd.DataFrame({"s": [i % 20 for i in range(400)] + [0] * 50, "x": range(450)})
+        sample = _feed(ReservoirSampler(5, "s", seed=6), df, 50).sample()
+        self.assertEqual(len(sample), 5)
+        self.assertIn(0, {row["s"] for row in sample})
+
+    def test_null_stratum(self):
+        """空值作为单独的一层。"""
+        df = pd.DataFrame({"s": ["a"] * 50 + [None] * 50, "x": range(100)})
+        sample = _feed(ReservoirSampler(4, "s", seed=7), df, 30).sample()
+        self.assertEqual(Counter(row["s"] for row in sample), {"a": 2, None: 2})
+
+    def test_uniform_selection(self):
+        """每一行被选中的概率大致相同。"""
+        df = pd.DataFrame({"x": range(20)})
+        counts = np.zeros(20)
+        for seed in range(2000):
+            for row in _feed(ReservoirSampler(5, seed=seed), df, 6).sample():
+                counts[row["x"]] += 1
+        expected = 2000 * 5 / 20
+        self.assertLess(np.abs(counts - expected).max() / expected, 0.15)
+
+    def test_merge_is_uniform_across_partitions(self):
+        """分区各自抽样后按顺序合并，每一行被选中的概率大致相同，行号按拼接顺序。"""
+        df = pd.DataFrame({"x": range(20)})
+        counts = np.zeros(20)
+        for seed in range(2000):
+            # 大小不等的三个分区
+            merged = ReservoirSampler(5, seed=seed)
+            for index, part in enumerate((df.iloc[:3], df.iloc[3:15], df.iloc[15:])):
+                merged.merge(_feed(ReservoirSampler(5, seed=seed * 3 + index), part, 4))
+            sample = merged.sample()
+            self.assertEqual(len(sample), 5)
+            self.assertEqual([row["x"] for row in sample], sorted(row["x"] for row in sample))
+            for row in sample:
+                counts[row["x"]] += 1
+        expected = 2000 * 5 / 20
+        self.assertLess(np.abs(counts - expected).max() / expected, 0.15)
+        self.assertEqual(merged.row_count, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""测试流水线调度器的cron表达式解析、单飞锁和代码更新后的重新导入。"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+from data_coordinator import CronSchedule, PipelineScheduler, _process_exists
+
+
+class TestCronSchedule(unittest.TestCase):
+    """测试CronSchedule类。"""
+
+    def test_every_fifteen_minutes(self):
+        """*/15 在整15分钟触发，结果严格晚于给定时刻。"""
+        cron = CronSchedule("*/15 * * * *")
+        self.assertEqual(cron.next_after(datetime(2024, 3, 1, 10, 7, 30)), datetime(2024, 3, 1, 10, 15))
+        self.assertEqual(cron.next_after(datetime(2024, 3, 1, 10, 15)), datetime(2024, 3, 1, 10, 30))
+        self.assertEqual(cron.next_after(datetime(2024, 3, 1, 23, 50)), datetime(2024, 3, 2, 0, 0))
+
+    def test_ranges_and_lists(self):
+        """支持区间、区间步长和逗号列表。"""
+        cron = CronSchedule("0,30 9-17/4 * * *")
+        self.assertEqual(cron.hours, {9, 13, 17})
+        self.assertEqual(cron.next_after(datetime(2024, 3, 1, 13, 0)), datetime(2024, 3, 1, 13, 30))
+        self.assertEqual(cron.next_after(datetime(2024, 3, 1, 17, 30)), datetime(2024, 3, 2, 9, 0))
+
+    def test_weekday_only(self):
+        """只限制周时，下一个周一（周日为0，7也表示周日）。"""
+        # 2024-03-01 是周五
+        self.assertEqual(CronSchedule("0 9 * * 1").next_after(datetime(2024, 3, 1, 12, 0)),
+                         datetime(2024, 3, 4, 9, 0))
+        self.assertEqual(CronSchedule("0 9 * * 7").next_after(datetime(2024, 3, 1, 12, 0)),
+                         datetime(2024, 3, 3, 9, 0))
+
+    def test_day_of_month_or_weekday(self):
+        """日和周都有限制时满足任意一个即触发。"""
+        cron = CronSchedule("0 9 1 * 1")
+        # 2024-02-27 是周二：下一个触发是3月1日（周五），之后是3月4日（周一）
+        first = cron.next_after(datetime(2024, 2, 27, 12, 0))
+        self.assertEqual(first, datetime(2024, 3, 1, 9, 0))
+        self.assertEqual(cron.next_after(first), datetime(2024, 3, 4, 9, 0))
+
+    def test_month_restriction(self):
+        """月份限制与日期同时生效。"""
+        cron = CronSchedule("0 0 1 1,7 *")
+        self.assertEqual(cron.next_after(datetime(2024, 3, 1)), datetime(2024, 7, 1))
+        self.assertEqual(cron.next_after(datetime(2024, 7, 1)), datetime(2025, 1, 1))
+
+    def test_invalid_expressions(self):
+        """字段数量或取值范围错误时抛出ValueError。"""
+        for expression in ("* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "* * 0 * *"):
+            with self.assertRaises(ValueError):
+                CronSchedule(expression)
+
+
+class TestSchedulerLock(unittest.TestCase):
+    """测试调度器的锁文件。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        coordinator = SimpleNamespace(dm=SimpleNamespace(data_dir=self.tmp_dir))
+        self.scheduler = PipelineScheduler(coordinator, watch_paths=[str(self.tmp_dir / "input.xlsx")])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _exited_pid() -> int:
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        return process.pid
+
+    def test_process_exists(self):
+        """当前进程存在，已退出并回收的进程不存在。"""
+        self.assertTrue(_process_exists(os.getpid()))
+        self.assertFalse(_process_exists(self._exited_pid()))
+
+    def test_lock_is_exclusive(self):
+        """锁被持有时不能再次获取，释放后可以获取。"""
+        self.assertTrue(self.scheduler._acquire_lock())
+        self.assertFalse(self.scheduler._acquire_lock())
+        self.scheduler._release_lock()
+        self.assertTrue(self.scheduler._acquire_lock())
+
+    def test_stale_lock_is_taken_over(self):
+        """持有进程已退出的锁被接管，持有进程存在的锁保持不变。"""
+        self.scheduler.lock_path.write_text(str(self._exited_pid()))
+        self.assertTrue(self.scheduler._acquire_lock())
+        self.assertEqual(self.scheduler.lock_path.read_text(), str(os.getpid()))
+
+        self.scheduler.lock_path.write_text(str(os.getppid()))
+        self.assertFalse(self.scheduler._acquire_lock())
+        self.assertEqual(self.scheduler.lock_path.read_text(), str(os.getppid()))
+
+
+
+class TestInprocessCodeReload(unittest.TestCase):
+    """测试常驻进程中项目模块被修改后，下一次运行使用新代码。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.helper = self.tmp_dir / "reload_helper.py"
+        self.helper.write_text("VALUE = 'old'\n", encoding="utf-8")
+        self.stage = self.tmp_dir / "stage.py"
+        self.stage.write_text("from reload_helper import VALUE\nprint(VALUE)\n", encoding="utf-8")
+
+    def tearDown(self):
+        sys.modules.pop("reload_helper", None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_modified_module_is_reimported(self):
+        """未修改时复用已导入的模块；修改后清除并重新导入。"""
+        from stage_runner import run_stage_inprocess
+        first = run_stage_inprocess(str(self.stage))
+        self.assertEqual(first["stdout"].strip(), "old")
+        second = run_stage_inprocess(str(self.stage))
+        self.assertEqual(second["stdout"].strip(), "old")
+        self.assertNotIn("reloaded_modules", second)
+
+        self.helper.write_text("VALUE = 'new value'\n", encoding="utf-8")
+        third = run_stage_inprocess(str(self.stage))
+        self.assertEqual(third["stdout"].strip(), "new value")
+        self.assertEqual(third["reloaded_modules"], ["reload_helper"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""测试阶段缓存的指纹计算和输出的快照恢复。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from stage_cache import StageCache
+
+
+class TestStageFingerprint(unittest.TestCase):
+    """测试StageCache.fingerprint。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.cache = StageCache(SimpleNamespace(data_dir=self.tmp_dir))
+        self.src = self.tmp_dir / "src"
+        self.src.mkdir()
+        (self.src / "stage.py").write_text("import json\nfrom helper import run\nrun()\n", encoding="utf-8")
+        (self.src / "helper.py").write_text("def run():\n    import deep\n    return deep.VALUE\n",
+                                            encoding="utf-8")
+        (self.src / "deep.py").write_text("VALUE = 1\n", encoding="utf-8")
+        (self.src / "unrelated.py").write_text("VALUE = 1\n", encoding="utf-8")
+        self.stage = {"name": "stage", "file": str(self.src / "stage.py")}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_imported_modules_are_tracked(self):
+        """直接和间接导入的同目录模块计入指纹，标准库和无关文件不计入。"""
+        self.assertEqual(set(StageCache._module_hashes(self.stage["file"])), {"helper", "deep"})
+
+    def test_fingerprint_changes_with_imported_module(self):
+        """被导入模块（包括函数内的延迟导入）变化时指纹变化，无关文件变化时不变。"""
+        original = self.cache.fingerprint(self.stage)
+        (self.src / "unrelated.py").write_text("VALUE = 2\n", encoding="utf-8")
+        self.assertEqual(self.cache.fingerprint(self.stage), original)
+        (self.src / "deep.py").write_text("VALUE = 2\n", encoding="utf-8")
+        self.assertNotEqual(self.cache.fingerprint(self.stage), original)
+
+    def test_declared_deps(self):
+        """deps 中声明的文件变化时指纹变化。"""
+        stage = dict(self.stage, deps=[str(self.src / "unrelated.py")])
+        original = self.cache.fingerprint(stage)
+        (self.src / "unrelated.py").write_text("VALUE = 2\n", encoding="utf-8")
+        self.assertNotEqual(self.cache.fingerprint(stage), original)
+
+
+class TestStageSnapshots(unittest.TestCase):
+    """测试StageCache的store/restore。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.dm = data_manager.DataManager()
+        self.dm.data_dir = self.tmp_dir
+        self.cache = StageCache(self.dm)
+        self.stage = {"name": "producer", "outputs": ["users", "metadata", "missing"],
+                      "output_dirs": ["workbook_cache"]}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_records_and_dirs_restored(self):
+        """记录集（.jsonl）和 output_dirs 中的目录随输出一起快照和恢复，没产生的输出跳过。"""
+        self.dm.append_shared_records("users", [{"id": 1}, {"id": 2}], reset=True)
+        self.dm.save_shared_data("metadata", {"version": 1})
+        (self.tmp_dir / "workbook_cache").mkdir()
+        (self.tmp_dir / "workbook_cache" / "a.meta.json").write_text("{}", encoding="utf-8")
+        entry = self.cache.store(self.stage, "f" * 64)
+        self.assertEqual(set(entry["outputs"]), {"users", "metadata"})
+        self.assertIsNotNone(self.cache.lookup(self.stage, "f" * 64))
+
+        # 输出被覆盖为另一种格式、缓存目录被清空
+        self.dm.delete_shared_data("users")
+        self.dm.save_shared_data("users", [{"id": 3}])
+        shutil.rmtree(self.tmp_dir / "workbook_cache")
+        self.assertEqual(sorted(self.cache.restore(entry)), ["users", "workbook_cache"])
+        self.assertFalse((self.tmp_dir / "users.json").exists())
+        self.assertEqual(self.dm.load_shared_records("users"), [{"id": 1}, {"id": 2}])
+        self.assertTrue((self.tmp_dir / "workbook_cache" / "a.meta.json").exists())
+        self.assertEqual(self.cache.restore(entry), [])
+
+    def test_old_snapshots_removed(self):
+        """指纹变化后旧条目的文件和目录快照被删除。"""
+        self.dm.save_shared_data("metadata", {"version": 1})
+        (self.tmp_dir / "workbook_cache").mkdir()
+        old = self.cache.store(self.stage, "a" * 64)
+        self.cache.store(self.stage, "b" * 64)
+        self.assertFalse(any(path.exists() for path in self.cache._snapshots(old)))
+
+
+class TestStageParams(unittest.TestCase):
+    """测试阶段参数传给脚本。"""
+
+    def test_producer_params_to_argv(self):
+        """生产者的输入文件和工作表以命令行参数传给脚本。"""
+        from data_coordinator import build_pipeline_stages, stage_argv
+        producer = build_pipeline_stages("/tmp/input.xlsx", "Data")[0]
+        self.assertEqual(stage_argv(producer), ["--excel-path", "/tmp/input.xlsx", "--sheet-name", "Data"])
+        self.assertEqual(producer["input_files"], ["/tmp/input.xlsx"])
+
+
+if __name__ == "__main__":
+    unittest.main()
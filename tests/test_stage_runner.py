@@ -0,0 +1,80 @@
+"""测试在当前进程中运行阶段脚本。"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from stage_runner import run_stage_inprocess
+
+
+class TestRunStageInprocess(unittest.TestCase):
+    """测试run_stage_inprocess。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.stage_dir = self.tmp_dir / "stages"
+        self.stage_dir.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _stage(self, code: str) -> str:
+        path = self.stage_dir / "stage.py"
+        path.write_text(code, encoding="utf-8")
+        return str(path)
+
+    def test_output_and_argv(self):
+        """捕获输出，脚本以 __main__ 运行并收到argv，当前目录为脚本所在目录。"""
+        stage = self._stage("import os, sys\nprint(__name__, sys.argv[1:], os.getcwd())\n")
+        result = run_stage_inprocess(stage, ["--sheet-name", "Data"])
+        self.assertEqual(result["returncode"], 0)
+        self.assertEqual(result["stdout"].strip(),
+                         f"__main__ ['--sheet-name', 'Data'] {self.stage_dir.resolve()}")
+        self.assertEqual(result["pid"], os.getpid())
+
+    def test_exit_codes(self):
+        """exit(n)、exit("消息")和未捕获的异常转换为返回码，消息和traceback写入stderr。"""
+        self.assertEqual(run_stage_inprocess(self._stage("import sys\nsys.exit(3)\n"))["returncode"], 3)
+        result = run_stage_inprocess(self._stage("import sys\nsys.exit('bad input')\n"))
+        self.assertEqual((result["returncode"], result["stderr"].strip()), (1, "bad input"))
+        result = run_stage_inprocess(self._stage("raise ValueError('boom')\n"))
+        self.assertEqual(result["returncode"], 1)
+        self.assertIn("ValueError: boom", result["stderr"])
+
+    def test_process_state_restored(self):
+        """脚本抛出异常或修改 sys.argv/sys.path/当前目录后，这些状态都被恢复。"""
+        old_argv, old_path, old_cwd = sys.argv[:], sys.path[:], os.getcwd()
+        code = ("import os, sys\nsys.argv.append('x')\nsys.path.append('extra')\n"
+                "os.chdir(os.path.dirname(os.getcwd()))\nraise RuntimeError\n")
+        self.assertEqual(run_stage_inprocess(self._stage(code))["returncode"], 1)
+        self.assertEqual((sys.argv, sys.path, os.getcwd()), (old_argv, old_path, old_cwd))
+
+    def test_shares_data_manager_singleton(self):
+        """阶段脚本与调用方共享同一个全局数据管理器。"""
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.addCleanup(setattr, data_manager, "_global_data_manager", old_manager)
+
+        stage = self._stage("from data_manager import get_data_manager\n"
+                            "get_data_manager().save_shared_data('stage_output', {'ok': True})\n")
+        self.assertEqual(run_stage_inprocess(stage)["returncode"], 0)
+        self.assertEqual(dm.load_shared_data("stage_output"), {"ok": True})
+
+    def test_cprofile_output(self):
+        """指定 cprofile_path 时写入cProfile结果。"""
+        profile_path = self.tmp_dir / "stage.prof"
+        result = run_stage_inprocess(self._stage("sum(range(1000))\n"), cprofile_path=str(profile_path))
+        self.assertEqual(result["returncode"], 0)
+        self.assertTrue(profile_path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""测试阶段看门狗对终止原因的判断。"""
+
+import shutil
+import signal
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from pipeline_profiler import run_profiled_subprocess
+from stage_watchdog import classify_termination, unsupported_limits
+
+
+class TestClassifyTermination(unittest.TestCase):
+    """测试classify_termination。"""
+
+    def test_watchdog_reason_wins(self):
+        """看门狗记录的原因优先。"""
+        self.assertEqual(classify_termination(-signal.SIGKILL, "", "timeout"), "timeout")
+        self.assertEqual(classify_termination(-signal.SIGKILL, "", "memory_limit"), "memory_limit")
+
+    def test_unexplained_sigkill_is_killed(self):
+        """看门狗没有记录原因的SIGKILL不算内存超限。"""
+        self.assertEqual(classify_termination(-signal.SIGKILL, "", None), "killed")
+
+    def test_other_failures(self):
+        """设置了内存上限时MemoryError为内存超限，其他非零退出为普通错误。"""
+        self.assertIsNone(classify_termination(0, "", None))
+        self.assertEqual(classify_termination(1, "Traceback...\nMemoryError", None, {"max_memory_mb": 512}),
+                         "memory_limit")
+        self.assertEqual(classify_termination(1, "ValueError", None), "error")
+
+    def test_memory_error_without_limit(self):
+        """没有设置内存上限时MemoryError是阶段自身的错误。"""
+        self.assertEqual(classify_termination(1, "Traceback...\nMemoryError", None), "error")
+        self.assertEqual(classify_termination(1, "Traceback...\nMemoryError", None, {"timeout": 5}), "error")
+
+
+class TestUnsupportedLimits(unittest.TestCase):
+    """测试非subprocess模式下的限制检查。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_unsupported_limits(self):
+        """inprocess/pool模式只支持retries，queue模式还支持timeout。"""
+        limits = {"timeout": 5, "max_rss_mb": 100, "retries": 1}
+        self.assertEqual(unsupported_limits("subprocess", limits), [])
+        self.assertEqual(unsupported_limits("queue", limits), ["max_rss_mb"])
+        self.assertEqual(unsupported_limits("inprocess", limits), ["max_rss_mb", "timeout"])
+        self.assertEqual(unsupported_limits("pool", {"retries": 2}), [])
+
+    def test_coordinator_rejects_unsupported_limits(self):
+        """协调器在初始化和运行阶段时拒绝当前模式无法执行的限制。"""
+        from data_coordinator import DataCoordinator
+        with self.assertRaises(ValueError):
+            DataCoordinator(execution_mode="inprocess", stage_limits={"timeout": 5})
+        coordinator = DataCoordinator(execution_mode="inprocess")
+        self.addCleanup(coordinator.shutdown)
+        with self.assertRaises(ValueError):
+            coordinator.run_python_file(__file__, limits={"max_rss_mb": 100})
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "需要 /proc")
+class TestWatchdogKills(unittest.TestCase):
+    """测试看门狗终止子进程时记录的原因。"""
+
+    def test_rss_limit(self):
+        """常驻内存超过 max_rss_mb 时由看门狗终止，原因为memory_limit。"""
+        code = "import time\ndata = bytearray(200 * 1024 * 1024)\ntime.sleep(30)\n"
+        result = run_profiled_subprocess([sys.executable, "-c", code], limits={"max_rss_mb": 50})
+        self.assertEqual(result["returncode"], -signal.SIGKILL)
+        self.assertEqual(result["termination_reason"], "memory_limit")
+
+    def test_timeout(self):
+        """超时终止的原因为timeout。"""
+        result = run_profiled_subprocess([sys.executable, "-c", "import time; time.sleep(30)"],
+                                         limits={"timeout": 0.5})
+        self.assertEqual(result["termination_reason"], "timeout")
+
+    def test_external_kill(self):
+        """没有看门狗参与的SIGKILL归为killed。"""
+        code = "import os, signal; os.kill(os.getpid(), signal.SIGKILL)"
+        result = run_profiled_subprocess([sys.executable, "-c", code])
+        self.assertEqual(result["termination_reason"], "killed")
+
+
+if __name__ == "__main__":
+    unittest.main()
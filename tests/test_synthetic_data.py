@@ -0,0 +1,57 @@
+"""测试合成数据写入记录集后，协调器等待、列出和清理共享数据的行为。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from synthetic_data import SyntheticDataGenerator
+
+
+class TestRecordSetSharedData(unittest.TestCase):
+    """大批量合成数据写为 .jsonl 记录集时仍能被等待、列出和清理。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.dm = dm
+        SyntheticDataGenerator(seed=1).save_to_shared_store(50, 5, records_threshold=10)
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _coordinator(self):
+        from data_coordinator import DataCoordinator
+        coordinator = DataCoordinator()
+        self.addCleanup(coordinator.shutdown)
+        return coordinator
+
+    def test_record_sets_written(self):
+        """超过阈值的用户写为记录集，不保留JSON文件。"""
+        self.assertTrue((self.tmp_dir / "users.jsonl").exists())
+        self.assertFalse((self.tmp_dir / "users.json").exists())
+        self.assertIn("users", self.dm.list_shared_data())
+        self.assertTrue(self.dm.get_data_info("users")["exists"])
+
+    def test_wait_for_record_set(self):
+        """等待记录集键时立即返回全部记录。"""
+        users = self._coordinator().wait_for_data("users", timeout=1, check_interval=0.1)
+        self.assertEqual(len(users), 50)
+
+    def test_clear_deletes_record_sets(self):
+        """清理共享数据时一并删除记录集。"""
+        self._coordinator().clear_shared_data()
+        self.assertEqual(list(self.tmp_dir.glob("*.jsonl")), [])
+        self.assertNotIn("users", self.dm.list_shared_data())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""测试Excel、CSV/TSV和Parquet输入的格式识别与读取。"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+import workbook_cache
+from excel_ingest import PYARROW_AVAILABLE, detect_format, iter_source_chunks, read_table, summarize_excel
+
+
+class TestTableFormats(unittest.TestCase):
+    """测试 detect_format、read_table、iter_source_chunks 和 summarize_excel。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        self._old_cache = workbook_cache._global_workbook_cache
+        data_manager._global_data_manager = dm
+        workbook_cache._global_workbook_cache = None
+
+        self.df = pd.DataFrame({"id": range(1, 11), "amount": [float(i) * 1.5 for i in range(10)],
+                                "category": ["a", "b"] * 5})
+        self.xlsx = self.tmp_dir / "table.xlsx"
+        with pd.ExcelWriter(self.xlsx) as writer:
+            self.df.to_excel(writer, sheet_name="First", index=False)
+            self.df.head(2).to_excel(writer, sheet_name="Second", index=False)
+        self.csv = self.tmp_dir / "table.csv"
+        self.df.to_csv(self.csv, index=False)
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        workbook_cache._global_workbook_cache = self._old_cache
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_detect_format(self):
+        """按文件内容识别Excel，按扩展名或内容嗅探识别CSV分隔符。"""
+        self.assertEqual(detect_format(str(self.xlsx)), ("excel", None))
+        renamed = self.tmp_dir / "table.data"
+        shutil.copyfile(self.xlsx, renamed)
+        self.assertEqual(detect_format(str(renamed)), ("excel", None))
+        self.assertEqual(detect_format(str(self.csv)), ("csv", ","))
+
+        tsv = self.tmp_dir / "table.tsv"
+        self.df.to_csv(tsv, sep="\t", index=False)
+        self.assertEqual(detect_format(str(tsv)), ("csv", "\t"))
+        sniffed = self.tmp_dir / "export.txt"
+        self.df.to_csv(sniffed, sep=";", index=False)
+        self.assertEqual(detect_format(str(sniffed)), ("csv", ";"))
+
+    def test_read_table_csv_with_projection_and_filters(self):
+        """CSV只读取指定的列，并按条件过滤行。"""
+        df = read_table(str(self.csv), columns=["id", "category"], filters=[("category", "==", "a"), ("id", ">", 4)])
+        self.assertEqual(list(df.columns), ["id", "category"])
+        self.assertEqual(df["id"].tolist(), [5, 7, 9])
+
+    def test_iter_source_chunks_skip_rows(self):
+        """CSV和Excel分块读取的结果一致，skip_rows跳过前若干数据行。"""
+        for path in (self.csv, self.xlsx):
+            with self.subTest(path=path.suffix):
+                chunks = list(iter_source_chunks(str(path), None, chunk_rows=3, skip_rows=4))
+                self.assertEqual([len(chunk) for chunk in chunks], [3, 3])
+                self.assertEqual(pd.concat(chunks)["id"].tolist(), list(range(5, 11)))
+
+    def test_default_sheet_with_cache(self):
+        """未指定工作表时读取第一个工作表，使用解析缓存时也一样。"""
+        for use_cache in (False, True, True):
+            df = read_table(str(self.xlsx), None, use_cache=use_cache)
+            self.assertIsInstance(df, pd.DataFrame)
+            self.assertEqual(len(df), 10)
+        summary = summarize_excel(str(self.xlsx), None, use_cache=True)
+        self.assertEqual(summary["row_count"], 10)
+        optimized = summarize_excel(str(self.xlsx), None, use_cache=True, optimize=True)
+        self.assertEqual(optimized["row_count"], 10)
+        self.assertIn("memory_usage", optimized)
+
+    def test_summary_same_for_csv_and_excel(self):
+        """同一份数据保存为CSV和Excel，统计结果相同。"""
+        from_csv = summarize_excel(str(self.csv), None, chunk_rows=4)
+        from_excel = summarize_excel(str(self.xlsx), "First")
+        for field in ("columns", "row_count", "column_types", "numeric_columns", "text_columns"):
+            self.assertEqual(from_csv[field], from_excel[field])
+
+    @unittest.skipUnless(PYARROW_AVAILABLE, "需要pyarrow")
+    def test_parquet(self):
+        """Parquet按内容识别，分块读取时跳过前若干行。"""
+        path = self.tmp_dir / "table.bin"
+        self.df.to_parquet(path, index=False)
+        self.assertEqual(detect_format(str(path)), ("parquet", None))
+        self.assertEqual(read_table(str(path), columns=["id"], filters=[("id", ">", 8)])["id"].tolist(), [9, 10])
+        chunks = list(iter_source_chunks(str(path), None, chunk_rows=4, skip_rows=6))
+        self.assertEqual(pd.concat(chunks)["id"].tolist(), [7, 8, 9, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""测试阶段任务队列和协调器的queue执行模式。"""
+
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+from task_queue import SQLiteTaskQueue
+
+
+class TestSQLiteTaskQueue(unittest.TestCase):
+    """测试SQLiteTaskQueue类。"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.queue = SQLiteTaskQueue(os.path.join(self.tmp_dir, "queue.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_claim_in_order(self):
+        """按放入顺序领取，已领取的任务不会被再次领取。"""
+        first = self.queue.enqueue("a.py")
+        second = self.queue.enqueue("b.py", {"argv": ["x"]})
+        self.assertEqual(self.queue.claim("w1")["id"], first)
+        task = self.queue.claim("w2")
+        self.assertEqual(task["id"], second)
+        self.assertEqual(task["payload"], {"argv": ["x"]})
+        self.assertIsNone(self.queue.claim("w3"))
+
+    def test_expired_lease_is_reclaimed(self):
+        """租约过期的任务可被其他工作进程重新领取，attempts递增。"""
+        task_id = self.queue.enqueue("a.py")
+        self.assertEqual(self.queue.claim("w1", lease_seconds=0.05)["attempts"], 1)
+        self.assertIsNone(self.queue.claim("w2"))
+        time.sleep(0.1)
+        task = self.queue.claim("w2")
+        self.assertEqual((task["id"], task["attempts"]), (task_id, 2))
+
+    def test_requeue_worker_tasks(self):
+        """已退出的工作进程持有的任务立即放回队列，无需等待租约过期。"""
+        task_id = self.queue.enqueue("a.py")
+        self.queue.claim("w1")
+        self.assertEqual(self.queue.requeue_worker_tasks(["w0"]), 0)
+        self.assertEqual(self.queue.requeue_worker_tasks(["w1"]), 1)
+        self.assertEqual(self.queue.claim("w2")["id"], task_id)
+
+    def test_complete_and_wait(self):
+        """returncode为0视为成功，wait返回结果；超时返回None。"""
+        task_id = self.queue.enqueue("a.py")
+        self.assertIsNone(self.queue.wait(task_id, timeout=0.1))
+        self.queue.claim("w1")
+        self.assertTrue(self.queue.complete(task_id, {"returncode": 0, "stdout": "ok"}, "w1"))
+        task = self.queue.wait(task_id, timeout=1)
+        self.assertEqual(task["status"], "done")
+        self.assertEqual(task["result"]["stdout"], "ok")
+        self.assertEqual(self.queue.stats(), {"done": 1})
+
+    def test_cancel(self):
+        """取消未结束的任务后不会再被领取；已结束的任务不能取消。"""
+        task_id = self.queue.enqueue("a.py")
+        self.assertTrue(self.queue.cancel(task_id, "timeout"))
+        self.assertIsNone(self.queue.claim("w1"))
+        task = self.queue.get(task_id)
+        self.assertEqual(task["status"], "failed")
+        self.assertEqual(task["result"]["stderr"], "timeout")
+        self.assertFalse(self.queue.cancel(task_id, "timeout"))
+
+    def test_cancel_running_task(self):
+        """执行中的任务取消后变为cancelling，迟到的结果被丢弃，工作进程确认后才变为failed。"""
+        task_id = self.queue.enqueue("a.py")
+        self.queue.claim("w1")
+        self.assertTrue(self.queue.cancel(task_id, "timeout"))
+        self.assertEqual(self.queue.get(task_id)["status"], "cancelling")
+        self.assertIsNone(self.queue.wait(task_id, timeout=0.1))
+        self.assertFalse(self.queue.heartbeat(task_id, "w1"))
+        self.assertFalse(self.queue.complete(task_id, {"returncode": 0, "stdout": "late"}, "w1"))
+        self.assertFalse(self.queue.confirm_cancelled(task_id, "w2"))
+        self.assertTrue(self.queue.confirm_cancelled(task_id, "w1"))
+        task = self.queue.wait(task_id, timeout=1)
+        self.assertEqual(task["status"], "failed")
+        self.assertEqual(task["result"]["stderr"], "timeout")
+
+    def test_complete_after_lease_reclaimed(self):
+        """租约过期后被其他工作进程领取，原工作进程的结果被丢弃。"""
+        task_id = self.queue.enqueue("a.py")
+        self.queue.claim("w1", lease_seconds=0.05)
+        time.sleep(0.1)
+        self.queue.claim("w2")
+        self.assertFalse(self.queue.heartbeat(task_id, "w1"))
+        self.assertFalse(self.queue.complete(task_id, {"returncode": 0}, "w1"))
+        self.assertTrue(self.queue.heartbeat(task_id, "w2"))
+        self.assertTrue(self.queue.complete(task_id, {"returncode": 1}, "w2"))
+        self.assertEqual(self.queue.get(task_id)["status"], "failed")
+
+
+class TestQueueExecutionMode(unittest.TestCase):
+    """测试协调器在queue模式下等待任务。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        self._old_manager = data_manager._global_data_manager
+        data_manager._global_data_manager = dm
+        self.stage = self.tmp_dir / "stage.py"
+        self.stage.write_text("import time\ntime.sleep(1.5)\nprint('stage done')\n", encoding="utf-8")
+
+    def tearDown(self):
+        data_manager._global_data_manager = self._old_manager
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _coordinator(self, pool_size):
+        from data_coordinator import DataCoordinator
+        coordinator = DataCoordinator(execution_mode="queue", pool_size=pool_size)
+        self.addCleanup(coordinator.shutdown)
+        return coordinator
+
+    def test_timeout_without_workers(self):
+        """没有工作进程时按timeout失败并取消任务，而不是一直等待。"""
+        coordinator = self._coordinator(pool_size=0)
+        start = time.time()
+        result = coordinator._run_via_queue(str(self.stage), timeout=0.5, check_interval=0.1)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(result["termination_reason"], "timeout")
+        self.assertEqual(coordinator._get_task_queue().stats(), {"failed": 1})
+
+    def test_timeout_stops_running_stage(self):
+        """超时取消执行中的任务时，工作进程终止阶段并退出，确认停止后才返回，退出的进程被替换。"""
+        marker = self.tmp_dir / "marker.txt"
+        stage = self.tmp_dir / "slow_stage.py"
+        stage.write_text(f"import time\ntime.sleep(4)\nopen({str(marker)!r}, 'w').write('late')\n",
+                         encoding="utf-8")
+        coordinator = self._coordinator(pool_size=1)
+        queue = coordinator._get_task_queue()
+        worker = coordinator._queue_workers[0]
+
+        result = coordinator._run_via_queue(str(stage), timeout=1.5, check_interval=0.2)
+        self.assertEqual(result["termination_reason"], "timeout")
+        self.assertIsNotNone(worker.poll())
+        self.assertEqual(queue.get(1)["status"], "failed")
+        self.assertNotEqual(coordinator._queue_workers[0].pid, worker.pid)
+        time.sleep(3)
+        self.assertFalse(marker.exists())
+
+    def test_dead_worker_is_replaced(self):
+        """执行任务的工作进程退出后，任务放回队列并由新的工作进程完成。"""
+        coordinator = self._coordinator(pool_size=1)
+        queue = coordinator._get_task_queue()
+        worker = coordinator._queue_workers[0]
+
+        def kill_when_running():
+            deadline = time.time() + 20
+            while time.time() < deadline:
+                if queue.stats().get("running"):
+                    os.kill(worker.pid, signal.SIGKILL)
+                    return
+                time.sleep(0.05)
+
+        killer = threading.Thread(target=kill_when_running)
+        killer.start()
+        result = coordinator._run_via_queue(str(self.stage), timeout=60, check_interval=0.2)
+        killer.join()
+
+        self.assertEqual(result["returncode"], 0)
+        self.assertIn("stage done", result["stdout"])
+        self.assertNotEqual(coordinator._queue_workers[0].pid, worker.pid)
+        self.assertEqual(queue.get(1)["attempts"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
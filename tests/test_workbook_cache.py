@@ -0,0 +1,88 @@
+"""测试工作簿解析缓存的命中和失效。"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "my_project"))
+
+import data_manager
+import workbook_cache
+from workbook_cache import WorkbookCache, read_excel_cached
+
+
+class TestWorkbookCache(unittest.TestCase):
+    """测试WorkbookCache。"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.excel_path = self.tmp_dir / "input.xlsx"
+        self.df = pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b", "c"]})
+        self.df.to_excel(self.excel_path, index=False)
+        self.cache = WorkbookCache(self.tmp_dir / "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _touch(self, offset_ns: int = 10 ** 9):
+        stat = self.excel_path.stat()
+        os.utime(self.excel_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+    def test_hit_after_first_read(self):
+        """第一次解析并写入缓存，第二次直接命中，内容相同。"""
+        first = self.cache.read_excel(str(self.excel_path), 0)
+        second = self.cache.read_excel(str(self.excel_path), 0)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        pd.testing.assert_frame_equal(first, second)
+        pd.testing.assert_frame_equal(second, self.df)
+
+    def test_touched_file_with_same_content_hits(self):
+        """只有修改时间变化、内容哈希相同时仍然命中。"""
+        self.cache.read_excel(str(self.excel_path), 0)
+        self._touch()
+        self.cache.read_excel(str(self.excel_path), 0)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_modified_file_misses(self):
+        """文件内容变化后重新解析。"""
+        self.cache.read_excel(str(self.excel_path), 0)
+        pd.DataFrame({"id": [9], "name": ["z"]}).to_excel(self.excel_path, index=False)
+        self._touch()
+        df = self.cache.read_excel(str(self.excel_path), 0)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        self.assertEqual(df["id"].tolist(), [9])
+
+    def test_read_kwargs_bypass_cache(self):
+        """带读取参数时不使用也不写入缓存，避免缓存与参数不符的结果。"""
+        df = self.cache.read_excel(str(self.excel_path), 0, usecols=["id"])
+        self.assertEqual(list(df.columns), ["id"])
+        self.assertIsNone(self.cache.get(str(self.excel_path), 0))
+        self.assertEqual(list(self.cache.read_excel(str(self.excel_path), 0).columns), ["id", "name"])
+
+    def test_sheets_and_variants_are_separate(self):
+        """不同工作表、不同版本分开缓存。"""
+        self.cache.put(str(self.excel_path), 0, self.df)
+        self.assertIsNone(self.cache.get(str(self.excel_path), 1))
+        self.assertIsNone(self.cache.get(str(self.excel_path), 0, "optimized"))
+        pd.testing.assert_frame_equal(self.cache.get(str(self.excel_path), 0), self.df)
+
+    def test_global_cache_uses_data_dir(self):
+        """便捷函数使用数据目录下的 workbook_cache 子目录。"""
+        dm = data_manager.DataManager()
+        dm.data_dir = self.tmp_dir
+        old_manager, old_cache = data_manager._global_data_manager, workbook_cache._global_workbook_cache
+        data_manager._global_data_manager, workbook_cache._global_workbook_cache = dm, None
+        self.addCleanup(setattr, data_manager, "_global_data_manager", old_manager)
+        self.addCleanup(setattr, workbook_cache, "_global_workbook_cache", old_cache)
+
+        read_excel_cached(str(self.excel_path), 0)
+        self.assertTrue(list((self.tmp_dir / "workbook_cache").glob("*.meta.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()